@@ -0,0 +1,120 @@
+"""
+调度规则匹配基准测试，1000 个关键词。
+
+对比两种匹配方式：
+- linear: 按优先级逐条调用 CombinedDispatchRule.match，每个关键词规则各自扫描消息内容
+- indexed: 先用 DispatchIndex 一次扫描消息内容，只对候选规则判断规则组语义
+
+用法: python benchmarks/dispatch_index_bench.py [runs]
+"""
+import random
+import string
+import sys
+import time
+from typing import List, Optional
+from unittest.mock import MagicMock
+
+from kirara_ai.im.message import IMMessage, TextMessage
+from kirara_ai.im.sender import ChatSender
+from kirara_ai.ioc.container import DependencyContainer
+from kirara_ai.workflow.core.dispatch import CombinedDispatchRule, DispatchRuleRegistry, RuleGroup, SimpleDispatchRule
+from kirara_ai.workflow.core.workflow.registry import WorkflowRegistry
+
+KEYWORD_COUNT = 1000
+KEYWORDS_PER_RULE = 5
+PREFIX_RULE_COUNT = 50
+
+
+def random_word(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def build_registry(rng: random.Random) -> DispatchRuleRegistry:
+    container = DependencyContainer()
+    container.register(WorkflowRegistry, MagicMock(spec=WorkflowRegistry))
+    registry = DispatchRuleRegistry(container)
+
+    keywords = [random_word(rng, rng.randint(4, 8)) for _ in range(KEYWORD_COUNT)]
+    for i in range(0, KEYWORD_COUNT, KEYWORDS_PER_RULE):
+        registry.register(CombinedDispatchRule(
+            rule_id=f"keyword_{i}",
+            name=f"keyword_{i}",
+            workflow_id="bench:keyword",
+            priority=rng.randint(1, 10),
+            rule_groups=[RuleGroup(rules=[
+                SimpleDispatchRule(type="keyword", config={"keywords": keywords[i:i + KEYWORDS_PER_RULE]})
+            ])],
+        ))
+    for i in range(PREFIX_RULE_COUNT):
+        registry.register(CombinedDispatchRule(
+            rule_id=f"prefix_{i}",
+            name=f"prefix_{i}",
+            workflow_id="bench:prefix",
+            priority=rng.randint(1, 10),
+            rule_groups=[RuleGroup(rules=[
+                SimpleDispatchRule(type="prefix", config={"prefix": f"/{random_word(rng, 4)}"})
+            ])],
+        ))
+    registry.register(CombinedDispatchRule(
+        rule_id="fallback",
+        name="fallback",
+        workflow_id="bench:fallback",
+        priority=0,
+        rule_groups=[RuleGroup(rules=[SimpleDispatchRule(type="fallback", config={})])],
+    ))
+    return registry
+
+
+def linear_dispatch(registry: DispatchRuleRegistry, message: IMMessage) -> Optional[str]:
+    for rule in registry.get_active_rules():
+        if rule.match(message, registry.workflow_registry):
+            return rule.rule_id
+    return None
+
+
+def indexed_dispatch(registry: DispatchRuleRegistry, message: IMMessage) -> Optional[str]:
+    indexed_matches = registry.get_dispatch_index().search(message.content)
+    for rule in registry.get_active_rules():
+        if not indexed_matches.is_candidate(rule):
+            continue
+        if rule.match(message, registry.workflow_registry, indexed_matches):
+            return rule.rule_id
+    return None
+
+
+def bench(dispatch, registry: DispatchRuleRegistry, messages: List[IMMessage], runs: int) -> float:
+    for message in messages:
+        dispatch(registry, message)
+    start = time.perf_counter()
+    for _ in range(runs):
+        for message in messages:
+            dispatch(registry, message)
+    return (time.perf_counter() - start) / (runs * len(messages))
+
+
+def main(runs: int):
+    from kirara_ai.logger import logger
+
+    logger.remove()
+    rng = random.Random(42)
+    registry = build_registry(rng)
+    sender = ChatSender.from_c2c_chat("bench", "bench")
+    messages = [
+        IMMessage(sender=sender, message_elements=[TextMessage(" ".join(random_word(rng, 5) for _ in range(length)))])
+        for length in (2, 10, 40)
+        for _ in range(10)
+    ]
+
+    for message in messages:
+        assert linear_dispatch(registry, message) == indexed_dispatch(registry, message)
+
+    linear = bench(linear_dispatch, registry, messages, runs)
+    indexed = bench(indexed_dispatch, registry, messages, runs)
+    print(
+        f"{KEYWORD_COUNT} keywords, {len(registry.get_active_rules())} rules: "
+        f"linear {linear * 1e6:9.1f} us/msg, indexed {indexed * 1e6:9.1f} us/msg, speedup x{linear / indexed:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,99 @@
+"""
+记忆编码格式基准测试，每个作用域 100 条记忆。
+
+对比各编码格式的编码和解码吞吐量：
+- json: 标准库 json，编码时逐个对象调用 MemoryJSONEncoder.default，解码时逐个对象调用 object_hook
+- orjson: orjson，时间由 orjson 直接编码，发送者保存为列表，解码时不需要 object_hook
+
+另外统计用 FileMemoryPersistence 冷启动加载一个作用域的耗时。
+
+用法: python benchmarks/memory_codec_bench.py [runs]
+"""
+import random
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from kirara_ai.im.sender import ChatSender
+from kirara_ai.memory.entry import MemoryEntry
+from kirara_ai.memory.persistences import FileMemoryPersistence
+from kirara_ai.memory.persistences.codecs import CODECS, MemoryCodec, get_codec
+
+ENTRY_COUNT = 100
+SCOPE_KEY = "bench"
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(string.ascii_letters + " ") for _ in range(length))
+
+
+def build_entries(rng: random.Random) -> List[MemoryEntry]:
+    senders = [ChatSender.from_group_chat(f"user{i}", "group", f"User {i}") for i in range(5)]
+    start = datetime(2024, 1, 1, 12, 0)
+    return [
+        MemoryEntry(
+            sender=rng.choice(senders),
+            content=random_text(rng, rng.randint(50, 500)),
+            timestamp=start + timedelta(seconds=i, microseconds=rng.randint(0, 999999)),
+            metadata={"_media_ids": [], "message_id": str(i)},
+        )
+        for i in range(ENTRY_COUNT)
+    ]
+
+
+def bench_encode(codec: MemoryCodec, entries: List[MemoryEntry], runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        for entry in entries:
+            codec.encode(entry)
+    return (time.perf_counter() - start) / runs
+
+
+def bench_decode(codec: MemoryCodec, lines: List[bytes], runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        for line in lines:
+            codec.decode(line)
+    return (time.perf_counter() - start) / runs
+
+
+def bench_load(codec: MemoryCodec, entries: List[MemoryEntry], runs: int) -> float:
+    with tempfile.TemporaryDirectory() as data_dir:
+        FileMemoryPersistence(data_dir, codec=codec).save(SCOPE_KEY, entries)
+        start = time.perf_counter()
+        for _ in range(runs):
+            # 每次使用新的实例，模拟冷启动
+            FileMemoryPersistence(data_dir, codec=codec).load(SCOPE_KEY)
+        return (time.perf_counter() - start) / runs
+
+
+def main(runs: int):
+    from kirara_ai.logger import logger
+
+    logger.remove()
+    rng = random.Random(42)
+    entries = build_entries(rng)
+
+    for name in CODECS:
+        codec = get_codec(name)
+        if codec.name != name:
+            print(f"{name:>7}: not installed")
+            continue
+        lines = [codec.encode(entry) for entry in entries]
+        assert [entry.content for entry in map(codec.decode, lines)] == [entry.content for entry in entries]
+
+        encode = bench_encode(codec, entries, runs)
+        decode = bench_decode(codec, lines, runs)
+        load = bench_load(codec, entries, runs)
+        size = sum(len(line) + 1 for line in lines)
+        print(
+            f"{name:>7}: encode {ENTRY_COUNT / encode:10.0f} entries/s, decode {ENTRY_COUNT / decode:10.0f} entries/s, "
+            f"cold load {load * 1e3:6.2f} ms/scope, {size / 1024:.1f} KiB/scope"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
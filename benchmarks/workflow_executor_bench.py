@@ -0,0 +1,104 @@
+"""
+WorkflowExecutor 单条消息开销基准测试。
+
+对比两种执行方式：
+- legacy: 每次执行创建新的 ThreadPoolExecutor，所有 block 都通过 run_in_executor 执行
+- current: 共享线程池，按拓扑顺序并发调度，轻量 block 在事件循环内直接执行
+
+用法: python benchmarks/workflow_executor_bench.py [runs]
+"""
+import asyncio
+import functools
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from kirara_ai.events.event_bus import EventBus
+from kirara_ai.ioc.container import DependencyContainer
+from kirara_ai.workflow.core.block import Block, BlockRegistry, Input, Output
+from kirara_ai.workflow.core.execution.executor import WorkflowExecutor
+from kirara_ai.workflow.core.workflow import Wire, Workflow
+
+
+class SourceBlock(Block):
+    name = "source"
+    inline = True
+    outputs = {"text": Output("text", "文本", str, "文本")}
+
+    def execute(self) -> Dict[str, Any]:
+        return {"text": "hello"}
+
+
+class UpperBlock(Block):
+    name = "upper"
+    inline = True
+    inputs = {"text": Input("text", "文本", str, "文本")}
+    outputs = {"text": Output("text", "文本", str, "文本")}
+
+    def execute(self, text: str) -> Dict[str, Any]:
+        return {"text": text.upper()}
+
+
+class LegacyWorkflowExecutor(WorkflowExecutor):
+    """模拟改造前的执行方式：每次执行新建线程池，深度优先逐个执行 block"""
+
+    async def run(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor() as executor:
+            entry_blocks = [block for block in self.workflow.blocks if not block.inputs]
+            await self._legacy_execute_nodes(entry_blocks, executor, loop)
+        return self.results
+
+    async def _legacy_execute_nodes(self, blocks, executor, loop):
+        for block in blocks:
+            if not self._can_execute(block):
+                continue
+            inputs = self._gather_inputs(block)
+            self.results[block.name] = await loop.run_in_executor(
+                executor, functools.partial(block.execute, **inputs)
+            )
+            await self._legacy_execute_nodes(self._successors(block), executor, loop)
+
+
+def build_container(length: int) -> DependencyContainer:
+    blocks: list = [SourceBlock(name="b0")]
+    wires = []
+    for i in range(1, length):
+        block = UpperBlock(name=f"b{i}")
+        wires.append(Wire(blocks[-1], "text", block, "text"))
+        blocks.append(block)
+
+    container = DependencyContainer()
+    container.register(DependencyContainer, container)
+    container.register(EventBus, EventBus())
+    container.register(BlockRegistry, BlockRegistry())
+    container.register(Workflow, Workflow(name="bench", blocks=blocks, wires=wires))
+    return container
+
+
+async def bench(executor_class, container: DependencyContainer, runs: int) -> float:
+    # 预热
+    await executor_class(container).run()
+    start = time.perf_counter()
+    for _ in range(runs):
+        await executor_class(container).run()
+    return (time.perf_counter() - start) / runs
+
+
+async def main(runs: int):
+    from kirara_ai.logger import logger
+
+    logger.remove()
+    for length in (3, 10, 30):
+        container = build_container(length)
+        legacy = await bench(LegacyWorkflowExecutor, container, runs)
+        current = await bench(WorkflowExecutor, container, runs)
+        print(
+            f"{length:>3} blocks: legacy {legacy * 1e6:9.1f} us/run, "
+            f"current {current * 1e6:9.1f} us/run, speedup x{legacy / current:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
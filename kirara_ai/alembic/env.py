@@ -17,7 +17,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from kirara_ai.database.manager import Base
-from kirara_ai.tracing.models import LLMRequestTrace  # noqa: F401
+from kirara_ai.tracing.models import LLMRequestTrace, WorkflowBlockSpanRecord, WorkflowExecutionTrace  # noqa: F401
 
 target_metadata = Base.metadata
 
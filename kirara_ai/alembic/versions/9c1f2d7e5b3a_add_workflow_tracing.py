@@ -0,0 +1,69 @@
+"""Add workflow tracing
+
+Revision ID: 9c1f2d7e5b3a
+Revises: 4a364dbb8dab
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1f2d7e5b3a'
+down_revision: Union[str, None] = '4a364dbb8dab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('workflow_execution_traces',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('trace_id', sa.String(length=64), nullable=False),
+    sa.Column('workflow_id', sa.String(length=128), nullable=True),
+    sa.Column('workflow_name', sa.String(length=128), nullable=False),
+    sa.Column('request_time', sa.DateTime(), nullable=False),
+    sa.Column('response_time', sa.DateTime(), nullable=True),
+    sa.Column('duration', sa.Float(), nullable=True),
+    sa.Column('block_count', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_workflow_time', 'workflow_execution_traces', ['workflow_id', 'request_time'], unique=False)
+    op.create_index(op.f('ix_workflow_execution_traces_request_time'), 'workflow_execution_traces', ['request_time'], unique=False)
+    op.create_index(op.f('ix_workflow_execution_traces_trace_id'), 'workflow_execution_traces', ['trace_id'], unique=True)
+    op.create_index(op.f('ix_workflow_execution_traces_workflow_id'), 'workflow_execution_traces', ['workflow_id'], unique=False)
+
+    op.create_table('workflow_block_spans',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('trace_id', sa.String(length=64), nullable=False),
+    sa.Column('workflow_id', sa.String(length=128), nullable=True),
+    sa.Column('block_name', sa.String(length=128), nullable=False),
+    sa.Column('block_type', sa.String(length=128), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('duration', sa.Float(), nullable=False),
+    sa.Column('queue_wait', sa.Float(), nullable=False),
+    sa.Column('gather_time', sa.Float(), nullable=False),
+    sa.Column('output_size', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_block_type_time', 'workflow_block_spans', ['block_type', 'start_time'], unique=False)
+    op.create_index(op.f('ix_workflow_block_spans_start_time'), 'workflow_block_spans', ['start_time'], unique=False)
+    op.create_index(op.f('ix_workflow_block_spans_trace_id'), 'workflow_block_spans', ['trace_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_workflow_block_spans_trace_id'), table_name='workflow_block_spans')
+    op.drop_index(op.f('ix_workflow_block_spans_start_time'), table_name='workflow_block_spans')
+    op.drop_index('idx_block_type_time', table_name='workflow_block_spans')
+    op.drop_table('workflow_block_spans')
+    op.drop_index(op.f('ix_workflow_execution_traces_workflow_id'), table_name='workflow_execution_traces')
+    op.drop_index(op.f('ix_workflow_execution_traces_trace_id'), table_name='workflow_execution_traces')
+    op.drop_index(op.f('ix_workflow_execution_traces_request_time'), table_name='workflow_execution_traces')
+    op.drop_index('idx_workflow_time', table_name='workflow_execution_traces')
+    op.drop_table('workflow_execution_traces')
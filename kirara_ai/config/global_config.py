@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -43,12 +43,18 @@ class MemoryPersistenceConfig(BaseModel):
         default={"host": "localhost", "port": 6379, "db": 0},
         description="Redis持久化配置",
     )
+    codec: str = Field(default="orjson", description="记忆编码格式: json/orjson，orjson 未安装时使用 json，读取时兼容所有格式")
+    flush_interval: float = Field(default=1.0, description="后台写入的间隔（秒）")
+    batch_size: int = Field(default=100, description="每批写入的最大作用域数量")
+    max_pending: int = Field(default=10000, description="等待写入的最大作用域数量，超过时新的写入会等待，0 表示不限制")
 
 
 class MemoryConfig(BaseModel):
     persistence: MemoryPersistenceConfig = MemoryPersistenceConfig()
     max_entries: int = Field(default=100, description="每个作用域最大记忆条目数")
     default_scope: str = Field(default="member", description="默认作用域类型")
+    max_resident_scopes: int = Field(default=1000, description="内存中最多保留的作用域数量，0 表示不限制")
+    max_resident_memory: int = Field(default=64, description="内存中记忆的估算总大小上限（MB），0 表示不限制")
 
 
 class WebConfig(BaseModel):
@@ -93,6 +99,31 @@ class TracingConfig(BaseModel):
     """Tracing 配置"""
     
     llm_tracing_content: bool = Field(default=False, description="是否记录 LLM 请求内容")
+    workflow_tracing: bool = Field(default=True, description="是否记录工作流及其 block 的执行耗时")
+
+class MediaConfig(BaseModel):
+    """媒体配置"""
+
+    metadata_backend: str = Field(default="sqlite", description="媒体元数据存储类型: sqlite/json")
+    download_timeout: float = Field(default=30, description="媒体下载超时时间（秒）")
+    max_connections: int = Field(default=64, description="媒体下载连接池的最大连接数")
+    max_connections_per_host: int = Field(default=8, description="每个主机的最大并发下载数")
+    base64_cache_size: int = Field(default=64, description="媒体 base64 编码缓存大小（MB）")
+    gc_grace_period: float = Field(default=300, description="没有引用的媒体在被回收前保留的时间（秒）")
+    gc_interval: float = Field(default=10, description="媒体垃圾回收的执行间隔（秒）")
+    gc_batch_size: int = Field(default=50, description="媒体垃圾回收每批删除的数量")
+    gc_max_deletes_per_second: float = Field(default=20, description="媒体垃圾回收每秒最多删除的数量")
+    storage_backend: str = Field(default="local", description="媒体文件存储类型: local/s3，s3 需要安装 boto3")
+    compress_files: bool = Field(default=False, description="是否压缩存储文本类媒体文件")
+    file_cache_size: int = Field(
+        default=1024, description="压缩存储或 S3 中的媒体在本地缓存的总大小上限（MB），0 表示不限制"
+    )
+    s3_bucket: str = Field(default="", description="S3 存储桶名称")
+    s3_prefix: str = Field(default="media", description="媒体文件在存储桶中的前缀")
+    s3_endpoint_url: Optional[str] = Field(default=None, description="S3 兼容服务的地址，使用 AWS S3 时留空")
+    s3_access_key: Optional[str] = Field(default=None, description="S3 Access Key")
+    s3_secret_key: Optional[str] = Field(default=None, description="S3 Secret Key")
+    s3_region: Optional[str] = Field(default=None, description="S3 区域")
 
 class GlobalConfig(BaseModel):
     ims: List[IMConfig] = Field(default=[], description="IM配置列表")
@@ -105,5 +136,6 @@ class GlobalConfig(BaseModel):
     frpc: FrpcConfig = FrpcConfig()
     system: SystemConfig = SystemConfig()
     tracing: TracingConfig = TracingConfig()
+    media: MediaConfig = MediaConfig()
 
     model_config = ConfigDict(extra="allow")
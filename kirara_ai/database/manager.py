@@ -65,7 +65,8 @@ class DatabaseManager:
             else:
                 alembic_cfg = Config(alembic_ini_path)
                 
-            alembic_cfg.set_main_option("sqlalchemy.url", str(self.engine.url))
+            # alembic 配置使用 ConfigParser 插值，需要转义 URL 中的 %
+            alembic_cfg.set_main_option("sqlalchemy.url", str(self.engine.url).replace("%", "%%"))
 
             # 检查是否需要迁移
             with self.engine.connect() as connection:
@@ -2,11 +2,12 @@ import asyncio
 import os
 import signal
 import time
+from typing import Optional
 
 from packaging import version
 
 from kirara_ai.config.config_loader import ConfigLoader
-from kirara_ai.config.global_config import GlobalConfig
+from kirara_ai.config.global_config import GlobalConfig, MediaConfig
 from kirara_ai.database import DatabaseManager
 from kirara_ai.events.application import ApplicationStarted, ApplicationStopping
 from kirara_ai.events.event_bus import EventBus
@@ -19,15 +20,17 @@ from kirara_ai.llm.llm_registry import LLMBackendRegistry
 from kirara_ai.logger import get_logger
 from kirara_ai.media import MediaManager
 from kirara_ai.media.carrier import MediaCarrierRegistry, MediaCarrierService
+from kirara_ai.media.storages import MediaStorage, ObjectMediaStorage, create_s3_client
 from kirara_ai.memory.composes import DefaultMemoryComposer, DefaultMemoryDecomposer, MultiElementDecomposer
 from kirara_ai.memory.memory_manager import MemoryManager
 from kirara_ai.memory.scopes import GlobalScope, GroupScope, MemberScope
 from kirara_ai.plugin_manager.plugin_loader import PluginLoader
-from kirara_ai.tracing import LLMTracer, TracingManager
+from kirara_ai.tracing import LLMTracer, TracingManager, WorkflowTracer
 from kirara_ai.web.api.system.utils import get_installed_version, get_latest_pypi_version
 from kirara_ai.web.app import WebServer
 from kirara_ai.workflow.core.block import BlockRegistry
 from kirara_ai.workflow.core.dispatch import DispatchRuleRegistry, WorkflowDispatcher
+from kirara_ai.workflow.core.execution.executor import shutdown_block_executor
 from kirara_ai.workflow.core.workflow import WorkflowRegistry
 from kirara_ai.workflow.implementations.blocks import register_system_blocks
 from kirara_ai.workflow.implementations.workflows import register_system_workflows
@@ -86,6 +89,18 @@ def init_memory_system(container: DependencyContainer):
     container.register(MemoryManager, memory_manager)
     return memory_manager
 
+def create_media_storage(config: MediaConfig) -> Optional[MediaStorage]:
+    """根据配置创建媒体文件存储，使用默认的本地存储时返回 None"""
+    if config.storage_backend == "local":
+        return None
+    if config.storage_backend == "s3":
+        client = create_s3_client(
+            config.s3_endpoint_url, config.s3_access_key, config.s3_secret_key, config.s3_region
+        )
+        return ObjectMediaStorage(client, config.s3_bucket, config.s3_prefix)
+    raise ValueError(f"Unknown media storage backend: {config.storage_backend}")
+
+
 def init_media_carrier(container: DependencyContainer):
     """初始化媒体载体"""
     # 注册记忆管理器作为媒体引用提供者
@@ -105,6 +120,11 @@ def init_tracing_system(container: DependencyContainer):
     container.register(LLMTracer, llm_tracer)
     tracing_manager.register_tracer("llm", llm_tracer)
 
+    # 创建并注册工作流追踪器
+    workflow_tracer = WorkflowTracer(container)
+    container.register(WorkflowTracer, workflow_tracer)
+    tracing_manager.register_tracer("workflow", workflow_tracer)
+
     # 初始化追踪系统
     tracing_manager.initialize()
 
@@ -153,7 +173,23 @@ def init_application() -> DependencyContainer:
     container.register(DatabaseManager, db)
 
     # 注册媒体管理器
-    media_manager = MediaManager()
+    media_manager = MediaManager(
+        metadata_backend=config.media.metadata_backend, storage=create_media_storage(config.media)
+    )
+    media_manager.compress_files = config.media.compress_files
+    media_manager.http_client.configure(
+        timeout=config.media.download_timeout,
+        max_connections=config.media.max_connections,
+        max_connections_per_host=config.media.max_connections_per_host,
+    )
+    media_manager.base64_cache.resize(config.media.base64_cache_size * 1024 * 1024)
+    media_manager.file_cache.resize(config.media.file_cache_size * 1024 * 1024)
+    media_manager.gc.configure(
+        grace_period=config.media.gc_grace_period,
+        interval=config.media.gc_interval,
+        batch_size=config.media.gc_batch_size,
+        max_deletes_per_second=config.media.gc_max_deletes_per_second,
+    )
     container.register(MediaManager, media_manager)
     container.register(MediaCarrierRegistry, MediaCarrierRegistry(container))
     container.register(MediaCarrierService, MediaCarrierService(container, media_manager))
@@ -235,6 +271,10 @@ def run_application(container: DependencyContainer):
     im_manager = container.resolve(IMManager)
     im_manager.start_adapters(loop=loop)
 
+    # 启动媒体垃圾回收，并在后台将旧版平铺存放的媒体文件迁移到分片目录
+    media_manager = container.resolve(MediaManager)
+    media_manager.start(loop)
+
     # 注册信号处理函数
     signal.signal(signal.SIGINT, _signal_handler)
     signal.signal(signal.SIGTERM, _signal_handler)
@@ -258,6 +298,9 @@ def run_application(container: DependencyContainer):
         logger.info("Shutting down memory system...")
         memory_manager.shutdown()
 
+        # 写入未持久化的媒体元数据
+        container.resolve(MediaManager).shutdown()
+
         # 关闭追踪系统
         try:
             tracing_manager = container.resolve(TracingManager)
@@ -284,6 +327,9 @@ def run_application(container: DependencyContainer):
         except Exception as e:
             logger.error(f"Error stopping adapters: {e}")
 
+        # 关闭工作流 Block 执行线程池
+        shutdown_block_executor(wait=False)
+
         # 关闭事件循环
         loop.stop()
         logger.info("Application stopped gracefully")
@@ -0,0 +1,16 @@
+from kirara_ai.workflow.core.execution.span import BlockSpan
+from kirara_ai.workflow.core.workflow.base import Workflow
+
+from .base import TraceEvent
+
+
+class WorkflowBlockSpanEvent(TraceEvent):
+    """工作流中单个 block 执行完成事件，trace_id 为所属工作流执行的追踪ID"""
+
+    def __init__(self, trace_id: str, workflow: Workflow, span: BlockSpan):
+        super().__init__(trace_id)
+        self.workflow = workflow
+        self.span = span
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(trace_id={self.trace_id}, block={self.span.block_name}, duration={self.span.duration:.4f})"
@@ -1,3 +1,4 @@
+import time
 from typing import Any, Dict
 
 from kirara_ai.workflow.core.execution.executor import WorkflowExecutor
@@ -8,6 +9,7 @@ class WorkflowExecutionBegin:
     def __init__(self, workflow: Workflow, executor: WorkflowExecutor):
         self.workflow = workflow
         self.executor = executor
+        self.start_time = getattr(executor, "start_time", time.time())
 
     def __repr__(self):
         return f"{self.__class__.__name__}(workflow={self.workflow}, executor={self.executor})"
@@ -18,5 +20,18 @@ class WorkflowExecutionEnd:
         self.workflow = workflow
         self.executor = executor
         self.results = results
+        self.end_time = time.time()
+        self.start_time = getattr(executor, "start_time", self.end_time)
+        # 工作流执行耗时（秒）
+        self.duration = self.end_time - self.start_time
 
 
+class WorkflowExecutionFail:
+    def __init__(self, workflow: Workflow, executor: WorkflowExecutor, error: Exception):
+        self.workflow = workflow
+        self.executor = executor
+        self.error = error
+        self.end_time = time.time()
+        self.start_time = getattr(executor, "start_time", self.end_time)
+        # 工作流执行耗时（秒）
+        self.duration = self.end_time - self.start_time
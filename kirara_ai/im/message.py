@@ -1,10 +1,17 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional
+
+from typing_extensions import Self
 
 from kirara_ai.im.sender import ChatSender
+from kirara_ai.logger import get_logger
 from kirara_ai.media import MediaManager, MediaType
 
+logger = get_logger("IMMessage")
+
 MIMETYPE_MAPPING = {
     "image": MediaType.IMAGE,
     "audio": MediaType.AUDIO,
@@ -14,6 +21,8 @@ MIMETYPE_MAPPING = {
 
 # 定义消息元素的基类
 class MessageElement(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def to_dict(self):
         pass
@@ -25,6 +34,8 @@ class MessageElement(ABC):
 
 # 定义文本消息元素
 class TextMessage(MessageElement):
+    __slots__ = ("text",)
+
     def __init__(self, text: str):
         self.text = text
 
@@ -40,10 +51,29 @@ class TextMessage(MessageElement):
 
 # 定义媒体消息的基类
 class MediaMessage(MessageElement):
-    
+    """
+    媒体消息的基类。
+
+    未提供 media_id 时不会立即注册媒体，在异步代码中应使用 `await ImageMessage.create(...)`
+    完成注册；否则会在首次访问 media_id 时同步注册，异步方法也会自动完成注册。
+    """
+
+    __slots__ = (
+        "url",
+        "path",
+        "data",
+        "format",
+        "base64_url",
+        "_media_id",
+        "_registration",
+        "_reference_id",
+        "_source",
+        "_description",
+        "_tags",
+        "_media_manager",
+    )
+
     resource_type: Literal["image", "audio", "video", "file"]
-    
-    media_id: str
 
     def __init__(
         self,
@@ -58,6 +88,8 @@ class MediaMessage(MessageElement):
         tags: Optional[List[str]] = None,
         media_manager: Optional[MediaManager] = None,
     ):
+        if not media_id and not any([url, path, data]):
+            raise ValueError("Must provide at least one of url, path, or data")
         self.url = url
         self.path = path
         self.data = data
@@ -68,17 +100,62 @@ class MediaMessage(MessageElement):
         self._tags = tags or []
         self._media_manager = media_manager or MediaManager()
         self.base64_url: Optional[str] = None
-        if media_id:
-            self.media_id = media_id
-            return
+        self._media_id: Optional[str] = media_id or None
+        self._registration: Optional[asyncio.Future] = None
 
-        # 注册媒体文件
+    @classmethod
+    async def create(cls, *args, **kwargs) -> Self:
+        """创建媒体消息并在当前事件循环中完成注册，不会阻塞事件循环"""
+        message = cls(*args, **kwargs)
+        await message.ensure_registered()
+        return message
 
-        # 使用线程创建新的事件循环来阻塞执行媒体注册
-        import asyncio
-        import threading
+    @property
+    def media_id(self) -> str:
+        """媒体ID，尚未注册时会同步完成注册"""
+        if self._media_id is None:
+            self._register_media_sync()
+        assert self._media_id is not None
+        return self._media_id
 
-        # 用于存储线程中的异常
+    @media_id.setter
+    def media_id(self, media_id: str):
+        self._media_id = media_id
+
+    @property
+    def is_registered(self) -> bool:
+        return self._media_id is not None
+
+    async def ensure_registered(self) -> str:
+        """确保媒体已注册并返回媒体ID，并发调用只会注册一次"""
+        if self._media_id is not None:
+            return self._media_id
+        if self._registration is None:
+            self._registration = asyncio.ensure_future(self._register_media())
+            self._registration.add_done_callback(self._on_registration_done)
+        await asyncio.shield(self._registration)
+        assert self._media_id is not None
+        return self._media_id
+
+    def _on_registration_done(self, registration: asyncio.Future) -> None:
+        """注册失败时清除注册任务，以便之后重试"""
+        if (registration.cancelled() or registration.exception() is not None) and self._registration is registration:
+            self._registration = None
+
+    def _register_media_sync(self) -> None:
+        """在同步代码中注册媒体"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 当前线程没有运行中的事件循环（如在工作线程中执行的 block），直接运行
+            asyncio.run(self._register_media())
+            return
+
+        # 当前线程的事件循环正在运行，无法在其中阻塞等待，只能在新线程中注册
+        logger.warning(
+            f"{self.__class__.__name__} is registered synchronously inside a running event loop, "
+            f"use `await {self.__class__.__name__}.create(...)` instead"
+        )
         thread_exception: Optional[Exception] = None
 
         def run_in_new_loop():
@@ -88,14 +165,11 @@ class MediaMessage(MessageElement):
             except Exception as e:
                 thread_exception = e
 
-        # 在新线程中运行异步注册函数
-        thread = threading.Thread(
-            target=run_in_new_loop,
-        )
+        thread = threading.Thread(target=run_in_new_loop)
         thread.start()
-        thread.join()  # 阻塞等待完成
+        thread.join()
 
-        # 如果线程中发生异常，则在主线程中重新抛出
+        # 如果线程中发生异常，则在当前线程中重新抛出
         if thread_exception:
             raise thread_exception
 
@@ -104,7 +178,7 @@ class MediaMessage(MessageElement):
         media_manager = self._media_manager
 
         # 根据传入的参数注册媒体文件
-        self.media_id = await media_manager.register_media(
+        self._media_id = await media_manager.register_media(
             url=self.url,
             path=self.path,
             data=self.data,
@@ -117,16 +191,13 @@ class MediaMessage(MessageElement):
         )
 
         # 获取媒体元数据
-        metadata = media_manager.get_metadata(self.media_id)
+        metadata = media_manager.get_metadata(self._media_id)
         if metadata and metadata.format:
             self.format = metadata.format
-            if metadata.media_type:
-                self.resource_type = metadata.media_type.value
 
     async def get_url(self) -> str:
         """获取媒体资源的URL"""
-        if not self.media_id:
-            raise ValueError("Media not registered")
+        media_id = await self.ensure_registered()
 
         # 如果已经有URL，直接返回
         if self.url:
@@ -134,7 +205,7 @@ class MediaMessage(MessageElement):
 
         # 否则从媒体管理器获取
         media_manager = self._media_manager
-        url = await media_manager.get_url(self.media_id)
+        url = await media_manager.get_url(media_id)
         if url:
             self.url = url  # 缓存结果
             return url
@@ -143,8 +214,7 @@ class MediaMessage(MessageElement):
 
     async def get_path(self) -> str:
         """获取媒体资源的文件路径"""
-        if not self.media_id:
-            raise ValueError("Media not registered")
+        media_id = await self.ensure_registered()
 
         # 如果已经有路径，直接返回
         if self.path and Path(self.path).exists():
@@ -152,7 +222,7 @@ class MediaMessage(MessageElement):
 
         # 否则从媒体管理器获取
         media_manager = self._media_manager
-        file_path = await media_manager.get_file_path(self.media_id)
+        file_path = await media_manager.get_file_path(media_id)
         if file_path:
             self.path = str(file_path)  # 缓存结果
             return self.path
@@ -161,8 +231,7 @@ class MediaMessage(MessageElement):
 
     async def get_data(self) -> bytes:
         """获取媒体资源的二进制数据"""
-        if not self.media_id:
-            raise ValueError("Media not registered")
+        media_id = await self.ensure_registered()
 
         # 如果已经有数据，直接返回
         if self.data:
@@ -170,7 +239,7 @@ class MediaMessage(MessageElement):
 
         # 否则从媒体管理器获取
         media_manager = self._media_manager
-        data = await media_manager.get_data(self.media_id)
+        data = await media_manager.get_data(media_id)
         if data:
             self.data = data  # 缓存结果
             return data
@@ -179,13 +248,12 @@ class MediaMessage(MessageElement):
 
     async def get_base64_url(self) -> str:
         """获取媒体资源的Base64 URL"""
-        if not self.media_id:
-            raise ValueError("Media not registered")
+        media_id = await self.ensure_registered()
         
         if self.base64_url:
             return self.base64_url
 
-        base64_url = await self._media_manager.get_base64_url(self.media_id)
+        base64_url = await self._media_manager.get_base64_url(media_id)
         if base64_url:
             self.base64_url = base64_url
             return base64_url
@@ -194,8 +262,6 @@ class MediaMessage(MessageElement):
 
     def get_description(self) -> str:
         """获取媒体资源的描述"""
-        if not self.media_id:
-            raise ValueError("Media not registered")
         metadata = self._media_manager.get_metadata(self.media_id)
         if metadata:
             return metadata.description or ""
@@ -221,6 +287,8 @@ class MediaMessage(MessageElement):
 
 # 定义语音消息
 class VoiceMessage(MediaMessage):
+    __slots__ = ()
+
     resource_type = "audio"
 
     def to_dict(self):
@@ -234,6 +302,8 @@ class VoiceMessage(MediaMessage):
 
 # 定义图片消息
 class ImageMessage(MediaMessage):
+    __slots__ = ()
+
     resource_type = "image"
 
     def to_dict(self):
@@ -250,6 +320,8 @@ class ImageMessage(MediaMessage):
 # 定义@消息元素
 # :deprecated
 class AtElement(MessageElement):
+    __slots__ = ("user_id", "nickname")
+
     def __init__(self, user_id: str, nickname: str = ""):
         self.user_id = user_id
         self.nickname = nickname
@@ -265,6 +337,8 @@ class AtElement(MessageElement):
 
 # 定义@消息元素
 class MentionElement(MessageElement):
+    __slots__ = ("target",)
+
     def __init__(self, target: ChatSender):
         self.target = target
 
@@ -279,6 +353,7 @@ class MentionElement(MessageElement):
 
 # 定义回复消息元素
 class ReplyElement(MessageElement):
+    __slots__ = ("message_id",)
 
     def __init__(self, message_id: str):
         self.message_id = message_id
@@ -296,6 +371,8 @@ class ReplyElement(MessageElement):
 
 # 定义文件消息元素
 class FileMessage(MediaMessage):
+    __slots__ = ()
+
     resource_type = "file"
 
     def to_dict(self):
@@ -312,6 +389,7 @@ class FileMessage(MediaMessage):
 
 # 定义JSON消息元素
 class JsonMessage(MessageElement):
+    __slots__ = ("data",)
 
     def __init__(self, data: str):
         self.data = data
@@ -328,6 +406,7 @@ class JsonMessage(MessageElement):
 
 # 定义表情消息元素
 class EmojiMessage(MessageElement):
+    __slots__ = ("face_id",)
 
     def __init__(self, face_id: str):
         self.face_id = face_id
@@ -345,6 +424,8 @@ class EmojiMessage(MessageElement):
 
 # 定义视频消息元素
 class VideoMessage(MediaMessage):
+    __slots__ = ()
+
     resource_type = "video"
 
     def to_dict(self):
@@ -359,12 +440,84 @@ class VideoMessage(MediaMessage):
         return f"VideoMessage(media_id={self.media_id}, url={self.url}, path={self.path}, format={self.format})"
 
 
+class MessageElementList(List[MessageElement]):
+    """消息元素列表，内容发生变化时通知所属的消息清除缓存"""
+
+    __slots__ = ("_on_change",)
+
+    def __init__(self, elements: Iterable[MessageElement] = (), on_change: Optional[Callable[[], None]] = None):
+        super().__init__(elements)
+        self._on_change = on_change
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change()
+
+    def __reduce_ex__(self, protocol):
+        # 复制或序列化时退化为普通列表，不携带所属消息的回调
+        return (list, (list(self),))
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self._changed()
+        return result
+
+    def __imul__(self, other):
+        result = super().__imul__(other)
+        self._changed()
+        return result
+
+    def append(self, element: MessageElement):
+        super().append(element)
+        self._changed()
+
+    def extend(self, elements: Iterable[MessageElement]):
+        super().extend(elements)
+        self._changed()
+
+    def insert(self, index, element: MessageElement):
+        super().insert(index, element)
+        self._changed()
+
+    def remove(self, element: MessageElement):
+        super().remove(element)
+        self._changed()
+
+    def pop(self, index=-1) -> MessageElement:
+        element = super().pop(index)
+        self._changed()
+        return element
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
 # 定义消息类
 class IMMessage:
     """
     IM消息类，用于表示一条完整的消息。
     包含发送者信息和消息元素列表。
 
+    content、images、voices 在首次访问时计算并缓存，修改 message_elements 时自动失效。
+    如果直接修改了某个消息元素的属性，需要调用 invalidate_cache。
+
     Attributes:
         sender: 发送者标识
         message_elements: 消息元素列表,可以包含文本、图片、语音等
@@ -375,39 +528,59 @@ class IMMessage:
     """
 
     sender: ChatSender
-    message_elements: List[MessageElement]
     raw_message: Optional[dict]
 
     def __repr__(self):
         return f"IMMessage(sender={self.sender}, message_elements={self.message_elements}, raw_message={self.raw_message})"
 
+    @property
+    def message_elements(self) -> List[MessageElement]:
+        return self._message_elements
+
+    @message_elements.setter
+    def message_elements(self, elements: List[MessageElement]):
+        self._message_elements = MessageElementList(elements, self.invalidate_cache)
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """清除 content、images、voices 的缓存"""
+        self._content: Optional[str] = None
+        self._images: Optional[List[ImageMessage]] = None
+        self._voices: Optional[List[VoiceMessage]] = None
+
     @property
     def content(self) -> str:
         """获取消息的纯文本内容"""
-        content = ""
-        for element in self.message_elements:
-            content += element.to_plain()
-            if isinstance(element, TextMessage):
-                content += "\n"
-        return content.strip()
+        if self._content is None:
+            content = ""
+            for element in self.message_elements:
+                content += element.to_plain()
+                if isinstance(element, TextMessage):
+                    content += "\n"
+            self._content = content.strip()
+        return self._content
 
     @property
     def images(self) -> List[ImageMessage]:
         """获取消息中的所有图片"""
-        return [
-            element
-            for element in self.message_elements
-            if isinstance(element, ImageMessage)
-        ]
+        if self._images is None:
+            self._images = [
+                element
+                for element in self.message_elements
+                if isinstance(element, ImageMessage)
+            ]
+        return list(self._images)
 
     @property
     def voices(self) -> List[VoiceMessage]:
         """获取消息中的所有语音"""
-        return [
-            element
-            for element in self.message_elements
-            if isinstance(element, VoiceMessage)
-        ]
+        if self._voices is None:
+            self._voices = [
+                element
+                for element in self.message_elements
+                if isinstance(element, VoiceMessage)
+            ]
+        return list(self._voices)
 
     def __init__(
         self,
@@ -419,6 +592,18 @@ class IMMessage:
         self.message_elements = message_elements
         self.raw_message = raw_message
 
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "sender": self.sender,
+            "message_elements": list(self.message_elements),
+            "raw_message": self.raw_message,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.sender = state["sender"]
+        self.message_elements = state["message_elements"]
+        self.raw_message = state.get("raw_message")
+
     def to_dict(self):
         return {
             "sender": self.sender,
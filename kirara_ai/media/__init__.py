@@ -3,8 +3,10 @@ from kirara_ai.media.media_object import Media
 from kirara_ai.media.metadata import MediaMetadata
 from kirara_ai.media.types import MediaType
 from kirara_ai.media.utils import detect_mime_type
+from kirara_ai.media.variants import ImageVariantSpec
 
 __all__ = [
+    "ImageVariantSpec",
     "Media",
     "MediaManager",
     "MediaMetadata",
@@ -0,0 +1,193 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+CacheKey = Tuple[str, Optional[str]]
+
+
+class Base64Cache:
+    """
+    媒体 base64 编码结果的 LRU 缓存，按编码后的字节数限制总大小。
+    除原始媒体外，同一媒体的不同衍生版本（variant）也分别缓存。
+    媒体以内容的 SHA1 作为 ID，同一 ID 的内容不会改变，因此只需在媒体删除时失效。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, str]" = OrderedDict()
+        # media_id -> 已缓存的衍生版本，None 表示原始媒体
+        self._variants: Dict[str, Set[Optional[str]]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, media_id: str, variant: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            key = (media_id, variant)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, media_id: str, value: str, variant: Optional[str] = None) -> None:
+        with self._lock:
+            key = (media_id, variant)
+            self._remove(key)
+            # 超过总大小的单个条目不缓存
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = value
+            self._variants.setdefault(media_id, set()).add(variant)
+            self._size += len(value)
+            self._evict()
+
+    def invalidate(self, media_id: str) -> None:
+        """移除媒体及其所有衍生版本的缓存"""
+        with self._lock:
+            for variant in list(self._variants.get(media_id, ())):
+                self._remove((media_id, variant))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._variants.clear()
+            self._size = 0
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _remove(self, key: CacheKey):
+        value = self._entries.pop(key, None)
+        if value is None:
+            return
+        self._size -= len(value)
+        media_id, variant = key
+        variants = self._variants[media_id]
+        variants.discard(variant)
+        if not variants:
+            del self._variants[media_id]
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size": self._size,
+            "max_size": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class LocalFileCache:
+    """
+    压缩存储或不在本地的媒体文件在本地的缓存，按文件大小限制总大小，超出时删除最久未使用的文件。
+    缓存文件按存储 key 存放在 root 下，启动时按修改时间恢复使用顺序。max_bytes 为 0 表示不限制。
+    add 和 discard 会删除文件，应在线程中调用。
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 1024 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        # key -> 文件大小，按使用时间从旧到新排列
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.root.exists():
+            return
+        files = []
+        for path in self.root.rglob("*"):
+            if not path.is_file():
+                continue
+            # 上次运行中断时残留的临时文件
+            if path.name.startswith("."):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path.relative_to(self.root).as_posix(), stat.st_size))
+        with self._lock:
+            for _, key, size in sorted(files):
+                self._entries[key] = size
+                self._size += size
+            self._evict()
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def get(self, key: str) -> Optional[Path]:
+        """返回缓存文件的路径，不在缓存中时返回 None"""
+        with self._lock:
+            if key in self._entries:
+                path = self.path(key)
+                if path.exists():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return path
+                # 文件已被外部删除
+                self._size -= self._entries.pop(key)
+            self.misses += 1
+            return None
+
+    def add(self, key: str, size: int) -> None:
+        """记录已写入 path(key) 的缓存文件，超出总大小时删除最久未使用的其他文件"""
+        with self._lock:
+            self._size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict(keep=key)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._size -= self._entries.pop(key, 0)
+        self.path(key).unlink(missing_ok=True)
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self, keep: Optional[str] = None):
+        if self.max_bytes <= 0:
+            return
+        # 刚写入的文件即使超过总大小也保留，调用者马上要使用它
+        for key in list(self._entries):
+            if self._size <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._size -= self._entries.pop(key)
+            self.path(key).unlink(missing_ok=True)
+            self.evictions += 1
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size": self._size,
+            "max_size": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 
 from kirara_ai.ioc.container import DependencyContainer
 from kirara_ai.media.manager import MediaManager
@@ -14,22 +14,9 @@ class MediaCarrierService:
         self.container = container
         self.media_manager = media_manager
         self.registry = container.resolve(MediaCarrierRegistry)
-        # 引用索引：reference_key -> (provider_name, media_id)
-        self._reference_index: Dict[str, Tuple[str, str]] = {}
-        self._build_reference_index()
-    
-    def _build_reference_index(self) -> None:
-        """构建引用索引"""
-        self._reference_index.clear()
-        
-        # 遍历所有媒体元数据，提取引用信息
-        for media_id, metadata in self.media_manager.metadata_cache.items():
-            for reference_key in metadata.references:
-                # 尝试从引用键中提取提供者名称
-                if ":" in reference_key:
-                    provider_name, _ = reference_key.split(":", 1)
-                    self._reference_index[reference_key] = (provider_name, media_id)
-    
+        # 引用的反向索引（reference_key -> media_id 集合）由 MediaManager 的索引维护，
+        # 与元数据共用同一条写入路径，不需要在这里单独构建和同步
+
     def register_reference(self, media_id: str, provider_name: str, reference_key: str) -> None:
         """注册媒体引用"""
         # 检查媒体是否存在
@@ -41,9 +28,6 @@ class MediaCarrierService:
         
         # 添加引用
         self.media_manager.add_reference(media_id, full_reference_key)
-        
-        # 更新引用索引
-        self._reference_index[full_reference_key] = (provider_name, media_id)
     
     def remove_reference(self, media_id: str, provider_name: str, reference_key: str) -> None:
         """移除媒体引用"""
@@ -56,20 +40,16 @@ class MediaCarrierService:
         
         # 移除引用
         self.media_manager.remove_reference(media_id, full_reference_key)
-        
-        # 更新引用索引
-        if full_reference_key in self._reference_index:
-            del self._reference_index[full_reference_key]
     
     def get_reference_owner(self, reference_key: str) -> Optional[Any]:
         """获取引用所有者"""
-        if reference_key not in self._reference_index:
+        if ":" not in reference_key or not self.media_manager.get_media_ids_by_reference(reference_key):
             return None
         
-        provider_name, _ = self._reference_index[reference_key]
+        provider_name, key = reference_key.split(":", 1)
         try:
             provider = self.registry.get_provider(provider_name)
-            return provider.get_reference_owner(reference_key.split(":", 1)[1])
+            return provider.get_reference_owner(key)
         except (ValueError, IndexError):
             return None
     
@@ -78,23 +58,18 @@ class MediaCarrierService:
         full_reference_key = f"{provider_name}:{reference_key}"
         
         result = []
-        for ref_key, (prov_name, media_id) in self._reference_index.items():
-            if ref_key == full_reference_key:
-                media = self.media_manager.get_media(media_id)
-                if media:
-                    result.append(media)
+        for media_id in self.media_manager.get_media_ids_by_reference(full_reference_key):
+            media = self.media_manager.get_media(media_id)
+            if media:
+                result.append(media)
         
         return result
     
     def get_references_by_media(self, media_id: str) -> List[Tuple[str, str]]:
         """获取媒体的所有引用信息"""
-        if media_id not in self.media_manager.metadata_cache:
-            return []
-        
-        metadata = self.media_manager.metadata_cache[media_id]
         references = []
         
-        for reference_key in metadata.references:
+        for reference_key in self.media_manager.get_references(media_id):
             if ":" in reference_key:
                 provider_name, key = reference_key.split(":", 1)
                 references.append((provider_name, key))
@@ -106,20 +81,15 @@ class MediaCarrierService:
         count = 0
         all_providers = set(self.registry._providers.keys())
         
-        for media_id, metadata in list(self.media_manager.metadata_cache.items()):
-            orphaned_refs = set()
-            
-            for reference_key in metadata.references:
-                if ":" in reference_key:
-                    provider_name, _ = reference_key.split(":", 1)
-                    if provider_name not in all_providers:
-                        orphaned_refs.add(reference_key)
-            
-            # 移除孤立引用
-            for ref in orphaned_refs:
-                self.media_manager.remove_reference(media_id, ref)
-                if ref in self._reference_index:
-                    del self._reference_index[ref]
+        # 只需遍历不同的引用键，而不是所有媒体
+        for reference_key in self.media_manager.get_all_references():
+            if ":" not in reference_key:
+                continue
+            provider_name, _ = reference_key.split(":", 1)
+            if provider_name in all_providers:
+                continue
+            for media_id in self.media_manager.get_media_ids_by_reference(reference_key):
+                self.media_manager.remove_reference(media_id, reference_key)
                 count += 1
         
         return count
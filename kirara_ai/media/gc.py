@@ -0,0 +1,228 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from kirara_ai.logger import get_logger
+from kirara_ai.media.metadata import MediaMetadata
+
+if TYPE_CHECKING:
+    from kirara_ai.media.manager import MediaManager
+
+logger = get_logger("MediaGC")
+
+
+class MediaGarbageCollector:
+    """
+    媒体的增量垃圾回收器。
+    引用计数降为 0 的媒体会被记录到待回收集合中，经过宽限期后仍没有引用才会在后台分批删除，
+    删除时限制每秒删除的数量，避免大量删除占满磁盘 IO。
+    从未被引用的媒体（如注册时没有 reference_id）不会被回收。
+    指定 state_path 时待回收集合会保存到该文件，重启后继续计算宽限期。
+    """
+
+    def __init__(
+        self,
+        media_manager: "MediaManager",
+        state_path: Optional[Path] = None,
+        grace_period: float = 300,
+        interval: float = 10,
+        batch_size: int = 50,
+        max_deletes_per_second: float = 20,
+    ):
+        self.media_manager = media_manager
+        self.state_path = state_path
+        self.grace_period = grace_period
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_deletes_per_second = max_deletes_per_second
+
+        # media_id -> 引用计数降为 0 的时间（time.time()，重启后仍然有效）
+        self._dirty: Dict[str, float] = {}
+        # 待回收集合是否有尚未保存的修改
+        self._changed = False
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.deleted_count = 0
+        self.bytes_reclaimed = 0
+        self.last_run: Optional[float] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def configure(
+        self,
+        grace_period: Optional[float] = None,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_deletes_per_second: Optional[float] = None,
+    ):
+        if grace_period is not None:
+            self.grace_period = grace_period
+        if interval is not None:
+            self.interval = interval
+        if batch_size is not None:
+            self.batch_size = batch_size
+        if max_deletes_per_second is not None:
+            self.max_deletes_per_second = max_deletes_per_second
+
+    def mark(self, media_id: str) -> None:
+        """记录引用计数降为 0 的媒体"""
+        with self._lock:
+            if media_id not in self._dirty:
+                self._dirty[media_id] = time.time()
+                self._changed = True
+
+    def unmark(self, media_id: str) -> None:
+        """媒体重新被引用或已被删除时移出待回收集合"""
+        with self._lock:
+            if self._dirty.pop(media_id, None) is not None:
+                self._changed = True
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """启动后台回收任务，并恢复上次运行时保存的待回收集合"""
+        if self.is_running:
+            return
+        self._load_state()
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._save_state()
+
+    def _load_state(self) -> None:
+        if self.state_path is None or not self.state_path.exists():
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state: Dict[str, float] = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load media garbage collection state: {e}")
+            return
+        with self._lock:
+            for media_id, since in sorted(state.items(), key=lambda item: item[1]):
+                # 已被删除或重新被引用的媒体不再需要回收
+                metadata = self.media_manager.metadata_cache.get(media_id)
+                if metadata is not None and not metadata.references:
+                    self._dirty.setdefault(media_id, since)
+            # 保持按时间排序，_take_expired 依赖该顺序
+            self._dirty = dict(sorted(self._dirty.items(), key=lambda item: item[1]))
+            self._changed = True
+
+    def _save_state(self) -> None:
+        """保存待回收集合，没有修改时跳过"""
+        if self.state_path is None:
+            return
+        with self._lock:
+            if not self._changed:
+                return
+            state = dict(self._dirty)
+            self._changed = False
+        temp_path = self.state_path.parent / f".{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Failed to save media garbage collection state: {e}")
+            with self._lock:
+                self._changed = True
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.collect()
+                await asyncio.to_thread(self._save_state)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.opt(exception=e).error("Media garbage collection failed")
+
+    def _take_expired(self, now: float, limit: int) -> List[str]:
+        # 字典按加入时间排序，过期的媒体总在最前面
+        expired = []
+        with self._lock:
+            for media_id, since in self._dirty.items():
+                if len(expired) >= limit or now - since < self.grace_period:
+                    break
+                expired.append(media_id)
+            for media_id in expired:
+                del self._dirty[media_id]
+            if expired:
+                self._changed = True
+        return expired
+
+    async def collect(self, force: bool = False) -> int:
+        """
+        回收已超过宽限期的媒体
+
+        Args:
+            force: 忽略宽限期，回收所有待回收的媒体
+
+        Returns:
+            int: 本次删除的媒体数量
+        """
+        self.last_run = time.time()
+        deleted = 0
+        registering: List[str] = []
+        while True:
+            now = float("inf") if force else time.time()
+            batch = self._take_expired(now, self.batch_size)
+            if not batch:
+                break
+            started = time.monotonic()
+            removed: List[Tuple[str, MediaMetadata]] = []
+            for media_id in batch:
+                # 宽限期内重新被引用的媒体不删除
+                metadata = self.media_manager.get_metadata(media_id)
+                if metadata is None or metadata.references:
+                    continue
+                # 正在注册同一内容的媒体，等注册完成后再判断
+                if self.media_manager.is_registering(media_id):
+                    registering.append(media_id)
+                    continue
+                self.media_manager._forget_media_deferred(media_id)
+                removed.append((media_id, metadata))
+            # 元数据在事件循环中移除，文件在线程中批量删除，期间重新注册的媒体不会被删除
+            if removed:
+                self.bytes_reclaimed += await asyncio.to_thread(
+                    lambda: sum(self.media_manager._delete_forgotten_files(*item) for item in removed)
+                )
+                self.deleted_count += len(removed)
+                deleted += len(removed)
+            # 按速率限制等待下一批
+            if self.max_deletes_per_second > 0:
+                wait = len(removed) / self.max_deletes_per_second - (time.monotonic() - started)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+        for media_id in registering:
+            self.mark(media_id)
+        if deleted:
+            logger.info(f"Collected {deleted} unreferenced media, {self.pending} pending")
+        return deleted
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "running": self.is_running,
+            "pending": self.pending,
+            "deleted_count": self.deleted_count,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "last_run": self.last_run,
+            "grace_period": self.grace_period,
+        }
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from urllib.parse import urlsplit
+from weakref import WeakKeyDictionary
+
+from kirara_ai.logger import get_logger
+
+if TYPE_CHECKING:
+    from curl_cffi import AsyncSession, Session
+
+T = TypeVar("T")
+
+logger = get_logger("MediaHttpClient")
+
+
+class _LoopState:
+    """一个事件循环使用的连接池、每个主机的并发限制和正在合并的请求"""
+
+    def __init__(self, session: "AsyncSession"):
+        self.session = session
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.inflight: Dict[Hashable, asyncio.Future] = {}
+
+
+class MediaHttpClient:
+    """
+    媒体下载使用的 HTTP 客户端。
+    在事件循环内复用同一个连接池（keep-alive），限制每个主机的并发请求数，
+    并将同一 URL 的并发请求合并为一次。
+    curl_cffi 的异步会话与事件循环绑定，每个事件循环（如工作线程中 asyncio.run 创建的）使用各自的状态，
+    事件循环关闭后对应的会话会被释放。
+    """
+
+    def __init__(self, timeout: float = 30, max_connections: int = 64, max_connections_per_host: int = 8):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+
+        self._states: "WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = WeakKeyDictionary()
+        self._states_lock = threading.Lock()
+
+        # 同步会话不是线程安全的，每个线程使用各自的会话
+        self._local = threading.local()
+        self._sync_sessions: list["Session"] = []
+        self._sync_lock = threading.Lock()
+
+    def configure(
+        self,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_connections_per_host: Optional[int] = None,
+    ):
+        """修改连接池配置，已创建的连接池会在下次请求时按新配置重建"""
+        if timeout is not None:
+            self.timeout = timeout
+        if max_connections is not None:
+            self.max_connections = max_connections
+        if max_connections_per_host is not None:
+            self.max_connections_per_host = max_connections_per_host
+        self.close()
+
+    def _get_state(self) -> _LoopState:
+        from curl_cffi import AsyncSession
+
+        loop = asyncio.get_running_loop()
+        with self._states_lock:
+            state = self._states.get(loop)
+            if state is None:
+                # 已关闭的事件循环无法再关闭会话，直接释放，curl 句柄会在回收时关闭
+                for closed_loop in [other for other in self._states if other.is_closed()]:
+                    del self._states[closed_loop]
+                session = AsyncSession(
+                    loop=loop, trust_env=True, max_clients=self.max_connections, timeout=self.timeout
+                )
+                state = self._states[loop] = _LoopState(session)
+        return state
+
+    def _get_session(self) -> "AsyncSession":
+        return self._get_state().session
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host_semaphores = self._get_state().host_semaphores
+        host = urlsplit(url).netloc
+        semaphore = host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = host_semaphores[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return semaphore
+
+    async def stream(self, url: str) -> AsyncIterator[bytes]:
+        """分块下载，迭代结束前会占用该主机的一个并发名额"""
+        from curl_cffi import Response
+
+        session = self._get_session()
+        async with self._get_host_semaphore(url):
+            resp: Response = await session.get(url, timeout=self.timeout, max_redirects=5, stream=True)
+            try:
+                if resp.status_code != 200:
+                    raise ValueError(f"Failed to download file from {url}, status: {resp.status_code}")
+                async for chunk in resp.aiter_content():
+                    yield chunk
+            finally:
+                await resp.aclose()
+
+    async def fetch(self, url: str) -> bytes:
+        """下载完整内容，同一 URL 的并发请求只会发起一次"""
+        return await self.coalesce(("fetch", url), lambda: self._fetch(url))
+
+    async def _fetch(self, url: str) -> bytes:
+        from curl_cffi import Response
+
+        session = self._get_session()
+        async with self._get_host_semaphore(url):
+            resp: Response = await session.get(url, timeout=self.timeout, max_redirects=5)
+            if resp.status_code != 200:
+                raise ValueError(f"Failed to download file from {url}, status: {resp.status_code}")
+            return resp.content
+
+    async def coalesce(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        合并相同 key 的并发调用，只有第一个调用者会执行 factory，其余调用者等待同一个结果。
+        某个调用者被取消不会影响其他调用者。
+        """
+        inflight = self._get_state().inflight
+        future = inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            inflight[key] = future
+
+            def _done(f: asyncio.Future, key: Hashable = key):
+                if inflight.get(key) is f:
+                    del inflight[key]
+                # 没有调用者等待时也要取走异常，避免未处理异常的警告
+                if not f.cancelled():
+                    f.exception()
+
+            future.add_done_callback(_done)
+        return await asyncio.shield(future)
+
+    def fetch_sync(self, url: str) -> bytes:
+        """同步下载完整内容，每个线程复用各自的连接"""
+        from curl_cffi import Response, Session
+
+        session: Optional[Session] = getattr(self._local, "session", None)
+        if session is None:
+            session = Session(trust_env=True, timeout=self.timeout)
+            self._local.session = session
+            with self._sync_lock:
+                self._sync_sessions.append(session)
+        resp: Response = session.get(url, max_redirects=5)
+        if resp.status_code != 200:
+            raise ValueError(f"Failed to download file from {url}, status: {resp.status_code}")
+        return resp.content
+
+    def close(self):
+        """关闭所有连接池，在事件循环运行中调用时会在后台关闭"""
+        with self._states_lock:
+            states = list(self._states.items())
+            self._states = WeakKeyDictionary()
+        for loop, state in states:
+            if loop.is_closed():
+                continue
+            session = state.session
+            try:
+                if loop.is_running():
+                    loop.call_soon_threadsafe(lambda session=session: asyncio.ensure_future(session.close()))
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception as e:
+                logger.warning(f"Failed to close http session: {e}")
+
+        with self._sync_lock:
+            sync_sessions, self._sync_sessions = self._sync_sessions, []
+        self._local = threading.local()
+        for sync_session in sync_sessions:
+            try:
+                sync_session.close()
+            except Exception as e:
+                logger.warning(f"Failed to close http session: {e}")
+
@@ -0,0 +1,268 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from kirara_ai.media.metadata import MediaMetadata
+from kirara_ai.media.types.media_type import MediaType
+
+
+def _naive(value: datetime) -> datetime:
+    """统一去掉时区信息，避免带时区与不带时区的时间无法比较"""
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+class SubstringIndex:
+    """
+    子串索引，按固定长度的字符 n-gram（默认 3 个字符）建立倒排表。
+    查询时取查询串的 n-gram 求交集得到候选，再逐个确认是否包含查询串，适用于中文等没有分词的文本。
+    短于 n 个字符的查询无法使用倒排表，直接扫描全部文本。
+    """
+
+    def __init__(self, gram: int = 3):
+        self.gram = gram
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._texts: Dict[str, str] = {}
+
+    def _grams(self, text: str) -> Set[str]:
+        n = self.gram
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def set(self, media_id: str, text: Optional[str]):
+        self.remove(media_id)
+        if not text:
+            return
+        text = text.lower()
+        self._texts[media_id] = text
+        for gram in self._grams(text):
+            self._postings[gram].add(media_id)
+
+    def remove(self, media_id: str):
+        text = self._texts.pop(media_id, None)
+        if text is None:
+            return
+        for gram in self._grams(text):
+            postings = self._postings.get(gram)
+            if postings is None:
+                continue
+            postings.discard(media_id)
+            if not postings:
+                del self._postings[gram]
+
+    def search(self, query: str) -> Set[str]:
+        """返回文本中包含查询串（不区分大小写）的媒体 ID"""
+        query = query.lower()
+        if len(query) < self.gram:
+            return {media_id for media_id, text in self._texts.items() if query in text}
+        postings = sorted((self._postings.get(gram, set()) for gram in self._grams(query)), key=len)
+        if not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates &= other
+            if not candidates:
+                return candidates
+        if len(query) == self.gram:
+            return candidates
+        return {media_id for media_id in candidates if query in self._texts[media_id]}
+
+
+class MediaIndex:
+    """
+    媒体元数据的内存二级索引，包括类型、标签、创建时间、描述和来源的子串索引，以及引用的反向索引。
+    元数据对象会被原地修改，因此索引保存一份旧值快照，用于更新时移除旧的索引项。
+    """
+
+    def __init__(self):
+        self._by_type: Dict[Optional[MediaType], Set[str]] = defaultdict(set)
+        self._by_tag: Dict[str, Set[str]] = defaultdict(set)
+        # 按 (创建时间, 媒体 ID) 升序排列
+        self._by_created: List[Tuple[datetime, str]] = []
+        self._descriptions = SubstringIndex()
+        self._sources = SubstringIndex()
+        # reference_id -> 引用该媒体的 media_id 集合，一个引用可以对应多个媒体
+        self._by_reference: Dict[str, Set[str]] = defaultdict(set)
+        # media_id -> (类型, 标签, 创建时间, 描述, 来源, 引用)
+        self._snapshots: Dict[
+            str, Tuple[Optional[MediaType], FrozenSet[str], datetime, Optional[str], Optional[str], FrozenSet[str]]
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def __contains__(self, media_id: str) -> bool:
+        return media_id in self._snapshots
+
+    def clear(self):
+        self.__init__()
+
+    def rebuild(self, metadatas: Iterable[MediaMetadata]):
+        self.clear()
+        for metadata in metadatas:
+            self.update(metadata)
+
+    def update(self, metadata: MediaMetadata):
+        """新增或更新媒体的索引项，只修改发生变化的部分"""
+        media_id = metadata.media_id
+        created_at = _naive(metadata.created_at)
+        snapshot = (
+            metadata.media_type,
+            frozenset(metadata.tags),
+            created_at,
+            metadata.description,
+            metadata.source,
+            frozenset(metadata.references),
+        )
+        old = self._snapshots.get(media_id)
+        if old == snapshot:
+            return
+        old_type, old_tags, old_created_at, old_description, old_source, old_references = (
+            old or (None, frozenset(), None, None, None, frozenset())
+        )
+
+        if old is None or old_type != snapshot[0]:
+            if old is not None:
+                self._discard(self._by_type, old_type, media_id)
+            self._by_type[snapshot[0]].add(media_id)
+
+        for tag in old_tags - snapshot[1]:
+            self._discard(self._by_tag, tag, media_id)
+        for tag in snapshot[1] - old_tags:
+            self._by_tag[tag].add(media_id)
+
+        if old_created_at != created_at:
+            if old_created_at is not None:
+                self._remove_created(old_created_at, media_id)
+            insort(self._by_created, (created_at, media_id))
+
+        if old is None or old_description != snapshot[3]:
+            self._descriptions.set(media_id, snapshot[3])
+        if old is None or old_source != snapshot[4]:
+            self._sources.set(media_id, snapshot[4])
+
+        for reference_id in old_references - snapshot[5]:
+            self._discard(self._by_reference, reference_id, media_id)
+        for reference_id in snapshot[5] - old_references:
+            self._by_reference[reference_id].add(media_id)
+
+        self._snapshots[media_id] = snapshot
+
+    def remove(self, media_id: str):
+        old = self._snapshots.pop(media_id, None)
+        if old is None:
+            return
+        media_type, tags, created_at, _, _, references = old
+        self._discard(self._by_type, media_type, media_id)
+        for tag in tags:
+            self._discard(self._by_tag, tag, media_id)
+        for reference_id in references:
+            self._discard(self._by_reference, reference_id, media_id)
+        self._remove_created(created_at, media_id)
+        self._descriptions.remove(media_id)
+        self._sources.remove(media_id)
+
+    @staticmethod
+    def _discard(index: dict, key, media_id: str):
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.discard(media_id)
+        if not ids:
+            del index[key]
+
+    def _remove_created(self, created_at: datetime, media_id: str):
+        i = bisect_left(self._by_created, (created_at, media_id))
+        if i < len(self._by_created) and self._by_created[i] == (created_at, media_id):
+            del self._by_created[i]
+
+    def by_type(self, media_type: Optional[MediaType]) -> Set[str]:
+        return self._by_type.get(media_type, set())
+
+    def by_tags(self, tags: List[str], match_all: bool = False) -> Set[str]:
+        if not tags:
+            # 与逐个检查的语义一致：空标签列表匹配全部媒体，但不匹配任一标签
+            return set(self._snapshots) if match_all else set()
+        postings = [self._by_tag.get(tag, set()) for tag in tags]
+        if match_all:
+            postings.sort(key=len)
+            return set(postings[0]).intersection(*postings[1:])
+        return set().union(*postings)
+
+    def by_reference(self, reference_id: str) -> Set[str]:
+        return self._by_reference.get(reference_id, set())
+
+    def references_of(self, media_id: str) -> FrozenSet[str]:
+        snapshot = self._snapshots.get(media_id)
+        return snapshot[5] if snapshot else frozenset()
+
+    def all_references(self) -> Iterable[str]:
+        return self._by_reference.keys()
+
+    def by_description(self, query: str) -> Set[str]:
+        return self._descriptions.search(query)
+
+    def by_source(self, query: str) -> Set[str]:
+        return self._sources.search(query)
+
+    def sort_by_created(self, media_ids: Iterable[str], reverse: bool = True) -> List[str]:
+        return sorted(media_ids, key=lambda media_id: (self._snapshots[media_id][2], media_id), reverse=reverse)
+
+    def query(
+        self,
+        media_type: Optional[MediaType] = None,
+        tags: Optional[List[str]] = None,
+        keyword: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[int, List[str]]:
+        """
+        组合查询，结果按创建时间从新到旧排列。
+
+        Returns:
+            Tuple[int, List[str]]: 满足条件的总数，以及 offset 和 limit 对应的一页媒体 ID
+        """
+        offset = max(offset, 0)
+        # 创建时间在范围内的区间
+        lo = bisect_left(self._by_created, (_naive(start_date),)) if start_date else 0
+        hi = bisect_right(self._by_created, (_naive(end_date), "\uffff")) if end_date else len(self._by_created)
+        hi = max(lo, hi)
+
+        candidates: Optional[Set[str]] = None
+        filters: List[Set[str]] = []
+        if media_type is not None:
+            filters.append(self.by_type(media_type))
+        if tags:
+            filters.append(self.by_tags(tags))
+        if keyword:
+            filters.append(self.by_description(keyword) | self.by_source(keyword))
+        if filters:
+            filters.sort(key=len)
+            candidates = set(filters[0]).intersection(*filters[1:])
+
+        if candidates is None:
+            # 没有其他条件时直接在时间索引上分页
+            total = hi - lo
+            end = hi - offset
+            start = end - limit if limit is not None else lo
+            return total, [media_id for _, media_id in reversed(self._by_created[max(start, lo):max(end, lo)])]
+
+        if start_date or end_date:
+            start_bound = self._by_created[lo] if lo < len(self._by_created) else None
+            end_bound = self._by_created[hi - 1] if hi > lo else None
+            if start_bound is None or end_bound is None:
+                return 0, []
+            candidates = {
+                media_id for media_id in candidates
+                if start_bound <= (self._snapshots[media_id][2], media_id) <= end_bound
+            }
+
+        total = len(candidates)
+        if limit is None:
+            return total, self.sort_by_created(candidates)[offset:]
+        page = heapq.nlargest(
+            offset + limit, candidates, key=lambda media_id: (self._snapshots[media_id][2], media_id)
+        )
+        return total, page[offset:]
@@ -1,63 +1,286 @@
 import asyncio
 import base64
+import gzip
 import hashlib
-import json
+import io
+import os
 import shutil
+import threading
+import uuid
+from datetime import datetime
 from pathlib import Path
-from typing import TYPE_CHECKING, Dict, List, Optional
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Set, Tuple
 
 import aiofiles
 
 from kirara_ai.logger import get_logger
+from kirara_ai.media.cache import Base64Cache, LocalFileCache
+from kirara_ai.media.gc import MediaGarbageCollector
+from kirara_ai.media.http_client import MediaHttpClient
+from kirara_ai.media.index import MediaIndex
 from kirara_ai.media.metadata import MediaMetadata
+from kirara_ai.media.metadata_stores import JsonMetadataStore, MediaMetadataStore, SQLiteMetadataStore
+from kirara_ai.media.storages import COMPRESSED_SUFFIX, LocalMediaStorage, MediaStorage, media_key
 from kirara_ai.media.types.media_type import MediaType
 from kirara_ai.media.utils.mime import detect_mime_type
+from kirara_ai.media.variants import THUMBNAIL_VARIANT, ImageVariantSpec, MediaVariantStore, render_image_variant
 
 if TYPE_CHECKING:
     from kirara_ai.im.message import MediaMessage
     from kirara_ai.media.media_object import Media
 
+# 流式读写的块大小
+CHUNK_SIZE = 256 * 1024
+# 检测文件类型时读取的文件头大小
+MIME_SNIFF_SIZE = 8 * 1024
+# 开启压缩时会被压缩存储的格式（文本类等压缩率高的文件）
+COMPRESSIBLE_FORMATS = frozenset({
+    "plain", "json", "csv", "xml", "html", "css", "javascript", "markdown", "x-yaml", "yaml",
+    "svg+xml", "x-python", "x-shellscript", "rtf", "x-tex", "bmp", "x-ndjson",
+})
+# 压缩后的大小不超过原大小的这个比例才会压缩存储
+MAX_COMPRESSION_RATIO = 0.9
+
 
 class MediaManager:
     """媒体管理器，负责媒体文件的注册、引用计数和生命周期管理"""
     
-    def __init__(self, media_dir: str = "data/media"):
+    def __init__(
+        self,
+        media_dir: str = "data/media",
+        metadata_backend: Optional[str] = None,
+        storage: Optional[MediaStorage] = None,
+    ):
+        # MediaManager 是单例，重复构造时如果配置相同则不再重新加载
+        if getattr(self, "_initialized", False):
+            metadata_backend = metadata_backend or self.metadata_backend
+            if (
+                self.media_dir == Path(media_dir)
+                and self.metadata_backend == metadata_backend
+                and (storage is None or storage is self.storage)
+            ):
+                return
+            self.gc.stop()
+            self.metadata_store.close()
+            self.http_client.close()
+            self.storage.close()
+        metadata_backend = metadata_backend or "sqlite"
+
         self.media_dir = Path(media_dir)
         self.metadata_dir = self.media_dir / "metadata"
         self.files_dir = self.media_dir / "files"
+        # 压缩存储或不在本地的文件，需要本地路径时下载到这里
+        self.cache_dir = self.media_dir / "cache"
+        self.metadata_backend = metadata_backend
         self.metadata_cache: Dict[str, MediaMetadata] = {}
+        self.index = MediaIndex()
         self.logger = get_logger("MediaManager")
         self._pending_tasks: set[asyncio.Task] = set()
+        # 主事件循环，后台任务都在其上运行，由 start 设置
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.http_client = MediaHttpClient()
+        self.base64_cache = Base64Cache()
+        self.variants = MediaVariantStore(self.media_dir / "variants")
+        self.gc = MediaGarbageCollector(self, self.media_dir / "gc_pending.json")
+        # 垃圾回收已移除元数据、等待在线程中删除文件的媒体，重新存储或注册时取消删除
+        self._pending_file_deletes: Set[str] = set()
+        # media_id -> 正在进行的注册数量
+        self._registering: Dict[str, int] = {}
+        self._file_delete_lock = threading.Lock()
+        # 不需要生成衍生版本、直接使用原图的 (media_id, spec.key)
+        self._original_variants: Set[Tuple[str, str]] = set()
+        # 是否压缩存储文本类文件
+        self.compress_files = False
+        # 压缩存储或不在本地的文件，需要本地路径时解压或下载到缓存中
+        self.file_cache = LocalFileCache(self.cache_dir)
         
         # 确保目录存在
         self.media_dir.mkdir(parents=True, exist_ok=True)
-        self.metadata_dir.mkdir(parents=True, exist_ok=True)
         self.files_dir.mkdir(parents=True, exist_ok=True)
-        
+
+        # 清理上次运行中断时残留的临时文件
+        for temp_path in self.files_dir.glob(".*.tmp"):
+            temp_path.unlink(missing_ok=True)
+
+        # 临时文件写在 files_dir 中，默认的本地存储也使用该目录，存入时只需重命名
+        self.storage = storage or LocalMediaStorage(self.files_dir)
+        self.metadata_store = self._create_metadata_store(metadata_backend)
+        self._initialized = True
+
         # 加载所有元数据
         self._load_all_metadata()
-        
+
+    def _create_metadata_store(self, metadata_backend: str) -> MediaMetadataStore:
+        """创建元数据存储，使用 SQLite 时会自动迁移旧版的 JSON 元数据"""
+        if metadata_backend == "json":
+            return JsonMetadataStore(self.metadata_dir)
+        if metadata_backend != "sqlite":
+            raise ValueError(f"Unknown media metadata backend: {metadata_backend}")
+
+        store = SQLiteMetadataStore(self.media_dir / "metadata.db")
+        if self.metadata_dir.exists():
+            self._migrate_json_metadata(store)
+        return store
+
+    def _migrate_json_metadata(self, store: SQLiteMetadataStore) -> None:
+        """将旧版每个媒体一个 JSON 文件的元数据迁移到 SQLite，迁移后保留原目录作为备份"""
+        json_store = JsonMetadataStore(self.metadata_dir)
+        if json_store.is_empty():
+            return
+        metadatas = json_store.load_all()
+        self.logger.info(f"Migrating {len(metadatas)} media metadata from JSON to SQLite...")
+        store.save_many(metadatas)
+        backup_dir = self.media_dir / "metadata.migrated"
+        if backup_dir.exists():
+            shutil.rmtree(backup_dir)
+        self.metadata_dir.rename(backup_dir)
+        self.logger.info(f"Media metadata migrated, JSON files are kept in {backup_dir}")
+
     def _load_all_metadata(self) -> None:
         """加载所有媒体元数据"""
         self.metadata_cache.clear()
-        for metadata_file in self.metadata_dir.glob("*.json"):
-            try:
-                with open(metadata_file, "r", encoding="utf-8") as f:
-                    metadata = MediaMetadata.from_dict(json.load(f))
-                    self.metadata_cache[metadata.media_id] = metadata
-            except Exception as e:
-                self.logger.error(f"Failed to load metadata from {metadata_file}: {e}")
+        for metadata in self.metadata_store.load_all():
+            self.metadata_cache[metadata.media_id] = metadata
+        self.index.rebuild(self.metadata_cache.values())
                 
     def _save_metadata(self, metadata: MediaMetadata) -> None:
         """保存媒体元数据"""
-        metadata_path = self.metadata_dir / f"{metadata.media_id}.json"
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(metadata.to_dict(), f, ensure_ascii=False, indent=2)
+        self.metadata_store.save(metadata)
         self.metadata_cache[metadata.media_id] = metadata
-        
-    def _get_file_path(self, media_id: str, format: str) -> Path:
-        """获取媒体文件路径"""
-        return self.files_dir / f"{media_id}.{format}"
+        self.index.update(metadata)
+
+    def flush(self) -> None:
+        """将所有未写入的元数据写入存储"""
+        self.metadata_store.flush()
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """在主事件循环上启动垃圾回收，并在后台将旧版平铺存放的媒体文件迁移到分片目录"""
+        self._loop = loop
+        self.gc.start(loop)
+        self._create_task(self.migrate_storage_layout(), loop=loop)
+
+    def shutdown(self) -> None:
+        """关闭媒体管理器，写入所有未持久化的数据并关闭连接池"""
+        self.gc.stop()
+        self.metadata_store.close()
+        self.http_client.close()
+        self.storage.close()
+
+    async def migrate_storage_layout(self, batch_size: int = 500) -> int:
+        """
+        将旧版平铺存放在 files 目录下的媒体文件分批迁移到分片目录。
+        迁移期间媒体可以正常访问，访问到尚未迁移的文件时会直接将其移动到分片目录。
+
+        Returns:
+            int: 迁移的文件数量
+        """
+        if not isinstance(self.storage, LocalMediaStorage) or not self.storage.has_legacy_files:
+            return 0
+        self.logger.info("Migrating media files to sharded layout...")
+        total = 0
+        while moved := await asyncio.to_thread(self.storage.migrate_legacy_files, batch_size):
+            for old_path, new_path in moved:
+                metadata = self.metadata_cache.get(new_path.name.split(".", 1)[0])
+                if metadata is not None and metadata.path == str(old_path):
+                    metadata.path = str(new_path)
+                    self._save_metadata(metadata)
+            total += len(moved)
+        self.logger.info(f"Migrated {total} media files to sharded layout")
+        return total
+
+    def _storage_keys(self, media_id: str, format: str) -> List[str]:
+        """媒体文件可能使用的存储 key，可压缩的格式优先查找压缩版本"""
+        key = media_key(media_id, format)
+        if format in COMPRESSIBLE_FORMATS:
+            return [key + COMPRESSED_SUFFIX, key]
+        return [key]
+
+    def _find_storage_key(self, media_id: str, format: str) -> Optional[str]:
+        for key in self._storage_keys(media_id, format):
+            if self.storage.exists(key):
+                return key
+        return None
+
+    def _compress_file(self, path: Path) -> Optional[Path]:
+        """压缩到临时文件，压缩效果不明显时返回 None"""
+        temp_path = self.files_dir / f".{uuid.uuid4().hex}.tmp"
+        try:
+            with open(path, "rb") as src, gzip.open(temp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            if temp_path.stat().st_size <= path.stat().st_size * MAX_COMPRESSION_RATIO:
+                return temp_path
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        temp_path.unlink(missing_ok=True)
+        return None
+
+    def _store_file(self, temp_path: Path, media_id: str, format: str) -> Optional[Path]:
+        """
+        将临时文件存入存储，该方法会进行文件 IO，应在线程中调用
+
+        Returns:
+            Optional[Path]: 存储中可以直接访问的本地路径，压缩存储或不在本地时返回 None
+        """
+        self._cancel_file_delete(media_id)
+        key = media_key(media_id, format)
+        if self.compress_files and format in COMPRESSIBLE_FORMATS:
+            compressed_path = self._compress_file(temp_path)
+            if compressed_path is not None:
+                try:
+                    self.storage.put(key + COMPRESSED_SUFFIX, compressed_path)
+                finally:
+                    compressed_path.unlink(missing_ok=True)
+                return None
+        self.storage.put(key, temp_path)
+        return self.storage.local_path(key)
+
+    def _read_storage(self, media_id: str, format: str) -> Optional[bytes]:
+        """从存储中读取文件内容，压缩存储的文件会被解压"""
+        key = self._find_storage_key(media_id, format)
+        if key is None:
+            return None
+        data = self.storage.read(key)
+        return gzip.decompress(data) if key.endswith(COMPRESSED_SUFFIX) else data
+
+    def _download_to_cache(self, key: str, cache_key: str) -> Path:
+        """将存储中的文件解压或下载到本地缓存，缓存超过总大小时删除最久未使用的文件"""
+        cache_path = self.file_cache.path(cache_key)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.parent / f".{uuid.uuid4().hex}.tmp"
+        try:
+            if key.endswith(COMPRESSED_SUFFIX):
+                with gzip.GzipFile(fileobj=io.BytesIO(self.storage.read(key))) as src, open(temp_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            else:
+                self.storage.download(key, temp_path)
+            os.replace(temp_path, cache_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        self.file_cache.add(cache_key, cache_path.stat().st_size)
+        return cache_path
+
+    async def _get_local_file(self, media_id: str, format: str) -> Optional[Path]:
+        """获取存储中媒体文件的本地路径，必要时下载到缓存目录，文件不存在时返回 None"""
+        key = media_key(media_id, format)
+        path = self.storage.local_path(key)
+        if path is not None:
+            return path
+        cache_path = self.file_cache.get(key)
+        if cache_path is not None:
+            return cache_path
+        stored_key = await asyncio.to_thread(self._find_storage_key, media_id, format)
+        if stored_key is None:
+            return None
+        return await asyncio.to_thread(self._download_to_cache, stored_key, key)
+
+    async def _copy_to_storage(self, source_path: Path, media_id: str, format: str) -> None:
+        """将本地文件复制到存储中"""
+        temp_path, _, _, _ = await self._stream_to_temp_file(self._iter_file_chunks(source_path))
+        try:
+            await asyncio.to_thread(self._store_file, temp_path, media_id, format)
+        finally:
+            temp_path.unlink(missing_ok=True)
     
     def _create_task(self, coro, name=None, loop=None):
         """创建后台任务并跟踪它"""
@@ -65,42 +288,151 @@ class MediaManager:
             loop = asyncio.get_event_loop()
         task = asyncio.ensure_future(coro, loop=loop)
         self._pending_tasks.add(task)
-        task.add_done_callback(self._pending_tasks.discard)
+        task.add_done_callback(self._on_task_done)
         return task
+
+    async def _run_in_background(self, coro) -> None:
+        """
+        在主事件循环上运行后台任务。
+        在 asyncio.run 创建的临时事件循环中注册媒体时，循环结束会取消其中的任务，
+        因此将任务转交给正在运行的主事件循环；主事件循环未运行时直接等待任务完成。
+        """
+        current = asyncio.get_running_loop()
+        main_loop = self._loop
+        if main_loop is None or main_loop is current:
+            self._create_task(coro, loop=current)
+        elif main_loop.is_running():
+            main_loop.call_soon_threadsafe(self._create_task, coro, None, main_loop)
+        else:
+            await coro
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._pending_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.opt(exception=task.exception()).error(f"Media background task {task.get_name()} failed")
     
     async def _save_file_async(self, data: bytes, target_path: Path):
         """异步保存文件"""
         async with aiofiles.open(target_path, "wb") as f:
             await f.write(data)
-    
+
+    async def _iter_file_chunks(self, path: Path) -> AsyncIterator[bytes]:
+        """分块读取本地文件"""
+        async with aiofiles.open(path, "rb") as f:
+            while chunk := await f.read(CHUNK_SIZE):
+                yield chunk
+
+    async def _iter_url_chunks(self, url: str) -> AsyncIterator[bytes]:
+        """分块下载文件，不在内存中保存完整内容"""
+        # 如果 url 是 file:// 开头，则直接读取文件
+        if url.startswith("file://"):
+            async for chunk in self._iter_file_chunks(Path(url[7:])):
+                yield chunk
+            return
+        async for chunk in self.http_client.stream(url):
+            yield chunk
+
+    async def _iter_data_chunks(self, data: bytes) -> AsyncIterator[bytes]:
+        """将内存中的数据按块切分，避免一次性写入和计算哈希时阻塞事件循环"""
+        view = memoryview(data)
+        for i in range(0, len(view), CHUNK_SIZE):
+            yield view[i:i + CHUNK_SIZE]
+
+    async def _stream_to_temp_file(self, chunks: AsyncIterator[bytes]) -> Tuple[Path, str, int, bytes]:
+        """
+        将数据流写入 files_dir 下的临时文件，同时计算 SHA1
+
+        Returns:
+            Tuple[Path, str, int, bytes]: (临时文件路径, SHA1, 文件大小, 用于类型检测的文件头)
+        """
+        temp_path = self.files_dir / f".{uuid.uuid4().hex}.tmp"
+        sha1 = hashlib.sha1()
+        size = 0
+        head = bytearray()
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for chunk in chunks:
+                    sha1.update(chunk)
+                    size += len(chunk)
+                    if len(head) < MIME_SNIFF_SIZE:
+                        head += chunk[:MIME_SNIFF_SIZE - len(head)]
+                    await f.write(chunk)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return temp_path, sha1.hexdigest(), size, bytes(head)
+
+    async def _download_to_storage(self, url: str, media_id: str, format: Optional[str] = None) -> Tuple[str, int, bytes]:
+        """
+        流式下载媒体文件，完成后存入存储，同时下载同一 URL 到同一媒体时只会下载和存储一次
+
+        Args:
+            url: 文件URL
+            media_id: 媒体ID
+            format: 媒体格式，为空时根据文件头检测
+
+        Returns:
+            Tuple[str, int, bytes]: (媒体格式, 文件大小, 文件头)
+        """
+        return await self.http_client.coalesce(
+            ("restore", url, media_id, format), lambda: self._fetch_to_storage(url, media_id, format)
+        )
+
+    async def _fetch_to_storage(self, url: str, media_id: str, format: Optional[str]) -> Tuple[str, int, bytes]:
+        temp_path, _, size, head = await self._stream_to_temp_file(self._iter_url_chunks(url))
+        try:
+            if not format:
+                _, _, format = detect_mime_type(data=head)
+            await asyncio.to_thread(self._store_file, temp_path, media_id, format)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return format, size, head
+
+    async def _register_url_file(
+        self, url: str, format: Optional[str]
+    ) -> Tuple[str, int, bytes, Optional[str], Optional[Path]]:
+        """
+        下载 URL 并按内容哈希存入存储，同一 URL 的并发注册只会下载和存储一次，
+        每个调用者各自创建元数据或添加引用。
+
+        Returns:
+            Tuple[str, int, bytes, Optional[str], Optional[Path]]:
+                (媒体ID, 文件大小, 文件头, 媒体格式, 存储中可以直接访问的本地路径)
+        """
+        return await self.http_client.coalesce(
+            ("register", url, format), lambda: self._fetch_url_file(url, format)
+        )
+
+    async def _fetch_url_file(
+        self, url: str, format: Optional[str]
+    ) -> Tuple[str, int, bytes, Optional[str], Optional[Path]]:
+        temp_path, media_id, size, head = await self._stream_to_temp_file(self._iter_url_chunks(url))
+        stored_path = None
+        try:
+            if not format:
+                _, _, format = detect_mime_type(data=head)
+            # 已注册的媒体不需要重新存储，没有格式时由 register_media 报错
+            if format and media_id not in self.metadata_cache:
+                stored_path = await asyncio.to_thread(self._store_file, temp_path, media_id, format)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return media_id, size, head, format, stored_path
+
     async def _download_file_async(self, url: str) -> bytes:
         """异步下载文件"""
-        from curl_cffi import AsyncSession, Response
-
         # 如果 url 是 file:// 开头，则直接返回文件内容
         if url.startswith("file://"):
             async with aiofiles.open(url[7:], "rb") as f:
                 return await f.read()
-        async with AsyncSession(trust_env=True, timeout=30000) as session:
-            resp: Response = await session.get(url, timeout=30,  # 设置超时时间为 30 秒
-            max_redirects=5)
-            if resp.status_code != 200:
-                raise ValueError(f"Failed to download file from {url}, status: {resp.status_code}")
-            return resp.content
+        return await self.http_client.fetch(url)
     
     def _download_file_sync(self, url: str) -> bytes:
         """同步下载文件"""
-        from curl_cffi import Response, Session
-
         # 如果 url 是 file:// 开头，则直接返回文件内容
         if url.startswith("file://"):
             with open(url[7:], "rb") as f:
                 return f.read()
-        with Session() as session:
-            resp: Response = session.get(url)
-            if resp.status_code != 200:
-                raise ValueError(f"Failed to download file from {url}, status: {resp.status_code}")
-            return resp.content
+        return self.http_client.fetch_sync(url)
     
     async def register_media(
         self,
@@ -137,77 +469,93 @@ class MediaManager:
         if not any([url, path, data]):
             raise ValueError("Must provide at least one of url, path, or data")
 
-        # 获取数据
+        # 以流的方式写入临时文件，同时计算 SHA1，内存占用只与块大小有关
         if path:
             file_path = Path(path)
             if not file_path.exists():
                 raise FileNotFoundError(f"File not found: {path}")
+        temp_path: Optional[Path] = None
+        stored_path: Optional[Path] = None
+        try:
+            if path:
+                temp_path, media_id, stream_size, head = await self._stream_to_temp_file(self._iter_file_chunks(file_path))
+            elif url:
+                # 下载和存储由同一 URL 的并发注册共享
+                media_id, stream_size, head, url_format, stored_path = await self._register_url_file(url, format)
+                format = format or url_format
+            else:
+                temp_path, media_id, stream_size, head = await self._stream_to_temp_file(self._iter_data_chunks(data))
+        except Exception as e:
+            self.logger.error(f"Failed to fetch media: {e}", exc_info=True)
+            raise
+
+        # 注册完成前垃圾回收不会移除该媒体，避免删除本次注册存入的文件
+        self._begin_registration(media_id)
+        try:
             try:
-                async with aiofiles.open(file_path, "rb") as f:
-                    data = await f.read()
-            except Exception as e:
-                self.logger.error(f"Failed to read file: {e}", exc_info=True)
-                raise
-        elif url:
-            try:
-                data = await self._download_file_async(url)
-            except Exception as e:
-                self.logger.error(f"Failed to download file: {e}", exc_info=True)
-                raise
+                # 检查是否已存在相同 media_id 的媒体
+                if media_id in self.metadata_cache:
+                    self.logger.info(f"Media already exists: {media_id}")
+                    if reference_id:
+                        self.add_reference(media_id, reference_id)
+                    return media_id
 
-        # 计算 SHA1
-        if data is None:
-            raise ValueError("Unable to fetch data from url or path, please check your input")
-        
-        hash_data = await asyncio.to_thread(hashlib.sha1, data)
-        media_id = hash_data.hexdigest()
+                # 获取数据大小
+                if not size:
+                    size = stream_size
 
-        # 检查是否已存在相同 media_id 的媒体
-        if media_id in self.metadata_cache:
-            self.logger.info(f"Media already exists: {media_id}")
-            return media_id
-
-        # 获取数据大小
-        if not size:
-            size = len(data)
-
-        # 检测文件类型
-        if not media_type or not format:
-            mime_type, detected_media_type, detected_format = detect_mime_type(data=data)
-            media_type = media_type or detected_media_type
-            format = format or detected_format
-
-        # 保存文件
-        if format:
-            target_path = self._get_file_path(media_id, format)
-            try:
-                await self._save_file_async(data, target_path)
-            except Exception as e:
-                self.logger.error(f"Failed to save file: {e}", exc_info=True)
-                raise
-            path = str(target_path)
-        else:
-            raise ValueError("No format detected")
+                # 检测文件类型，只需要文件头
+                if not media_type or not format:
+                    mime_type, detected_media_type, detected_format = detect_mime_type(data=head)
+                    media_type = media_type or detected_media_type
+                    format = format or detected_format
+                if not format:
+                    raise ValueError("No format detected")
+
+                # 存入存储，本地存储只需原子地重命名
+                if temp_path is not None:
+                    try:
+                        stored_path = await asyncio.to_thread(self._store_file, temp_path, media_id, format)
+                    except Exception as e:
+                        self.logger.error(f"Failed to save file: {e}", exc_info=True)
+                        raise
+                path = str(stored_path) if stored_path else None
+            finally:
+                if temp_path is not None:
+                    temp_path.unlink(missing_ok=True)
         
-        # 创建元数据
-        metadata = MediaMetadata(
-            media_id=media_id,
-            media_type=media_type,
-            format=format,
-            size=size,
-            created_at=None,  # 使用默认值
-            source=source,
-            description=description,
-            tags=tags,
-            references=set([reference_id]) if reference_id else set(),
-            url=url,
-            path=path,
-        )
+            # 创建元数据
+            metadata = MediaMetadata(
+                media_id=media_id,
+                media_type=media_type,
+                format=format,
+                size=size,
+                created_at=None,  # 使用默认值
+                source=source,
+                description=description,
+                tags=tags,
+                references=set([reference_id]) if reference_id else set(),
+                url=url,
+                path=path,
+            )
 
-        # 保存元数据
-        self._save_metadata(metadata)
-        self.logger.info(f"Registered media: {media_id}")
+            # 保存元数据
+            self._cancel_file_delete(media_id)
+            self._save_metadata(metadata)
+            self.logger.info(f"Registered media: {media_id}")
+        finally:
+            self._end_registration(media_id)
+
+        # 在后台预先生成缩略图
+        if media_type == MediaType.IMAGE:
+            await self._run_in_background(self._pregenerate_thumbnail(media_id))
         return media_id
+
+    async def _pregenerate_thumbnail(self, media_id: str):
+        try:
+            await self.ensure_image_variant(media_id, THUMBNAIL_VARIANT)
+        except Exception as e:
+            self.logger.warning(f"Failed to generate thumbnail for {media_id}: {e}")
     
     async def register_from_path(
         self, 
@@ -275,9 +623,13 @@ class MediaManager:
         metadata = self.metadata_cache[media_id]
         metadata.references.add(reference_id)
         self._save_metadata(metadata)
+        self.gc.unmark(media_id)
         
     def remove_reference(self, media_id: str, reference_id: str) -> None:
-        """移除引用"""
+        """
+        移除引用。
+        没有引用的媒体会在宽限期后由后台垃圾回收删除；未启动垃圾回收时（如单独使用 MediaManager）立即删除。
+        """
         if media_id not in self.metadata_cache:
             raise ValueError(f"Media not found: {media_id}")
         
@@ -286,34 +638,88 @@ class MediaManager:
             metadata.references.remove(reference_id)
             self._save_metadata(metadata)
             
-            # 如果没有引用了，输出log提醒一下
             if not metadata.references:
-                self.logger.warning(f"No references found for media: {media_id}, file: {metadata.path}")
-                # 删除文件
-                self.delete_media(media_id)
+                if self.gc.is_running:
+                    self.logger.debug(f"No references found for media: {media_id}, scheduled for garbage collection")
+                    self.gc.mark(media_id)
+                else:
+                    self.logger.warning(f"No references found for media: {media_id}, file: {metadata.path}")
+                    self.delete_media(media_id)
     
-    def delete_media(self, media_id: str) -> None:
-        """删除媒体文件和元数据"""
-        if media_id not in self.metadata_cache:
-            return
-        
-        metadata = self.metadata_cache[media_id]
-        
-        # 删除文件
-        if metadata.format:
-            file_path = self._get_file_path(media_id, metadata.format)
-            if file_path.exists():
-                file_path.unlink()
+    def delete_media(self, media_id: str) -> int:
+        """删除媒体文件和元数据，返回释放的字节数"""
+        metadata = self._forget_media(media_id)
+        if metadata is None:
+            return 0
+        return self._delete_media_files(media_id, metadata)
+
+    def _forget_media(self, media_id: str) -> Optional[MediaMetadata]:
+        """删除媒体的元数据，并从缓存和索引中移除"""
+        metadata = self.metadata_cache.pop(media_id, None)
+        if metadata is None:
+            return None
         
         # 删除元数据
-        metadata_path = self.metadata_dir / f"{media_id}.json"
-        if metadata_path.exists():
-            metadata_path.unlink()
+        self.metadata_store.delete(media_id)
         
-        # 从缓存中移除
-        del self.metadata_cache[media_id]
+        # 从缓存和索引中移除
+        self.index.remove(media_id)
+        self.base64_cache.invalidate(media_id)
+        self.gc.unmark(media_id)
+        self._original_variants = {key for key in self._original_variants if key[0] != media_id}
         
         self.logger.info(f"Deleted media: {media_id}")
+        return metadata
+
+    def _forget_media_deferred(self, media_id: str) -> Optional[MediaMetadata]:
+        """删除媒体的元数据，文件之后由 _delete_forgotten_files 在线程中删除"""
+        metadata = self._forget_media(media_id)
+        if metadata is not None:
+            with self._file_delete_lock:
+                self._pending_file_deletes.add(media_id)
+        return metadata
+
+    def _begin_registration(self, media_id: str) -> None:
+        with self._file_delete_lock:
+            self._registering[media_id] = self._registering.get(media_id, 0) + 1
+
+    def _end_registration(self, media_id: str) -> None:
+        with self._file_delete_lock:
+            count = self._registering.pop(media_id, 0) - 1
+            if count > 0:
+                self._registering[media_id] = count
+
+    def is_registering(self, media_id: str) -> bool:
+        """媒体是否正在被注册"""
+        with self._file_delete_lock:
+            return media_id in self._registering
+
+    def _cancel_file_delete(self, media_id: str) -> None:
+        """同一媒体被重新存储或注册，取消尚未执行的文件删除"""
+        with self._file_delete_lock:
+            self._pending_file_deletes.discard(media_id)
+
+    def _delete_forgotten_files(self, media_id: str, metadata: MediaMetadata) -> int:
+        """
+        删除 _forget_media_deferred 移除的媒体文件，返回释放的字节数，该方法会进行文件 IO，应在线程中调用。
+        检查和删除在同一个锁中进行，期间重新存储的文件不会被删除。
+        """
+        with self._file_delete_lock:
+            if media_id not in self._pending_file_deletes or media_id in self._registering:
+                self._pending_file_deletes.discard(media_id)
+                return 0
+            self._pending_file_deletes.discard(media_id)
+            return self._delete_media_files(media_id, metadata)
+
+    def _delete_media_files(self, media_id: str, metadata: MediaMetadata) -> int:
+        """删除媒体文件及其衍生版本，返回释放的字节数"""
+        size = 0
+        if metadata.format:
+            for key in self._storage_keys(media_id, metadata.format):
+                size += self.storage.delete(key)
+            self.file_cache.discard(media_key(media_id, metadata.format))
+        self.variants.delete(media_id)
+        return size
     
     def update_metadata(
         self,
@@ -394,37 +800,32 @@ class MediaManager:
                     
                     _, media_type, format = detect_mime_type(path=str(file_path))
                     
+                    # 复制文件
+                    await self._copy_to_storage(file_path, media_id, format)
+                    
                     # 更新元数据
                     metadata.media_type = media_type
                     metadata.format = format
                     metadata.size = file_path.stat().st_size
                     self._save_metadata(metadata)
                     
-                    # 复制文件
-                    target_path = self._get_file_path(media_id, format)
-                    shutil.copy2(file_path, target_path)
-                    
-                    return target_path
+                    return await self._get_local_file(media_id, format)
                 except Exception as e:
                     self.logger.error(f"Failed to copy media from path: {metadata.path}, error: {e}")
                     return None
-                        # 如果有URL，尝试下载并检测格式
+            # 如果有URL，尝试下载并检测格式
             elif metadata.url:
                 try:
-                    data = await self._download_file_async(metadata.url)
-                    _, media_type, format = detect_mime_type(data=data)
+                    format, size, head = await self._download_to_storage(metadata.url, media_id)
+                    _, media_type, _ = detect_mime_type(data=head)
                     
                     # 更新元数据
                     metadata.media_type = media_type
                     metadata.format = format
-                    metadata.size = len(data)
+                    metadata.size = size
                     self._save_metadata(metadata)
                     
-                    # 保存文件
-                    target_path = self._get_file_path(media_id, format)
-                    await self._save_file_async(data, target_path)
-                    
-                    return target_path
+                    return await self._get_local_file(media_id, format)
                 except Exception as e:
                     self.logger.error(f"Failed to download media from URL: {metadata.url}, error: {e}")
                     return None
@@ -432,16 +833,15 @@ class MediaManager:
             return None
         
         # 检查文件是否存在
-        file_path = self._get_file_path(media_id, metadata.format)
-        if file_path.exists():
+        file_path = await self._get_local_file(media_id, metadata.format)
+        if file_path:
             return file_path
         
         # 如果文件不存在，尝试从URL下载
         if metadata.url:
             try:
-                data = await self._download_file_async(metadata.url)
-                await self._save_file_async(data, file_path)
-                return file_path
+                await self._download_to_storage(metadata.url, media_id, metadata.format)
+                return await self._get_local_file(media_id, metadata.format)
             except Exception as e:
                 self.logger.error(f"Failed to download media from URL: {metadata.url}, error: {e}")
         
@@ -450,8 +850,8 @@ class MediaManager:
             try:
                 source_path = Path(metadata.path)
                 if source_path.exists():
-                    shutil.copy2(source_path, file_path)
-                    return file_path
+                    await self._copy_to_storage(source_path, media_id, metadata.format)
+                    return await self._get_local_file(media_id, metadata.format)
             except Exception as e:
                 self.logger.error(f"Failed to copy media from path: {metadata.path}, error: {e}")
         
@@ -478,6 +878,15 @@ class MediaManager:
         
         metadata = self.metadata_cache[media_id]
         
+        # 优先直接从存储读取，压缩存储或不在本地的文件不需要先写入缓存目录
+        if metadata.format:
+            try:
+                data = await asyncio.to_thread(self._read_storage, media_id, metadata.format)
+                if data is not None:
+                    return data
+            except Exception as e:
+                self.logger.error(f"Failed to read media {media_id} from storage, error: {e}")
+        
         # 尝试从文件读取
         file_path = await self.get_file_path(media_id)
         if file_path:
@@ -508,74 +917,175 @@ class MediaManager:
             return metadata.url
         
         # 尝试生成data URL
-        data = await self.get_data(media_id)
-        if data and metadata.media_type and metadata.format:
-            mime_type = f"{metadata.media_type.value}/{metadata.format}"
-            return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
-        
-        return None
+        return await self.get_base64_url(media_id)
     
+    async def get_base64(self, media_id: str) -> Optional[str]:
+        """获取媒体文件 base64 编码，编码结果会被缓存"""
+        if media_id not in self.metadata_cache:
+            return None
+
+        encoded = self.base64_cache.get(media_id)
+        if encoded is not None:
+            return encoded
+
+        data = await self.get_data(media_id)
+        if not data:
+            return None
+        # 编码较大的文件会阻塞事件循环，放到线程中执行
+        encoded = await asyncio.to_thread(lambda: base64.b64encode(data).decode())
+        # 等待编码期间媒体可能已被删除
+        if media_id in self.metadata_cache:
+            self.base64_cache.put(media_id, encoded)
+        return encoded
+
     async def get_base64_url(self, media_id: str) -> Optional[str]:
         """获取媒体文件 base64 URL"""
         if media_id not in self.metadata_cache:
             return None
         
         metadata = self.metadata_cache[media_id]
+        if not metadata.media_type or not metadata.format:
+            return None
         
-        data = await self.get_data(media_id)
-        if data and metadata.media_type and metadata.format:
-            mime_type = f"{metadata.media_type.value}/{metadata.format}"
-            return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+        encoded = await self.get_base64(media_id)
+        if encoded:
+            return f"data:{metadata.mime_type};base64,{encoded}"
         
         return None
-    
+
+    async def ensure_image_variant(self, media_id: str, spec: ImageVariantSpec) -> Optional[Path]:
+        """
+        确保图片的衍生版本已生成
+
+        Returns:
+            Optional[Path]: 衍生版本的文件路径，非图片或不需要缩小的图片返回 None，此时应使用原始媒体
+        """
+        metadata = self.metadata_cache.get(media_id)
+        if metadata is None or metadata.media_type != MediaType.IMAGE:
+            return None
+        if (media_id, spec.key) in self._original_variants:
+            return None
+
+        path = self.variants.get(media_id, spec)
+        if path is not None:
+            return path
+
+        data = await self.get_data(media_id)
+        if not data:
+            return None
+        rendered = await asyncio.to_thread(render_image_variant, data, spec)
+        if rendered is None:
+            self._original_variants.add((media_id, spec.key))
+            return None
+        # 生成期间媒体可能已被删除
+        if media_id not in self.metadata_cache:
+            return None
+        path = await asyncio.to_thread(self.variants.save, media_id, spec, rendered)
+        self.logger.debug(f"Rendered image variant {spec.key} for {media_id}: {len(data)} -> {len(rendered)} bytes")
+        return path
+
+    async def get_variant_file(self, media_id: str, spec: ImageVariantSpec) -> Optional[Tuple[str, Path]]:
+        """
+        获取图片衍生版本的文件，非图片或不需要缩小的图片返回原始媒体文件
+
+        Returns:
+            Optional[Tuple[str, Path]]: (MIME 类型, 文件路径)
+        """
+        if media_id not in self.metadata_cache:
+            return None
+        path = await self.ensure_image_variant(media_id, spec)
+        if path is not None:
+            return spec.mime_type, path
+        metadata = self.metadata_cache[media_id]
+        path = await self.get_file_path(media_id)
+        return (metadata.mime_type or "application/octet-stream", path) if path else None
+
+    async def get_variant_base64(self, media_id: str, spec: ImageVariantSpec) -> Optional[Tuple[str, str]]:
+        """
+        获取图片衍生版本的 base64 编码，非图片或不需要缩小的图片返回原始媒体
+
+        Args:
+            media_id: 媒体ID
+            spec: 衍生版本参数
+
+        Returns:
+            Optional[Tuple[str, str]]: (MIME 类型, base64 编码)
+        """
+        if media_id not in self.metadata_cache:
+            return None
+        metadata = self.metadata_cache[media_id]
+
+        encoded = self.base64_cache.get(media_id, spec.key)
+        if encoded is not None:
+            return spec.mime_type, encoded
+
+        path = await self.ensure_image_variant(media_id, spec)
+        if path is None:
+            encoded = await self.get_base64(media_id)
+            return (metadata.mime_type or "application/octet-stream", encoded) if encoded else None
+
+        async with aiofiles.open(path, "rb") as f:
+            variant_data = await f.read()
+        encoded = await asyncio.to_thread(lambda: base64.b64encode(variant_data).decode())
+        if media_id in self.metadata_cache:
+            self.base64_cache.put(media_id, encoded, spec.key)
+        return spec.mime_type, encoded
 
     def search_by_tags(self, tags: List[str], match_all: bool = False) -> List[str]:
         """根据标签搜索媒体"""
-        results = []
-        
-        for media_id, metadata in self.metadata_cache.items():
-            if match_all:
-                # 必须匹配所有标签
-                if all(tag in metadata.tags for tag in tags):
-                    results.append(media_id)
-            else:
-                # 匹配任一标签
-                if any(tag in metadata.tags for tag in tags):
-                    results.append(media_id)
-        
-        return results
+        return self.index.sort_by_created(self.index.by_tags(tags, match_all))
     
     def search_by_description(self, query: str) -> List[str]:
         """根据描述搜索媒体"""
-        results = []
-        
-        for media_id, metadata in self.metadata_cache.items():
-            if metadata.description and query.lower() in metadata.description.lower():
-                results.append(media_id)
-        
-        return results
+        return self.index.sort_by_created(self.index.by_description(query))
     
     def search_by_source(self, source: str) -> List[str]:
         """根据来源搜索媒体"""
-        results = []
-        
-        for media_id, metadata in self.metadata_cache.items():
-            if metadata.source and source.lower() in metadata.source.lower():
-                results.append(media_id)
-        
-        return results
+        return self.index.sort_by_created(self.index.by_source(source))
     
     def search_by_type(self, media_type: MediaType) -> List[str]:
         """根据媒体类型搜索媒体"""
-        results = []
-        
-        for media_id, metadata in self.metadata_cache.items():
-            if metadata.media_type == media_type:
-                results.append(media_id)
-        
-        return results
+        return self.index.sort_by_created(self.index.by_type(media_type))
+
+    def query_media(
+        self,
+        media_type: Optional[MediaType] = None,
+        tags: Optional[List[str]] = None,
+        keyword: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Tuple[int, List[str]]:
+        """
+        组合查询媒体，结果按创建时间从新到旧排列
+
+        Args:
+            media_type: 媒体类型
+            tags: 标签，匹配任一标签即可
+            keyword: 关键词，匹配描述或来源
+            start_date: 最早创建时间
+            end_date: 最晚创建时间
+            offset: 跳过的数量
+            limit: 返回的最大数量
+
+        Returns:
+            Tuple[int, List[str]]: 满足条件的总数和当前页的媒体ID
+        """
+        return self.index.query(media_type, tags, keyword, start_date, end_date, offset, limit)
     
+    def get_media_ids_by_reference(self, reference_id: str) -> List[str]:
+        """获取被指定引用所引用的所有媒体ID"""
+        return list(self.index.by_reference(reference_id))
+
+    def get_references(self, media_id: str) -> List[str]:
+        """获取媒体的所有引用"""
+        return list(self.index.references_of(media_id))
+
+    def get_all_references(self) -> List[str]:
+        """获取所有引用"""
+        return list(self.index.all_references())
+
     def get_all_media_ids(self) -> List[str]:
         """获取所有媒体ID"""
         return list(self.metadata_cache.keys())
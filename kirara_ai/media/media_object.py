@@ -1,12 +1,12 @@
-import base64
 from pathlib import Path
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 if TYPE_CHECKING:
     from kirara_ai.im.message import MediaMessage
 from kirara_ai.media.manager import MediaManager
 from kirara_ai.media.metadata import MediaMetadata
 from kirara_ai.media.types.media_type import MediaType
+from kirara_ai.media.variants import ImageVariantSpec
 
 
 class Media:
@@ -93,9 +93,20 @@ class Media:
     
     async def get_base64(self) -> str:
         """获取媒体文件 base64 编码"""
-        data = await self.get_data()
-        assert data is not None, "Media data is None"
-        return base64.b64encode(data).decode()
+        encoded = await self._manager.get_base64(self.media_id)
+        assert encoded is not None, f"Media data not found for {self.media_id}"
+        return encoded
+    
+    async def get_variant_base64(self, spec: ImageVariantSpec) -> Tuple[str, str]:
+        """获取适合发送给模型的图片衍生版本，返回 (MIME 类型, base64 编码)"""
+        variant = await self._manager.get_variant_base64(self.media_id, spec)
+        assert variant is not None, f"Media data not found for {self.media_id}"
+        return variant
+
+    async def get_variant_base64_url(self, spec: ImageVariantSpec) -> str:
+        """获取图片衍生版本的 base64 URL"""
+        mime_type, encoded = await self.get_variant_base64(spec)
+        return f"data:{mime_type};base64,{encoded}"
     
     async def get_url(self) -> str:
         """获取媒体文件URL"""
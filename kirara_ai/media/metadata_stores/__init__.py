@@ -0,0 +1,9 @@
+from .base import MediaMetadataStore
+from .json_store import JsonMetadataStore
+from .sqlite_store import SQLiteMetadataStore
+
+__all__ = [
+    "MediaMetadataStore",
+    "JsonMetadataStore",
+    "SQLiteMetadataStore",
+]
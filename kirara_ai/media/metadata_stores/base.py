@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from kirara_ai.media.metadata import MediaMetadata
+
+
+class MediaMetadataStore(ABC):
+    """媒体元数据存储抽象类"""
+
+    @abstractmethod
+    def load_all(self) -> List[MediaMetadata]:
+        """加载所有媒体元数据"""
+
+    @abstractmethod
+    def save(self, metadata: MediaMetadata) -> None:
+        """保存媒体元数据，实现可以延迟写入"""
+
+    @abstractmethod
+    def delete(self, media_id: str) -> None:
+        """删除媒体元数据"""
+
+    def flush(self) -> None:
+        """确保所有数据都已持久化"""
+
+    def close(self) -> None:
+        """关闭存储，关闭前会写入所有未持久化的数据"""
+        self.flush()
+
+    def is_empty(self) -> bool:
+        """存储中是否没有任何元数据"""
+        return not self.load_all()
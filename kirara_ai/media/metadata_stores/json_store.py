@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+from typing import List
+
+from kirara_ai.logger import get_logger
+from kirara_ai.media.metadata import MediaMetadata
+
+from .base import MediaMetadataStore
+
+logger = get_logger("MediaMetadataStore")
+
+
+class JsonMetadataStore(MediaMetadataStore):
+    """每个媒体一个 JSON 文件的元数据存储，即旧版的存储格式"""
+
+    def __init__(self, metadata_dir: Path):
+        self.metadata_dir = Path(metadata_dir)
+        self.metadata_dir.mkdir(parents=True, exist_ok=True)
+
+    def _get_path(self, media_id: str) -> Path:
+        return self.metadata_dir / f"{media_id}.json"
+
+    def load_all(self) -> List[MediaMetadata]:
+        result = []
+        for metadata_file in self.metadata_dir.glob("*.json"):
+            try:
+                with open(metadata_file, "r", encoding="utf-8") as f:
+                    result.append(MediaMetadata.from_dict(json.load(f)))
+            except Exception as e:
+                logger.error(f"Failed to load metadata from {metadata_file}: {e}")
+        return result
+
+    def save(self, metadata: MediaMetadata) -> None:
+        with open(self._get_path(metadata.media_id), "w", encoding="utf-8") as f:
+            json.dump(metadata.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def delete(self, media_id: str) -> None:
+        metadata_path = self._get_path(media_id)
+        if metadata_path.exists():
+            metadata_path.unlink()
+
+    def is_empty(self) -> bool:
+        return next(self.metadata_dir.glob("*.json"), None) is None
@@ -0,0 +1,240 @@
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, PrimaryKeyConstraint, String, Table, Text,
+                        create_engine, delete, event, func, insert, select)
+
+from kirara_ai.logger import get_logger
+from kirara_ai.media.metadata import MediaMetadata
+from kirara_ai.media.types.media_type import MediaType
+
+from .base import MediaMetadataStore
+
+logger = get_logger("MediaMetadataStore")
+
+# 媒体元数据库独立于主数据库，与媒体文件一起存放在媒体目录中
+metadata_obj = MetaData()
+
+media_table = Table(
+    "media",
+    metadata_obj,
+    Column("media_id", String(64), primary_key=True),
+    Column("media_type", String(16), nullable=True, index=True),
+    Column("format", String(32), nullable=True),
+    Column("size", Integer, nullable=True),
+    Column("created_at", DateTime, nullable=False, index=True),
+    Column("source", String(255), nullable=True, index=True),
+    Column("description", Text, nullable=True),
+    Column("url", Text, nullable=True),
+    Column("path", Text, nullable=True),
+)
+
+media_tags_table = Table(
+    "media_tags",
+    metadata_obj,
+    Column("media_id", String(64), nullable=False),
+    Column("tag", String(255), nullable=False),
+    # 标签在列表中的顺序
+    Column("position", Integer, nullable=False, default=0),
+    PrimaryKeyConstraint("media_id", "tag"),
+    Index("ix_media_tags_tag", "tag"),
+)
+
+media_references_table = Table(
+    "media_references",
+    metadata_obj,
+    Column("media_id", String(64), nullable=False),
+    Column("reference_id", String(255), nullable=False),
+    PrimaryKeyConstraint("media_id", "reference_id"),
+    Index("ix_media_references_reference_id", "reference_id"),
+)
+
+MediaRow = Dict[str, Any]
+
+
+class SQLiteMetadataStore(MediaMetadataStore):
+    """
+    基于 SQLite 的媒体元数据存储。
+    写入会先合并到内存中的待写队列，达到 batch_size 或经过 flush_interval 秒后由后台线程在同一个事务中批量写入。
+    写入数据库时不持有队列锁，保存操作不会被正在进行的写入阻塞。
+    """
+
+    def __init__(self, db_path: Path, batch_size: int = 200, flush_interval: float = 1.0):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.engine = create_engine(
+            f"sqlite:///{self.db_path}",
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(self.engine, "connect", self._on_connect)
+        metadata_obj.create_all(self.engine)
+
+        # 待写入的元数据，值为 None 表示删除
+        self._pending: Dict[str, Optional[Tuple[MediaRow, List[str], List[str]]]] = {}
+        # 正在写入数据库的批次，写入完成前仍视为未持久化
+        self._writing: Dict[str, Optional[Tuple[MediaRow, List[str], List[str]]]] = {}
+        self._lock = threading.RLock()
+        # 保证各批次按取出顺序写入，避免旧批次覆盖新批次
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @staticmethod
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    @staticmethod
+    def _to_rows(metadata: MediaMetadata) -> Tuple[MediaRow, List[str], List[str]]:
+        """在保存时立即复制元数据，避免写入时与调用方的修改发生竞争"""
+        row = {
+            "media_id": metadata.media_id,
+            "media_type": metadata.media_type.value if metadata.media_type else None,
+            "format": metadata.format,
+            "size": metadata.size,
+            "created_at": metadata.created_at,
+            "source": metadata.source,
+            "description": metadata.description,
+            "url": metadata.url,
+            "path": metadata.path,
+        }
+        return row, list(dict.fromkeys(metadata.tags)), list(metadata.references)
+
+    def load_all(self) -> List[MediaMetadata]:
+        self.flush()
+        tags: Dict[str, List[str]] = defaultdict(list)
+        references: Dict[str, set] = defaultdict(set)
+        with self.engine.connect() as conn:
+            for media_id, tag in conn.execute(
+                select(media_tags_table.c.media_id, media_tags_table.c.tag).order_by(
+                    media_tags_table.c.media_id, media_tags_table.c.position
+                )
+            ):
+                tags[media_id].append(tag)
+            for media_id, reference_id in conn.execute(
+                select(media_references_table.c.media_id, media_references_table.c.reference_id)
+            ):
+                references[media_id].add(reference_id)
+
+            result = []
+            for row in conn.execute(select(media_table)).mappings():
+                result.append(MediaMetadata(
+                    media_id=row["media_id"],
+                    media_type=MediaType(row["media_type"]) if row["media_type"] else None,
+                    format=row["format"],
+                    size=row["size"],
+                    created_at=row["created_at"],
+                    source=row["source"],
+                    description=row["description"],
+                    tags=tags.get(row["media_id"], []),
+                    references=references.get(row["media_id"], set()),
+                    url=row["url"],
+                    path=row["path"],
+                ))
+        return result
+
+    def save(self, metadata: MediaMetadata) -> None:
+        self._enqueue(metadata.media_id, self._to_rows(metadata))
+
+    def save_many(self, metadatas: List[MediaMetadata]) -> None:
+        """批量保存元数据，并立即写入"""
+        with self._lock:
+            for metadata in metadatas:
+                self._pending[metadata.media_id] = self._to_rows(metadata)
+        self.flush()
+
+    def delete(self, media_id: str) -> None:
+        self._enqueue(media_id, None)
+
+    def _enqueue(self, media_id: str, rows: Optional[Tuple[MediaRow, List[str], List[str]]]):
+        with self._lock:
+            # 同一媒体的多次修改只保留最后一次
+            self._pending[media_id] = rows
+            if self.flush_interval <= 0:
+                write_now = True
+            else:
+                write_now = False
+                if len(self._pending) >= self.batch_size:
+                    # 达到批量大小时立即在后台线程写入，不阻塞调用方
+                    self._schedule_flush(0)
+                elif self._timer is None:
+                    self._schedule_flush(self.flush_interval)
+        if write_now:
+            self.flush()
+
+    def _schedule_flush(self, delay: float):
+        """调用方需持有 self._lock"""
+        if self._timer is not None:
+            if delay > 0:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            # 只在锁内交换出待写批次，数据库写入在锁外进行
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, {}
+                self._writing = pending
+            try:
+                self._write(pending)
+            except Exception as e:
+                # 写入失败时放回队列，等待下次写入，已有更新的数据不被覆盖
+                with self._lock:
+                    for media_id, rows in pending.items():
+                        self._pending.setdefault(media_id, rows)
+                logger.opt(exception=e).error(f"Failed to flush {len(pending)} media metadata")
+            finally:
+                with self._lock:
+                    self._writing = {}
+
+    def _write(self, pending: Dict[str, Optional[Tuple[MediaRow, List[str], List[str]]]]) -> None:
+        media_ids = list(pending.keys())
+        media_rows: List[MediaRow] = []
+        tag_rows: List[Dict[str, Any]] = []
+        reference_rows: List[Dict[str, Any]] = []
+        for media_id, rows in pending.items():
+            if rows is None:
+                continue
+            media_row, tags, references = rows
+            media_rows.append(media_row)
+            tag_rows.extend(
+                {"media_id": media_id, "tag": tag, "position": position} for position, tag in enumerate(tags)
+            )
+            reference_rows.extend({"media_id": media_id, "reference_id": ref} for ref in references)
+
+        with self.engine.begin() as conn:
+            # SQLite 的参数数量有限，分批删除
+            for i in range(0, len(media_ids), 500):
+                chunk = media_ids[i:i + 500]
+                conn.execute(delete(media_tags_table).where(media_tags_table.c.media_id.in_(chunk)))
+                conn.execute(delete(media_references_table).where(media_references_table.c.media_id.in_(chunk)))
+                conn.execute(delete(media_table).where(media_table.c.media_id.in_(chunk)))
+            if media_rows:
+                conn.execute(insert(media_table), media_rows)
+            if tag_rows:
+                conn.execute(insert(media_tags_table), tag_rows)
+            if reference_rows:
+                conn.execute(insert(media_references_table), reference_rows)
+
+    def close(self) -> None:
+        self.flush()
+        self.engine.dispose()
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            if any(rows is not None for rows in (*self._pending.values(), *self._writing.values())):
+                return False
+        with self.engine.connect() as conn:
+            return not conn.execute(select(func.count()).select_from(media_table)).scalar()
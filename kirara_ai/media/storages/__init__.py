@@ -0,0 +1,13 @@
+from .base import COMPRESSED_SUFFIX, MediaStorage, media_key
+from .local_storage import LocalMediaStorage
+from .object_storage import LocalObjectClient, ObjectMediaStorage, create_s3_client
+
+__all__ = [
+    "COMPRESSED_SUFFIX",
+    "MediaStorage",
+    "media_key",
+    "LocalMediaStorage",
+    "LocalObjectClient",
+    "ObjectMediaStorage",
+    "create_s3_client",
+]
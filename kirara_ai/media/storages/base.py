@@ -0,0 +1,49 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, Optional
+
+# 压缩存储的文件在 key 后追加的后缀
+COMPRESSED_SUFFIX = ".gz"
+
+
+def media_key(media_id: str, format: str) -> str:
+    """
+    媒体文件在存储中的 key，按 SHA1 的前两级分片（ab/cd/abcd....jpg），
+    避免单个目录（或对象存储的单个前缀）下文件过多。
+    """
+    return f"{media_id[:2]}/{media_id[2:4]}/{media_id}.{format}"
+
+
+class MediaStorage(ABC):
+    """媒体文件存储抽象类，文件以 key 标识，key 中的 / 表示层级"""
+
+    @abstractmethod
+    def put(self, key: str, source: Path) -> None:
+        """将本地文件存入存储，调用后 source 可能已被移动"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """文件是否存在"""
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """读取文件内容，文件不存在时抛出 FileNotFoundError"""
+
+    @abstractmethod
+    def download(self, key: str, target: Path) -> None:
+        """将文件写入本地路径，文件不存在时抛出 FileNotFoundError"""
+
+    @abstractmethod
+    def delete(self, key: str) -> int:
+        """删除文件，返回释放的字节数，文件不存在时返回 0"""
+
+    @abstractmethod
+    def iter_keys(self) -> Iterator[str]:
+        """遍历存储中的所有 key"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """可以直接访问的本地文件路径，文件不在本地或不存在时返回 None"""
+        return None
+
+    def close(self) -> None:
+        """关闭存储"""
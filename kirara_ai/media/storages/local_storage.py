@@ -0,0 +1,117 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from kirara_ai.media.storages.base import MediaStorage
+
+
+class LocalMediaStorage(MediaStorage):
+    """
+    本地文件系统存储，文件按 key 存放在 root 下的分片目录中。
+    旧版本将所有文件平铺在 root 下，访问到这些文件时会将其移动到分片目录，
+    也可以通过 migrate_legacy_files 在后台分批迁移。
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._has_legacy_files = self._find_legacy_file() is not None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def _legacy_path(self, key: str) -> Path:
+        return self.root / key.rsplit("/", 1)[-1]
+
+    def _find_legacy_file(self) -> Optional[os.DirEntry]:
+        # 找到一个即可返回，不需要遍历整个目录
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.name.startswith(".") and entry.is_file():
+                    return entry
+        return None
+
+    def _resolve(self, key: str) -> Path:
+        """返回 key 对应的路径，文件仍在旧版平铺目录中时将其移动到分片目录"""
+        path = self._path(key)
+        if not self._has_legacy_files or path.exists():
+            return path
+        legacy_path = self._legacy_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(legacy_path, path)
+        except FileNotFoundError:
+            pass
+        return path
+
+    @property
+    def has_legacy_files(self) -> bool:
+        return self._has_legacy_files
+
+    def migrate_legacy_files(self, batch_size: int = 500) -> List[Tuple[Path, Path]]:
+        """
+        将一批旧版平铺存放的文件移动到分片目录
+
+        Returns:
+            List[Tuple[Path, Path]]: 本批移动的 (原路径, 新路径)，为空表示迁移已完成
+        """
+        if not self._has_legacy_files:
+            return []
+        moved = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if len(moved) >= batch_size:
+                    break
+                # 临时文件以 . 开头
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                media_id = entry.name.split(".", 1)[0]
+                old_path = Path(entry.path)
+                new_path = self.root / media_id[:2] / media_id[2:4] / entry.name
+                try:
+                    new_path.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(old_path, new_path)
+                except FileNotFoundError:
+                    # 已经在访问时被移动
+                    continue
+                moved.append((old_path, new_path))
+        if not moved:
+            self._has_legacy_files = False
+        return moved
+
+    def put(self, key: str, source: Path) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+
+    def exists(self, key: str) -> bool:
+        return self._resolve(key).exists()
+
+    def read(self, key: str) -> bytes:
+        return self._resolve(key).read_bytes()
+
+    def download(self, key: str, target: Path) -> None:
+        shutil.copyfile(self._resolve(key), target)
+
+    def delete(self, key: str) -> int:
+        path = self._resolve(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        # 分片目录数量有限，保留空目录，避免与并发写入同一目录冲突
+        return size
+
+    def iter_keys(self) -> Iterator[str]:
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                path = Path(dirpath) / filename
+                yield path.relative_to(self.root).as_posix()
+
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self._resolve(key)
+        return path if path.exists() else None
@@ -0,0 +1,167 @@
+import io
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from kirara_ai.media.storages.base import MediaStorage
+
+# S3 及兼容服务表示对象不存在的错误码
+NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+def _is_not_found(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    return str(response.get("Error", {}).get("Code")) in NOT_FOUND_CODES
+
+
+class ObjectNotFoundError(Exception):
+    """LocalObjectClient 中对象不存在时抛出的异常，与 botocore 的 ClientError 结构相同"""
+
+    def __init__(self, key: str):
+        super().__init__(f"Object not found: {key}")
+        self.response = {"Error": {"Code": "NoSuchKey", "Message": str(self)}}
+
+
+class LocalObjectClient:
+    """
+    S3 客户端的本地替身，实现 ObjectMediaStorage 用到的 boto3 S3 客户端接口，
+    对象按 {root}/{bucket}/{key} 存放，用于测试或没有对象存储服务的环境。
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def _path(self, bucket: str, key: str) -> Path:
+        return self.root / bucket / key
+
+    def put_object(self, Bucket: str, Key: str, Body: Any) -> Dict[str, Any]:
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.parent / f".{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                if isinstance(Body, (bytes, bytearray, memoryview)):
+                    f.write(Body)
+                else:
+                    shutil.copyfileobj(Body, f)
+            os.replace(temp_path, path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        path = self._path(Bucket, Key)
+        try:
+            return {"Body": io.BytesIO(path.read_bytes()), "ContentLength": path.stat().st_size}
+        except FileNotFoundError:
+            raise ObjectNotFoundError(Key) from None
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        try:
+            return {"ContentLength": self._path(Bucket, Key).stat().st_size}
+        except FileNotFoundError:
+            raise ObjectNotFoundError(Key) from None
+
+    def delete_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        self._path(Bucket, Key).unlink(missing_ok=True)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", ContinuationToken: Optional[str] = None) -> Dict[str, Any]:
+        bucket_dir = self.root / Bucket
+        contents = []
+        for dirpath, _, filenames in os.walk(bucket_dir):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                path = Path(dirpath) / filename
+                key = path.relative_to(bucket_dir).as_posix()
+                if key.startswith(Prefix):
+                    contents.append({"Key": key, "Size": path.stat().st_size})
+        return {"Contents": contents, "IsTruncated": False}
+
+
+class ObjectMediaStorage(MediaStorage):
+    """
+    对象存储，使用 boto3 的 S3 客户端或接口相同的客户端（如 LocalObjectClient）。
+    文件不在本地，需要本地路径时由 MediaManager 下载到缓存目录。
+    """
+
+    def __init__(self, client: Any, bucket: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + key
+
+    def put(self, key: str, source: Path) -> None:
+        with open(source, "rb") as f:
+            self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=f)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+
+    def read(self, key: str) -> bytes:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+        return response["Body"].read()
+
+    def download(self, key: str, target: Path) -> None:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+        with open(target, "wb") as f:
+            shutil.copyfileobj(response["Body"], f)
+
+    def delete(self, key: str) -> int:
+        try:
+            size = self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))["ContentLength"]
+        except Exception as e:
+            if _is_not_found(e):
+                return 0
+            raise
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        return size
+
+    def iter_keys(self) -> Iterator[str]:
+        token = None
+        while True:
+            kwargs = {"Bucket": self.bucket, "Prefix": self.prefix}
+            if token:
+                kwargs["ContinuationToken"] = token
+            response = self.client.list_objects_v2(**kwargs)
+            for item in response.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+            if not response.get("IsTruncated"):
+                break
+            token = response.get("NextContinuationToken")
+
+
+def create_s3_client(endpoint_url: Optional[str], access_key: Optional[str], secret_key: Optional[str], region: Optional[str]):
+    """创建 boto3 的 S3 客户端，需要安装 boto3"""
+    try:
+        import boto3
+    except ImportError as e:
+        raise ImportError("S3 media storage requires boto3, please install it with `pip install boto3`") from e
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url or None,
+        aws_access_key_id=access_key or None,
+        aws_secret_access_key=secret_key or None,
+        region_name=region or None,
+    )
@@ -0,0 +1,110 @@
+import io
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from kirara_ai.logger import get_logger
+
+logger = get_logger("MediaVariant")
+
+
+@dataclass(frozen=True)
+class ImageVariantSpec:
+    """
+    图片衍生版本的参数。
+    长边超过 max_edge 的图片会被等比缩小并转码为指定格式，其余图片直接使用原图。
+    """
+
+    max_edge: int = 2048
+    format: str = "jpeg"
+    quality: int = 85
+
+    def __post_init__(self):
+        if self.format not in ("jpeg", "webp"):
+            raise ValueError(f"Unsupported image variant format: {self.format}")
+
+    @property
+    def key(self) -> str:
+        """用于缓存和文件名的唯一标识"""
+        return f"{self.max_edge}_{self.format}_q{self.quality}"
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.format}"
+
+
+# 媒体管理页面使用的缩略图
+THUMBNAIL_VARIANT = ImageVariantSpec(max_edge=300, format="webp", quality=65)
+
+
+def render_image_variant(data: bytes, spec: ImageVariantSpec) -> Optional[bytes]:
+    """
+    生成图片的衍生版本，不需要处理（尺寸已经足够小、动图或无法识别的图片）时返回 None。
+    该函数会进行图片解码和编码，应在线程中调用。
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            # 动图转码后会丢失动画，保留原图
+            if getattr(img, "is_animated", False):
+                return None
+            # 只读取文件头即可知道尺寸，不需要解码整张图片
+            if max(img.size) <= spec.max_edge:
+                return None
+
+            # 缩小前解码时直接降采样，能大幅减少大图的解码开销
+            img.draft("RGB", (spec.max_edge, spec.max_edge))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((spec.max_edge, spec.max_edge), Image.Resampling.LANCZOS)
+
+            if spec.format == "jpeg" and img.mode != "RGB":
+                # JPEG 不支持透明通道，透明部分以白色填充
+                if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+                    img = img.convert("RGBA")
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    background.paste(img, mask=img.getchannel("A"))
+                    img = background
+                else:
+                    img = img.convert("RGB")
+            elif spec.format == "webp" and img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+            output = io.BytesIO()
+            img.save(output, format=spec.format.upper(), quality=spec.quality, optimize=True)
+            return output.getvalue()
+    except Exception as e:
+        logger.warning(f"Failed to render image variant {spec.key}: {e}")
+        return None
+
+
+class MediaVariantStore:
+    """衍生版本的磁盘缓存，按 variants/{media_id}/{spec.key}.{format} 存放"""
+
+    def __init__(self, variants_dir: Path):
+        self.variants_dir = variants_dir
+
+    def get_path(self, media_id: str, spec: ImageVariantSpec) -> Path:
+        return self.variants_dir / media_id / f"{spec.key}.{spec.format}"
+
+    def get(self, media_id: str, spec: ImageVariantSpec) -> Optional[Path]:
+        path = self.get_path(media_id, spec)
+        return path if path.exists() else None
+
+    def save(self, media_id: str, spec: ImageVariantSpec, data: bytes) -> Path:
+        """写入临时文件后原子地替换，并发生成同一衍生版本时不会读到不完整的文件"""
+        path = self.get_path(media_id, spec)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.parent / f".{uuid.uuid4().hex}.tmp"
+        try:
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return path
+
+    def delete(self, media_id: str) -> None:
+        shutil.rmtree(self.variants_dir / media_id, ignore_errors=True)
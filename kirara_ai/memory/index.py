@@ -0,0 +1,80 @@
+import threading
+from bisect import bisect_left, insort
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from kirara_ai.im.sender import ChatSender
+
+from .entry import MemoryEntry
+from .scopes import MemoryScope
+
+
+class CrossScopeIndex:
+    """
+    跨作用域查询（如全局作用域）使用的列表，按时间预先排序所有已加载作用域中的记忆，
+    查询时仍需逐条判断是否属于作用域，只是省去了合并和排序。
+    普通作用域的查询直接读取对应作用域键的记忆，不经过该列表。
+    多个线程会同时存储记忆，所有操作都在 lock 中进行，
+    MemoryManager 传入自己的锁。
+    """
+
+    def __init__(self, lock: Optional[threading.RLock] = None):
+        self._lock = lock or threading.RLock()
+        self._seq = count()
+        # 按 (时间戳, 序号) 升序排列，序号保证时间相同时按加入顺序排列
+        self._entries: List[Tuple[float, int, MemoryEntry]] = []
+        # (scope_key, id(entry)) -> 排序键
+        self._positions: Dict[Tuple[str, int], Tuple[float, int]] = {}
+        # scope_key -> 该作用域已加入索引的记忆
+        self._scopes: Dict[str, Dict[int, MemoryEntry]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def add(self, scope_key: str, entries: Iterable[MemoryEntry]) -> None:
+        with self._lock:
+            self._add(scope_key, entries)
+
+    def _add(self, scope_key: str, entries: Iterable[MemoryEntry]) -> None:
+        scope_entries = self._scopes.setdefault(scope_key, {})
+        for entry in entries:
+            if (scope_key, id(entry)) in self._positions:
+                continue
+            # 使用时间戳排序，避免带时区与不带时区的时间无法比较
+            position = (entry.timestamp.timestamp(), next(self._seq))
+            item = (*position, entry)
+            # 新记忆通常是最新的，直接追加即可
+            if not self._entries or self._entries[-1][:2] <= position:
+                self._entries.append(item)
+            else:
+                insort(self._entries, item, key=lambda x: x[:2])
+            self._positions[(scope_key, id(entry))] = position
+            scope_entries[id(entry)] = entry
+
+    def remove(self, scope_key: str, entries: Iterable[MemoryEntry]) -> None:
+        with self._lock:
+            self._remove(scope_key, entries)
+
+    def _remove(self, scope_key: str, entries: Iterable[MemoryEntry]) -> None:
+        scope_entries = self._scopes.get(scope_key, {})
+        for entry in entries:
+            position = self._positions.pop((scope_key, id(entry)), None)
+            if position is None:
+                continue
+            scope_entries.pop(id(entry), None)
+            i = bisect_left(self._entries, position, key=lambda x: x[:2])
+            if i < len(self._entries) and self._entries[i][2] is entry:
+                del self._entries[i]
+        if not scope_entries:
+            self._scopes.pop(scope_key, None)
+
+    def drop_scope(self, scope_key: str) -> None:
+        """移除作用域的所有记忆"""
+        with self._lock:
+            self._remove(scope_key, list(self._scopes.get(scope_key, {}).values()))
+
+    def query(self, scope: MemoryScope, sender: ChatSender) -> List[MemoryEntry]:
+        """按时间顺序返回作用域内的记忆"""
+        with self._lock:
+            return [entry for _, _, entry in self._entries if scope.is_in_scope(entry.sender, sender)]
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional, Type
+import threading
+from typing import Dict, List, Optional, Set, Type
 
 from kirara_ai.config.global_config import GlobalConfig
 from kirara_ai.im.sender import ChatSender
@@ -7,12 +8,15 @@ from kirara_ai.ioc.inject import Inject
 from kirara_ai.media.carrier import MediaReferenceProvider
 from kirara_ai.media.carrier.service import MediaCarrierService
 from kirara_ai.memory.persistences.base import AsyncMemoryPersistence, MemoryPersistence
+from kirara_ai.memory.persistences.codecs import get_codec
 from kirara_ai.memory.persistences.file_persistence import FileMemoryPersistence
 from kirara_ai.memory.persistences.redis_persistence import RedisMemoryPersistence
 
 from .composes import MemoryComposer, MemoryDecomposer
 from .entry import MemoryEntry
+from .index import CrossScopeIndex
 from .registry import ComposerRegistry, DecomposerRegistry, ScopeRegistry
+from .residency import MemoryResidency
 from .scopes import MemoryScope
 
 
@@ -43,23 +47,39 @@ class MemoryManager(MediaReferenceProvider[List[MemoryEntry]]):
         else:
             self.persistence = persistence
 
+        # 记忆块在线程池中执行，内存缓存、跨作用域列表和驻留状态都在该锁中修改
+        self._lock = threading.RLock()
         # 内存缓存
         self.memories: Dict[str, List[MemoryEntry]] = {}
+        # 跨作用域查询使用的按时间排序的列表
+        self.cross_scope_index = CrossScopeIndex(self._lock)
+        # 内存中的作用域超过限制时按 LRU 淘汰，淘汰后访问时再从持久化层加载
+        self.residency = MemoryResidency(
+            self.config.max_resident_scopes, self.config.max_resident_memory * 1024 * 1024
+        )
+        # 被淘汰的作用域，其记忆不在跨作用域列表中，跨作用域查询时从持久化层读取
+        self._evicted: Set[str] = set()
 
     def _init_persistence(self):
         """初始化持久化层"""
         persistence_type = self.config.persistence.type
+        codec = get_codec(self.config.persistence.codec)
 
         if persistence_type == "file":
             storage_dir = self.config.persistence.file["storage_dir"]
-            self.persistence = FileMemoryPersistence(storage_dir)
+            self.persistence = FileMemoryPersistence(storage_dir, codec=codec)
         elif persistence_type == "redis":
             redis_config = self.config.persistence.redis
-            self.persistence = RedisMemoryPersistence(**redis_config)
+            self.persistence = RedisMemoryPersistence(**redis_config, codec=codec)
         else:
             raise ValueError(f"Unsupported persistence type: {persistence_type}")
 
-        self.persistence = AsyncMemoryPersistence(self.persistence)
+        self.persistence = AsyncMemoryPersistence(
+            self.persistence,
+            flush_interval=self.config.persistence.flush_interval,
+            batch_size=self.config.persistence.batch_size,
+            max_pending=self.config.persistence.max_pending,
+        )
 
     def register_scope(self, name: str, scope_class: Type[MemoryScope]):
         """注册新的作用域类型"""
@@ -73,55 +93,110 @@ class MemoryManager(MediaReferenceProvider[List[MemoryEntry]]):
         """注册新的解析器"""
         self.decomposer_registry.register(name, decomposer_class)
 
+    def _load_scope(self, scope_key: str) -> List[MemoryEntry]:
+        """获取作用域的记忆，不在内存中时从持久化层加载"""
+        with self._lock:
+            entries = self.memories.get(scope_key)
+            if entries is not None:
+                if scope_key in self.residency:
+                    self.residency.touch(scope_key)
+                return entries
+            entries = self.memories[scope_key] = self.persistence.load(scope_key)
+            self._evicted.discard(scope_key)
+            self.cross_scope_index.add(scope_key, entries)
+            self.residency.add(scope_key, entries)
+            self._evict(keep=scope_key)
+            return entries
+
+    def _evict(self, keep: str) -> None:
+        """
+        作用域数量或大小超过限制时按 LRU 淘汰作用域。
+        优先淘汰已经写入持久化层的作用域，仍不足时先写入尚未持久化的作用域再淘汰。
+        """
+        with self._lock:
+            if not self.residency.is_over_limit():
+                return
+            async_persistence = self.persistence if isinstance(self.persistence, AsyncMemoryPersistence) else None
+            for write_back in (False, True):
+                for scope_key in self.residency.candidates():
+                    if not self.residency.is_over_limit():
+                        return
+                    if scope_key == keep:
+                        continue
+                    if async_persistence is not None and async_persistence.is_dirty(scope_key):
+                        if not write_back:
+                            continue
+                        async_persistence.write_back(scope_key)
+                        self.residency.write_backs += 1
+                    self.memories.pop(scope_key, None)
+                    self.cross_scope_index.drop_scope(scope_key)
+                    self._evicted.add(scope_key)
+                    self.residency.remove(scope_key)
+                    self.residency.evictions += 1
+
     def store(self, scope: MemoryScope, entry: MemoryEntry) -> None:
         """存储新的记忆"""
-        scope_key = scope.get_scope_key(entry.sender)
-
-        if scope_key not in self.memories:
-            self.memories[scope_key] = self.persistence.load(scope_key)
-
-        self.memories[scope_key].append(entry)
-        self._register_media_reference(entry, scope_key)
-
-        # 限制记忆条目数量
-        if len(self.memories[scope_key]) > self.config.max_entries:
-            # 移除旧记忆的媒体引用
-            removed_entries = self.memories[scope_key][:-self.config.max_entries]
-            unremoved_entries = self.memories[scope_key][-self.config.max_entries:]
-            self._remove_media_references(removed_entries, unremoved_entries, scope_key)
+        with self._lock:
+            scope_key = scope.get_scope_key(entry.sender)
+
+            self._load_scope(scope_key).append(entry)
+            self.cross_scope_index.add(scope_key, [entry])
+            self.residency.grow(scope_key, added=[entry])
+            self._register_media_reference(entry, scope_key)
+
+            # 限制记忆条目数量
+            if len(self.memories[scope_key]) > self.config.max_entries:
+                # 移除旧记忆的媒体引用
+                removed_entries = self.memories[scope_key][:-self.config.max_entries]
+                unremoved_entries = self.memories[scope_key][-self.config.max_entries:]
+                self._remove_media_references(removed_entries, unremoved_entries, scope_key)
+                self.cross_scope_index.remove(scope_key, removed_entries)
+                self.residency.grow(scope_key, removed=removed_entries)
                 
-            # 裁剪记忆列表
-            self.memories[scope_key] = unremoved_entries
+                # 裁剪记忆列表
+                self.memories[scope_key] = unremoved_entries
 
-        self.persistence.save(scope_key, self.memories[scope_key])
+            # 持久化层只追加新记忆，并按相同的条数限制裁剪
+            self.persistence.append(scope_key, [entry], self.config.max_entries)
+            self._evict(keep=scope_key)
 
     def query(self, scope: MemoryScope, sender: ChatSender) -> List[MemoryEntry]:
-        """查询历史记忆"""
-        relevant_memories = []
-        scope_key = scope.get_scope_key(sender)
+        """查询历史记忆，结果按时间排序"""
+        with self._lock:
+            entries = self._load_scope(scope.get_scope_key(sender))
 
-        if scope_key not in self.memories:
-            self.memories[scope_key] = self.persistence.load(scope_key)
+            # 跨作用域的查询使用按时间排序的列表
+            if scope.cross_scope:
+                return self._query_cross_scope(scope, sender)
 
-        # 遍历所有记忆，找出作用域内的记忆
-        for scope_key, entries in self.memories.items():
+            # 记忆按存储顺序追加，本身就是按时间排列的
+            return [entry for entry in entries if scope.is_in_scope(entry.sender, sender)]
 
-            for entry in entries:
-                if scope.is_in_scope(entry.sender, sender):
-                    relevant_memories.append(entry)
-
-        # 按时间排序
-        relevant_memories.sort(key=lambda x: x.timestamp)
-        return relevant_memories
+    def _query_cross_scope(self, scope: MemoryScope, sender: ChatSender) -> List[MemoryEntry]:
+        """
+        跨作用域查询，包括已被淘汰的作用域。
+        被淘汰的作用域只读取用于本次查询，不重新驻留，避免一次全局查询把所有作用域都加载回内存。
+        """
+        result = self.cross_scope_index.query(scope, sender)
+        evicted = [
+            entry
+            for scope_key in self._evicted
+            for entry in self.persistence.load(scope_key)
+            if scope.is_in_scope(entry.sender, sender)
+        ]
+        if not evicted:
+            return result
+        # 与跨作用域列表相同，按时间戳排序，时间相同时保持原有顺序
+        return sorted(result + evicted, key=lambda entry: entry.timestamp.timestamp())
 
     def shutdown(self):
         """关闭记忆系统，确保数据持久化"""
-        # 保存所有内存中的数据
-        for scope_key, entries in self.memories.items():
-            self.persistence.save(scope_key, entries)
-        # 执行持久化层的stop操作
+        # 新记忆在存储时已经追加到持久化层，不需要重新保存内存中的作用域
         if isinstance(self.persistence, AsyncMemoryPersistence):
+            # 写入所有尚未写入的操作
             self.persistence.stop()
+        else:
+            self.persistence.flush()
 
     def clear_memory(self, scope: MemoryScope, sender: ChatSender) -> None:
         """清空指定作用域和发送者的记忆
@@ -130,20 +205,22 @@ class MemoryManager(MediaReferenceProvider[List[MemoryEntry]]):
             scope: 记忆作用域
             sender: 发送者标识
         """
-        scope_key = scope.get_scope_key(sender)
-        # 移除媒体引用
-        self._remove_media_references(self.memories[scope_key], [], scope_key)
-        # 清空内存中的记录
-        self.memories[scope_key] = []
-
-        # 保存空记录到持久化层
-        self.persistence.save(scope_key, [])
+        with self._lock:
+            scope_key = scope.get_scope_key(sender)
+            # 移除媒体引用
+            self._remove_media_references(self._load_scope(scope_key), [], scope_key)
+            # 清空内存中的记录
+            self.cross_scope_index.drop_scope(scope_key)
+            self.memories[scope_key] = []
+            self.residency.resize(scope_key, 0)
+
+            # 保存空记录到持久化层
+            self.persistence.save(scope_key, [])
 
     def get_reference_owner(self, reference_key: str) -> Optional[List[MemoryEntry]]:
         """获取引用所有者"""
-        if reference_key not in self.memories:
-                self.memories[reference_key] = self.persistence.load(reference_key)
-        return self.memories.get(reference_key)
+        with self._lock:
+            return self._load_scope(reference_key)
     
     def _register_media_reference(self, entry: MemoryEntry, reference_key: str) -> None:
         """注册媒体引用"""
@@ -1,4 +1,4 @@
-from .base import AsyncMemoryPersistence, MemoryPersistence
+from .base import AsyncMemoryPersistence, MemoryPersistence, WriteOp
 from .file_persistence import FileMemoryPersistence
 from .redis_persistence import RedisMemoryPersistence
 
@@ -7,5 +7,6 @@ __all__ = [
     "AsyncMemoryPersistence",
     "FileMemoryPersistence",
     "RedisMemoryPersistence",
+    "WriteOp",
     "codecs",
 ]
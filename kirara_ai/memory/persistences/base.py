@@ -1,7 +1,9 @@
 import threading
+import time
 from abc import ABC, abstractmethod
-from queue import Empty, Queue
-from typing import List, Tuple
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 from kirara_ai.logger import get_logger
 from kirara_ai.memory.entry import MemoryEntry
@@ -18,42 +20,262 @@ class MemoryPersistence(ABC):
     def load(self, scope_key: str) -> List[MemoryEntry]:
         pass
 
+    def append(self, scope_key: str, entries: List[MemoryEntry], max_entries: Optional[int] = None) -> None:
+        """
+        追加新的记忆，max_entries 不为空时只保留最后 max_entries 条。
+        默认实现读取全部记忆后整体保存，支持追加写入的实现应覆盖该方法。
+        """
+        all_entries = self.load(scope_key) + entries
+        if max_entries is not None:
+            all_entries = all_entries[-max_entries:] if max_entries > 0 else []
+        self.save(scope_key, all_entries)
+
+    def write_batch(self, batch: Sequence[Tuple[str, "WriteOp"]]) -> None:
+        """
+        按顺序写入一批操作，默认逐个写入。
+        支持批量提交的实现（如 Redis 管道）应覆盖该方法。
+        """
+        for scope_key, op in batch:
+            if op.kind == "append":
+                self.append(scope_key, list(op.entries), op.max_entries)
+            else:
+                self.save(scope_key, list(op.entries))
+
     @abstractmethod
     def flush(self) -> None:
         """确保所有数据都已持久化"""
 
+class WriteOp(NamedTuple):
+    """待写入的操作，kind 为 save（整体保存）或 append（追加），entries 是提交时的快照"""
+
+    kind: str
+    entries: Tuple[MemoryEntry, ...]
+    max_entries: Optional[int] = None
+
+
+def _trim(entries: Tuple[MemoryEntry, ...], max_entries: Optional[int]) -> Tuple[MemoryEntry, ...]:
+    if max_entries is None:
+        return entries
+    return entries[-max_entries:] if max_entries > 0 else ()
+
+
+def _merge(old: WriteOp, new: WriteOp) -> Optional[WriteOp]:
+    """合并同一作用域的两个连续操作，无法合并时返回 None"""
+    if new.kind == "save":
+        return new
+    if old.kind == "save":
+        return WriteOp("save", _trim(old.entries + new.entries, new.max_entries))
+    # 两次追加的条数限制相同（或前一次不限制）时，合并后裁剪的结果不变
+    if old.max_entries is None or old.max_entries == new.max_entries:
+        return WriteOp("append", _trim(old.entries + new.entries, new.max_entries), new.max_entries)
+    return None
+
+
 logger = get_logger("MemoryPersistence")
 class AsyncMemoryPersistence:
-    """异步持久化管理器"""
+    """
+    异步持久化管理器，后台线程按批写入。
+    同一作用域尚未写入的操作会合并（整体保存以最新的快照为准），
+    等待写入的作用域数量达到 max_pending 时，提交新作用域的写入会阻塞，直到后台线程写入一批。
+    写入失败后按指数退避等待（从 flush_interval 开始，最长 max_retry_delay 秒）再重试。
+    """
 
-    def __init__(self, persistence: MemoryPersistence):
+    def __init__(
+        self,
+        persistence: MemoryPersistence,
+        flush_interval: float = 1.0,
+        batch_size: int = 100,
+        max_pending: int = 10000,
+        max_retry_delay: float = 60.0,
+    ):
         self.persistence = persistence
-        self.queue: Queue[Tuple[str, List[MemoryEntry]]] = Queue()
+        self.flush_interval = flush_interval
+        self.batch_size = max(batch_size, 1)
+        self.max_pending = max_pending
+        self.max_retry_delay = max_retry_delay
+        # scope_key -> 尚未写入的操作，按提交顺序排列，加载时会应用到读取的结果上
+        self._pending: Dict[str, Deque[WriteOp]] = {}
+        # 后台线程正在写入的作用域
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        # 后台线程和 write_back 不能同时写入
+        self._save_lock = threading.RLock()
+        # 队列已满时要求后台线程立即写入，不等待写入间隔
+        self._flush_requested = False
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.backpressure_waits = 0
+        self.backpressure_wait_time = 0.0
+
         self.running = True
         self.worker = threading.Thread(target=self._worker, daemon=True)
         self.worker.start()
 
     def _worker(self):
-        while self.running:
-            try:
-                scope_key, entries = self.queue.get(timeout=1)
-                self.persistence.save(scope_key, entries)
-                self.queue.task_done()
-                logger.info(f"Saved {scope_key} with {len(entries)} entries")
-            except Empty:
+        retry_delay = 0.0
+        while True:
+            with self._condition:
+                if self.running and not self._flush_requested and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                self._flush_requested = False
+                if not self._pending:
+                    if not self.running:
+                        break
+                    continue
+            if self._flush_batch():
+                retry_delay = 0.0
                 continue
+            # 停止时写入失败则放弃剩余的操作，由 stop 记录
+            if not self.running:
+                break
+            # 持久化层不可用时退避等待，避免反复重试
+            retry_delay = min(max(retry_delay * 2, self.flush_interval, 0.1), self.max_retry_delay)
+            self._backoff(retry_delay)
+
+    def _backoff(self, delay: float):
+        """等待 delay 秒，期间只会被 stop 唤醒"""
+        deadline = time.monotonic() + delay
+        with self._condition:
+            while self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+    def _flush_batch(self) -> bool:
+        """写入一批作用域的操作，返回是否写入成功"""
+        with self._save_lock:
+            with self._condition:
+                keys = list(islice(self._pending, self.batch_size))
+                batch = [(key, op) for key in keys for op in self._pending.pop(key)]
+                self._in_flight.update(keys)
+                # 唤醒等待队列空位的提交
+                self._condition.notify_all()
+            try:
+                self.persistence.write_batch(batch)
             except Exception as e:
                 logger.error(f"Error saving memory: {e}")
-                continue
+                with self._condition:
+                    self.failed_batches += 1
+                    self._requeue(batch)
+                return False
+            finally:
+                with self._condition:
+                    self._in_flight.clear()
+            with self._condition:
+                self.written += len(batch)
+                self.batches += 1
+            logger.debug(f"Saved {len(keys)} memory scopes with {len(batch)} operations")
+            return True
+
+    def _requeue(self, batch: Sequence[Tuple[str, WriteOp]]):
+        """把写入失败的操作放回队列，排在之后提交的操作之前"""
+        failed: Dict[str, Deque[WriteOp]] = {}
+        for key, op in batch:
+            failed.setdefault(key, deque()).append(op)
+        for key, ops in failed.items():
+            ops.extend(self._pending.pop(key, ()))
+            self._pending[key] = ops
+
+    def _submit(self, scope_key: str, op: WriteOp):
+        with self._condition:
+            self.submitted += 1
+            ops = self._pending.get(scope_key)
+            if ops:
+                merged = _merge(ops[-1], op)
+                if merged is not None:
+                    ops[-1] = merged
+                    self.coalesced += 1
+                else:
+                    ops.append(op)
+                return
+
+            if self.max_pending > 0 and len(self._pending) >= self.max_pending and self.running:
+                # 队列已满，等待后台线程写入
+                self.backpressure_waits += 1
+                start = time.monotonic()
+                while len(self._pending) >= self.max_pending and self.running and self.worker.is_alive():
+                    self._flush_requested = True
+                    self._condition.notify_all()
+                    self._condition.wait(self.flush_interval)
+                self.backpressure_wait_time += time.monotonic() - start
+
+            self._pending[scope_key] = deque([op])
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
 
     def load(self, scope_key: str) -> List[MemoryEntry]:
-        return self.persistence.load(scope_key)
+        with self._lock:
+            dirty = scope_key in self._pending or scope_key in self._in_flight
+        if not dirty:
+            return self.persistence.load(scope_key)
+        # 读取已写入的记忆，再应用尚未写入的操作
+        with self._save_lock:
+            with self._lock:
+                ops = list(self._pending.get(scope_key, ()))
+            entries = self.persistence.load(scope_key)
+        for kind, op_entries, max_entries in ops:
+            if kind == "append":
+                entries = list(_trim(tuple(entries) + op_entries, max_entries))
+            else:
+                entries = list(op_entries)
+        return entries
 
     def save(self, scope_key: str, entries: List[MemoryEntry]):
-        self.queue.put((scope_key, entries))
+        self._submit(scope_key, WriteOp("save", tuple(entries)))
+
+    def append(self, scope_key: str, entries: List[MemoryEntry], max_entries: Optional[int] = None):
+        self._submit(scope_key, WriteOp("append", _trim(tuple(entries), max_entries), max_entries))
+
+    def is_dirty(self, scope_key: str) -> bool:
+        """作用域是否还有尚未写入的记忆"""
+        return scope_key in self._pending or scope_key in self._in_flight
+
+    def write_back(self, scope_key: str) -> None:
+        """立即写入作用域尚未写入的操作，之后加载时直接从持久化层读取"""
+        with self._save_lock:
+            with self._condition:
+                ops = self._pending.pop(scope_key, None)
+            if not ops:
+                return
+            batch = [(scope_key, op) for op in ops]
+            try:
+                self.persistence.write_batch(batch)
+            except Exception:
+                # 写入失败时把操作放回，由后台线程继续写入
+                with self._condition:
+                    self._requeue(batch)
+                raise
+            with self._condition:
+                self.written += len(batch)
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "pending_scopes": len(self._pending),
+                "max_pending": self.max_pending,
+                "flush_interval": self.flush_interval,
+                "batch_size": self.batch_size,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "written": self.written,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "backpressure_waits": self.backpressure_waits,
+                "backpressure_wait_time": self.backpressure_wait_time,
+            }
 
     def stop(self):
-        self.running = False
+        """停止后台线程，停止前写入所有尚未写入的操作"""
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
         self.worker.join()
+        if self._pending:
+            logger.error(f"Failed to save {len(self._pending)} memory scopes before shutdown")
         self.persistence.flush()
-        
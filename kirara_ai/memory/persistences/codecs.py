@@ -1,9 +1,17 @@
 import json
+from abc import ABC, abstractmethod
 from datetime import datetime
 from types import FunctionType
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
 
 from kirara_ai.im.sender import ChatSender, ChatType
 from kirara_ai.logger import get_logger
+from kirara_ai.memory.entry import MemoryEntry
 
 
 class MemoryJSONEncoder(json.JSONEncoder):
@@ -48,3 +56,168 @@ def memory_json_decoder(obj):
                 raw_metadata=obj["raw_metadata"],
             )
     return obj
+
+
+def serialize_entry(entry: MemoryEntry) -> Dict[str, Any]:
+    return {
+        "sender": entry.sender,
+        "content": entry.content,
+        "timestamp": entry.timestamp,
+        "metadata": entry.metadata,
+    }
+
+
+def deserialize_entry(entry: Dict[str, Any]) -> MemoryEntry:
+    return MemoryEntry(
+        sender=entry["sender"],
+        content=entry["content"],
+        timestamp=(
+            datetime.fromisoformat(entry["timestamp"])
+            if isinstance(entry["timestamp"], str)
+            else entry["timestamp"]
+        ),
+        metadata=entry["metadata"],
+    )
+
+
+# 记录格式版本，没有版本字段的记录为版本 1（serialize_entry 的 JSON 格式）
+VERSION_KEY = "__v__"
+COMPACT_VERSION = 2
+
+
+def serialize_compact_entry(entry: MemoryEntry) -> Dict[str, Any]:
+    """版本 2 的记录格式，发送者保存为列表，时间由编码器直接输出"""
+    sender = entry.sender
+    if isinstance(sender, ChatSender):
+        sender = [sender.user_id, sender.chat_type.value, sender.group_id, sender.display_name, sender.raw_metadata]
+    return {
+        VERSION_KEY: COMPACT_VERSION,
+        "sender": sender,
+        "content": entry.content,
+        "timestamp": entry.timestamp,
+        "metadata": entry.metadata,
+    }
+
+
+def deserialize_record(record: Dict[str, Any]) -> MemoryEntry:
+    """按记录的版本还原记忆"""
+    if record.get(VERSION_KEY) != COMPACT_VERSION:
+        return deserialize_entry(record)
+    sender = record["sender"]
+    if isinstance(sender, list):
+        user_id, chat_type, group_id, display_name, raw_metadata = sender
+        sender = ChatSender(
+            user_id=user_id,
+            chat_type=ChatType(chat_type),
+            group_id=group_id,
+            display_name=display_name,
+            raw_metadata=raw_metadata,
+        )
+    return MemoryEntry(
+        sender=sender,
+        content=record["content"],
+        timestamp=datetime.fromisoformat(record["timestamp"]),
+        metadata=record["metadata"],
+    )
+
+
+def _restore_objects(obj: Any) -> Any:
+    """对已解析的数据应用 memory_json_decoder，效果与 json.loads 的 object_hook 相同"""
+    if isinstance(obj, dict):
+        return memory_json_decoder({key: _restore_objects(value) for key, value in obj.items()})
+    if isinstance(obj, list):
+        return [_restore_objects(value) for value in obj]
+    return obj
+
+
+class MemoryCodec(ABC):
+    """记忆的编码格式，每条记忆编码为一行不含换行符的数据，解码时兼容所有版本的记录"""
+
+    name: str
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """编码任意数据（如文件日志中的裁剪记录）"""
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """解析一条记录，其中的 ChatSender 等对象会被还原"""
+
+    @abstractmethod
+    def encode(self, entry: MemoryEntry) -> bytes:
+        pass
+
+    def decode(self, data: Union[str, bytes]) -> MemoryEntry:
+        return deserialize_record(self.loads(data))
+
+
+class JSONMemoryCodec(MemoryCodec):
+    """标准库 json 编码，输出版本 1 的记录"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, cls=MemoryJSONEncoder).encode("utf-8")
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data, object_hook=memory_json_decoder)
+
+    def encode(self, entry: MemoryEntry) -> bytes:
+        return self.dumps(serialize_entry(entry))
+
+
+class OrjsonMemoryCodec(MemoryCodec):
+    """
+    orjson 编码，输出版本 2 的记录，时间和常见类型由 orjson 直接编码，
+    解码时不需要逐个对象调用 object_hook，只在记录中存在特殊对象时还原。
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson memory codec requires orjson, please install it with `pip install orjson`")
+        self._encoder = MemoryJSONEncoder()
+        self._fallback = JSONMemoryCodec()
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            # ChatSender 是 dataclass，需要交给 default 编码以保留类型
+            return orjson.dumps(
+                obj,
+                default=self._encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            # orjson 不支持的数据（如超过 64 位的整数）使用标准库编码
+            return self._fallback.dumps(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        record = orjson.loads(data)
+        marker = "__type__" if isinstance(data, str) else b"__type__"
+        if marker in data:
+            record = _restore_objects(record)
+        return record
+
+    def encode(self, entry: MemoryEntry) -> bytes:
+        return self.dumps(serialize_compact_entry(entry))
+
+
+CODECS = {
+    JSONMemoryCodec.name: JSONMemoryCodec,
+    OrjsonMemoryCodec.name: OrjsonMemoryCodec,
+}
+
+
+def get_codec(name: Optional[str] = None) -> MemoryCodec:
+    """
+    获取编码格式，不指定时优先使用 orjson。
+    orjson 未安装时使用 json，已有的数据不受影响，所有编码格式都能读取其他格式写入的记录。
+    """
+    name = name or OrjsonMemoryCodec.name
+    if name not in CODECS:
+        raise ValueError(f"Unsupported memory codec: {name}")
+    if name == OrjsonMemoryCodec.name and orjson is None:
+        get_logger("MemoryCodec").warning("orjson is not installed, falling back to json memory codec")
+        return JSONMemoryCodec()
+    return CODECS[name]()
@@ -1,75 +1,134 @@
 import json
 import os
-from datetime import datetime
-from typing import List
+import uuid
+from typing import Dict, List, Optional
 
+from kirara_ai.logger import get_logger
 from kirara_ai.memory.entry import MemoryEntry
 
 from .base import MemoryPersistence
-from .codecs import MemoryJSONEncoder, memory_json_decoder
+from .codecs import MemoryCodec, deserialize_entry, deserialize_record, get_codec, memory_json_decoder
+
+# 日志中表示“只保留最后 n 条记忆”的记录
+TRIM_KEY = "__trim__"
+# 日志记录数少于该值时不压缩
+MIN_COMPACT_RECORDS = 64
+
+logger = get_logger("FileMemoryPersistence")
 
 
 class FileMemoryPersistence(MemoryPersistence):
-    """文件持久化实现"""
+    """
+    文件持久化实现，每个作用域一个 JSONL 日志文件。
+    新记忆追加到日志末尾，超过条数限制时追加一条裁剪记录，
+    日志中的记录数超过有效记忆数的 compact_ratio 倍时重写为只包含有效记忆的新文件。
+    """
 
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, compact_ratio: float = 2, codec: Optional[MemoryCodec] = None):
         if not os.path.isabs(data_dir):
             data_dir = os.path.abspath(data_dir)
 
         self.data_dir = data_dir
+        self.compact_ratio = compact_ratio
+        self.codec = codec or get_codec()
         os.makedirs(data_dir, exist_ok=True)
 
+        # scope_key -> 日志中的记录数和有效记忆数
+        self._record_counts: Dict[str, int] = {}
+        self._entry_counts: Dict[str, int] = {}
+
     def _get_file_path(self, scope_key: str) -> str:
+        scope_key = scope_key.replace(":", "_")
+        return os.path.join(self.data_dir, f"{scope_key}.jsonl")
+
+    def _get_legacy_file_path(self, scope_key: str) -> str:
+        """旧版本每次整体重写的 JSON 文件"""
         scope_key = scope_key.replace(":", "_")
         return os.path.join(self.data_dir, f"{scope_key}.json")
 
     def save(self, scope_key: str, entries: List[MemoryEntry]) -> None:
+        """整体重写作用域的日志"""
         file_path = self._get_file_path(scope_key)
+        temp_path = os.path.join(self.data_dir, f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, "wb") as f:
+                for entry in entries:
+                    f.write(self.codec.encode(entry))
+                    f.write(b"\n")
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        legacy_path = self._get_legacy_file_path(scope_key)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+        self._record_counts[scope_key] = len(entries)
+        self._entry_counts[scope_key] = len(entries)
 
-        # 序列化记忆条目
-        serialized_entries = [
-            {
-                "sender": entry.sender,
-                "content": entry.content,
-                "timestamp": entry.timestamp,
-                "metadata": entry.metadata,
-            }
-            for entry in entries
-        ]
-
-        # 写入文件
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(
-                serialized_entries,
-                f,
-                ensure_ascii=False,
-                indent=2,
-                cls=MemoryJSONEncoder,
-            )
+    def append(self, scope_key: str, entries: List[MemoryEntry], max_entries: Optional[int] = None) -> None:
+        if scope_key not in self._entry_counts:
+            # 未加载过的作用域需要先读取一次日志，得到记录数（旧版文件也会在此时转换）
+            self.load(scope_key)
+
+        if not entries:
+            return
+        lines = [self.codec.encode(entry) for entry in entries]
+        entry_count = self._entry_counts[scope_key] + len(entries)
+        if max_entries is not None and entry_count > max_entries:
+            lines.append(self.codec.dumps({TRIM_KEY: max_entries}))
+            entry_count = max_entries
+
+        with open(self._get_file_path(scope_key), "ab") as f:
+            f.write(b"\n".join(lines) + b"\n")
+        record_count = self._record_counts[scope_key] + len(lines)
+        self._record_counts[scope_key] = record_count
+        self._entry_counts[scope_key] = entry_count
+
+        if record_count > max(entry_count * self.compact_ratio, MIN_COMPACT_RECORDS):
+            self.save(scope_key, self.load(scope_key))
 
     def load(self, scope_key: str) -> List[MemoryEntry]:
         file_path = self._get_file_path(scope_key)
 
         if not os.path.exists(file_path):
+            legacy_path = self._get_legacy_file_path(scope_key)
+            if os.path.exists(legacy_path):
+                return self._load_legacy(scope_key, legacy_path)
+            self._record_counts[scope_key] = 0
+            self._entry_counts[scope_key] = 0
             return []
 
-        # 读取并反序列化
-        with open(file_path, "r", encoding="utf-8") as f:
-            serialized_entries = json.load(f, object_hook=memory_json_decoder)
+        entries: List[MemoryEntry] = []
+        record_count = 0
+        with open(file_path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = self.codec.loads(line)
+                except ValueError:
+                    # 写入中断时最后一行可能不完整
+                    logger.warning(f"Skipped a corrupted memory record in {file_path}")
+                    continue
+                record_count += 1
+                if TRIM_KEY in record:
+                    max_entries = record[TRIM_KEY]
+                    entries = entries[-max_entries:] if max_entries > 0 else []
+                else:
+                    entries.append(deserialize_record(record))
+
+        self._record_counts[scope_key] = record_count
+        self._entry_counts[scope_key] = len(entries)
+        return entries
 
-        return [
-            MemoryEntry(
-                sender=entry["sender"],
-                content=entry["content"],
-                timestamp=(
-                    datetime.fromisoformat(entry["timestamp"])
-                    if isinstance(entry["timestamp"], str)
-                    else entry["timestamp"]
-                ),
-                metadata=entry["metadata"],
-            )
-            for entry in serialized_entries
-        ]
+    def _load_legacy(self, scope_key: str, legacy_path: str) -> List[MemoryEntry]:
+        """读取旧版 JSON 文件，并转换为日志文件"""
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            serialized_entries = json.load(f, object_hook=memory_json_decoder)
+        entries = [deserialize_entry(entry) for entry in serialized_entries]
+        self.save(scope_key, entries)
+        return entries
 
     def flush(self) -> None:
         # 文件系统实现不需要特别的flush操作
@@ -1,15 +1,14 @@
 import json
-from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 
 from kirara_ai.memory.entry import MemoryEntry
 
-from .base import MemoryPersistence
-from .codecs import MemoryJSONEncoder, memory_json_decoder
+from .base import MemoryPersistence, WriteOp
+from .codecs import MemoryCodec, deserialize_entry, get_codec, memory_json_decoder
 
 
 class RedisMemoryPersistence(MemoryPersistence):
-    """Redis持久化实现"""
+    """Redis持久化实现，每个作用域的记忆保存在一个列表中，新记忆通过 RPUSH 追加"""
 
     def __init__(
         self,
@@ -17,6 +16,7 @@ class RedisMemoryPersistence(MemoryPersistence):
         host: str = "localhost",
         port: int = 6379,
         db: int = 0,
+        codec: Optional[MemoryCodec] = None,
     ):
         import redis
 
@@ -24,46 +24,62 @@ class RedisMemoryPersistence(MemoryPersistence):
             self.redis = redis.from_url(redis_url)
         else:
             self.redis = redis.Redis(host=host, port=port, db=db)
+        self.codec = codec or get_codec()
+
+    def _queue_save(self, pipe, scope_key: str, entries: Sequence[MemoryEntry]) -> None:
+        pipe.delete(scope_key)
+        if entries:
+            pipe.rpush(scope_key, *[self.codec.encode(entry) for entry in entries])
+
+    def _queue_append(self, pipe, scope_key: str, entries: Sequence[MemoryEntry], max_entries: Optional[int]) -> None:
+        if not entries:
+            return
+        pipe.rpush(scope_key, *[self.codec.encode(entry) for entry in entries])
+        if max_entries is not None:
+            # LTRIM key -0 -1 会保留整个列表，因此不保留任何记忆时直接删除
+            if max_entries > 0:
+                pipe.ltrim(scope_key, -max_entries, -1)
+            else:
+                pipe.delete(scope_key)
 
     def save(self, scope_key: str, entries: List[MemoryEntry]) -> None:
-        # 序列化记忆条目
-        serialized_entries = [
-            {
-                "sender": entry.sender,
-                "content": entry.content,
-                "timestamp": entry.timestamp,
-                "metadata": entry.metadata,
-            }
-            for entry in entries
-        ]
+        # 在同一个事务中替换整个列表
+        pipe = self.redis.pipeline()
+        self._queue_save(pipe, scope_key, entries)
+        pipe.execute()
+
+    def append(self, scope_key: str, entries: List[MemoryEntry], max_entries: Optional[int] = None) -> None:
+        if not entries:
+            return
+        pipe = self.redis.pipeline()
+        self._queue_append(pipe, scope_key, entries, max_entries)
+        pipe.execute()
 
-        # 存储到Redis
-        self.redis.set(
-            scope_key,
-            json.dumps(serialized_entries, ensure_ascii=False, cls=MemoryJSONEncoder),
-        )
+    def write_batch(self, batch: Sequence[Tuple[str, WriteOp]]) -> None:
+        """一批操作通过同一个管道提交，只需要一次往返"""
+        if not batch:
+            return
+        pipe = self.redis.pipeline()
+        for scope_key, op in batch:
+            if op.kind == "append":
+                self._queue_append(pipe, scope_key, op.entries, op.max_entries)
+            else:
+                self._queue_save(pipe, scope_key, op.entries)
+        pipe.execute()
 
     def load(self, scope_key: str) -> List[MemoryEntry]:
-        # 从Redis读取
+        key_type = self.redis.type(scope_key)
+        if key_type in (b"list", "list"):
+            return [self.codec.decode(data) for data in self.redis.lrange(scope_key, 0, -1)]
+
+        # 旧版本将整个记忆列表保存为一个 JSON 字符串，读取后转换为列表
         data = self.redis.get(scope_key)
         if not data:
             return []
-        # 反序列化
         serialized_entries = json.loads(data, object_hook=memory_json_decoder) # type: ignore
-
-        return [
-            MemoryEntry(
-                sender=entry["sender"],
-                content=entry["content"],
-                timestamp=(
-                    datetime.fromisoformat(entry["timestamp"])
-                    if isinstance(entry["timestamp"], str)
-                    else entry["timestamp"]
-                ),
-                metadata=entry["metadata"],
-            )
-            for entry in serialized_entries
-        ]
+        entries = [deserialize_entry(entry) for entry in serialized_entries]
+        self.save(scope_key, entries)
+        return entries
 
     def flush(self) -> None:
         self.redis.save()
@@ -0,0 +1,91 @@
+import sys
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from .entry import MemoryEntry
+
+# 每条记忆除内容外的估算开销（对象、发送者和元数据）
+ENTRY_OVERHEAD = 512
+
+
+def estimate_entry_size(entry: MemoryEntry) -> int:
+    """估算记忆条目占用的内存，只用于驻留策略，不需要精确"""
+    return ENTRY_OVERHEAD + sys.getsizeof(entry.content)
+
+
+class MemoryResidency:
+    """
+    记忆作用域的驻留策略，记录作用域的访问顺序和估算大小，
+    作用域数量或总大小超过限制时按最近最少使用的顺序选出需要淘汰的作用域。
+    限制为 0 表示不限制。
+    """
+
+    def __init__(self, max_scopes: int = 0, max_bytes: int = 0):
+        self.max_scopes = max_scopes
+        self.max_bytes = max_bytes
+        # scope_key -> 估算大小，按访问时间从旧到新排列
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_backs = 0
+
+    def __contains__(self, scope_key: str) -> bool:
+        return scope_key in self._sizes
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def configure(self, max_scopes: int, max_bytes: int) -> None:
+        self.max_scopes = max_scopes
+        self.max_bytes = max_bytes
+
+    def touch(self, scope_key: str) -> None:
+        """记录一次命中"""
+        self.hits += 1
+        self._sizes.move_to_end(scope_key)
+
+    def add(self, scope_key: str, entries: Iterable[MemoryEntry]) -> None:
+        """记录一次未命中，作用域被加载到内存中"""
+        self.misses += 1
+        self.resize(scope_key, sum(estimate_entry_size(entry) for entry in entries))
+
+    def resize(self, scope_key: str, size: int) -> None:
+        self._total_bytes += size - self._sizes.get(scope_key, 0)
+        self._sizes[scope_key] = size
+        self._sizes.move_to_end(scope_key)
+
+    def grow(self, scope_key: str, added: Iterable[MemoryEntry] = (), removed: Iterable[MemoryEntry] = ()) -> None:
+        """作用域中增加或移除了记忆"""
+        delta = sum(estimate_entry_size(entry) for entry in added) - sum(estimate_entry_size(entry) for entry in removed)
+        self.resize(scope_key, max(self._sizes.get(scope_key, 0) + delta, 0))
+
+    def remove(self, scope_key: str) -> None:
+        self._total_bytes -= self._sizes.pop(scope_key, 0)
+
+    def is_over_limit(self) -> bool:
+        return (self.max_scopes > 0 and len(self._sizes) > self.max_scopes) or (
+            self.max_bytes > 0 and self._total_bytes > self.max_bytes
+        )
+
+    def candidates(self) -> List[str]:
+        """按最近最少使用的顺序返回所有作用域"""
+        return list(self._sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "resident_scopes": len(self._sizes),
+            "resident_bytes": self._total_bytes,
+            "max_scopes": self.max_scopes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "write_backs": self.write_backs,
+        }
@@ -6,6 +6,10 @@ from kirara_ai.im.sender import ChatSender
 class MemoryScope(ABC):
     """记忆作用域抽象类"""
 
+    # 查询结果是否跨越多个作用域键。为 False 时只查询 get_scope_key 对应的记忆，
+    # 为 True 时（如全局作用域）从所有已加载的记忆中筛选 is_in_scope 的记忆
+    cross_scope: bool = False
+
     @abstractmethod
     def get_scope_key(self, sender: ChatSender) -> str:
         """获取作用域的键值"""
@@ -48,6 +48,8 @@ class GroupScope(MemoryScope):
 class GlobalScope(MemoryScope):
     """全局作用域"""
 
+    cross_scope = True
+
     def get_scope_key(self, sender: ChatSender) -> str:
         return "global"
 
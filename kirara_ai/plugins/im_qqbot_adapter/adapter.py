@@ -124,14 +124,14 @@ class QQBotAdapter(botpy.WebHookClient, IMAdapter, BotProfileAdapter):
         for attachment in raw_message.attachments:
             if attachment.content_type.startswith('image/'):
                 elements.append(
-                    ImageMessage(
+                    await ImageMessage.create(
                         url=attachment.url,
                         format=attachment.content_type.removeprefix('image/')
                     )
                 )
             elif attachment.content_type.startswith('audio'):
                 elements.append(
-                    VoiceMessage(
+                    await VoiceMessage.create(
                         url=attachment.url,
                         format=attachment.filename.split('.')[-1]
                     )
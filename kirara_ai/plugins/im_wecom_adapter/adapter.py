@@ -248,13 +248,13 @@ class WecomAdapter(IMAdapter):
         if raw_message.type == "text":
             message_elements.append(TextMessage(text=raw_message.content))
         elif raw_message.type == "image":
-            message_elements.append(ImageMessage(url=raw_message.image))
+            message_elements.append(await ImageMessage.create(url=raw_message.image))
         elif raw_message.type == "voice" and media_path:
-            message_elements.append(VoiceMessage(url=media_path))
+            message_elements.append(await VoiceMessage.create(url=media_path))
         elif raw_message.type == "video" and media_path:
-            message_elements.append(VideoElement(path=media_path))
+            message_elements.append(await VideoElement.create(path=media_path))
         elif raw_message.type == "file" and media_path:
-            message_elements.append(FileElement(path=media_path))
+            message_elements.append(await FileElement.create(path=media_path))
         elif raw_message.type == "location":
             location_text = f"[Location] {raw_message.label} (X: {raw_message.location_x}, Y: {raw_message.location_y})"
             message_elements.append(TextMessage(text=location_text))
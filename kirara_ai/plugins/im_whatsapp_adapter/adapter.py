@@ -150,7 +150,7 @@ class WhatsAppAdapter(IMAdapter, UserProfileAdapter, EditStateAdapter, BotProfil
         if raw_message.message.voice:
             voice_file = await raw_message.message.voice.get_file()
             data = await voice_file.download_as_bytearray()
-            voice_element = VoiceMessage(data=bytes(data))
+            voice_element = await VoiceMessage.create(data=bytes(data))
             message_elements.append(voice_element)
 
         # 处理图片消息
@@ -159,19 +159,19 @@ class WhatsAppAdapter(IMAdapter, UserProfileAdapter, EditStateAdapter, BotProfil
             photo = raw_message.message.photo[-1]
             photo_file = await photo.get_file()
             data = await photo_file.download_as_bytearray()
-            photo_element = ImageMessage(data=bytes(data))
+            photo_element = await ImageMessage.create(data=bytes(data))
             message_elements.append(photo_element)
             
         if raw_message.message.video:
             video_file = await raw_message.message.video.get_file()
             data = await video_file.download_as_bytearray()
-            video_element = VideoMessage(data=bytes(data))
+            video_element = await VideoMessage.create(data=bytes(data))
             message_elements.append(video_element)
             
         if raw_message.message.document:
             document_file = await raw_message.message.document.get_file()
             data = await document_file.download_as_bytearray()
-            document_element = FileElement(data=bytes(data))
+            document_element = await FileElement.create(data=bytes(data))
             message_elements.append(document_element)
 
         # 创建 Message 对象
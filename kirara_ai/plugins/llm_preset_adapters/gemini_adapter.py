@@ -12,7 +12,7 @@ from kirara_ai.llm.format.message import (LLMChatContentPartType, LLMChatImageCo
 from kirara_ai.llm.format.request import LLMChatRequest, Tool
 from kirara_ai.llm.format.response import Function, LLMChatResponse, Message, ToolCall, Usage
 from kirara_ai.logger import get_logger
-from kirara_ai.media import MediaManager
+from kirara_ai.media import ImageVariantSpec, MediaManager
 from kirara_ai.tracing import trace_llm_chat
 
 SAFETY_SETTINGS = [{
@@ -35,6 +35,9 @@ SAFETY_SETTINGS = [{
 # POST 模式支持最大 20 MB 的 inline data
 INLINE_LIMIT_SIZE = 1024 * 1024 * 20
 
+# Gemini 会将图片切分为 768x768 的块计算 token，过大的图片只会增加上传耗时和 token 消耗
+IMAGE_VARIANT = ImageVariantSpec(max_edge=1536, format="jpeg", quality=85)
+
 IMAGE_MODAL_MODELS = [
     "gemini-2.0-flash-exp"
 ]
@@ -56,10 +59,11 @@ async def convert_non_tool_message(msg: LLMChatMessage, media_manager: MediaMana
             media = media_manager.get_media(element.media_id)
             if media is None:
                 raise ValueError(f"Media {element.media_id} not found")
+            mime_type, data = await media.get_variant_base64(IMAGE_VARIANT)
             parts.append({
                 "inline_data": {
-                    "mime_type": str(media.mime_type),
-                    "data": await media.get_base64()
+                    "mime_type": mime_type,
+                    "data": data
                 }
             })
         elif isinstance(element, LLMToolCallContent):
@@ -12,8 +12,12 @@ from kirara_ai.llm.format.request import LLMChatRequest, Tool
 from kirara_ai.llm.format.response import Function, LLMChatResponse, Message, ToolCall, Usage
 from kirara_ai.logger import get_logger
 from kirara_ai.media.manager import MediaManager
+from kirara_ai.media.variants import ImageVariantSpec
 from kirara_ai.tracing import trace_llm_chat
 
+# 本地视觉模型的输入分辨率较低，发送较小的图片即可
+IMAGE_VARIANT = ImageVariantSpec(max_edge=1024, format="jpeg", quality=85)
+
 
 class OllamaConfig(BaseModel):
     api_base: str = "http://localhost:11434"
@@ -24,7 +28,7 @@ async def resolve_media_ids(media_ids: list[str], media_manager: MediaManager) -
     for media_id in media_ids:
         media = media_manager.get_media(media_id)
         if media is not None:
-            base64_data = await media.get_base64()
+            _, base64_data = await media.get_variant_base64(IMAGE_VARIANT)
             result.append(base64_data)
     return result
 
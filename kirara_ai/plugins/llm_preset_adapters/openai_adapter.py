@@ -11,11 +11,14 @@ from kirara_ai.llm.format.message import (LLMChatContentPartType, LLMChatImageCo
 from kirara_ai.llm.format.request import LLMChatRequest
 from kirara_ai.llm.format.response import Function, LLMChatResponse, Message, ToolCall, Usage
 from kirara_ai.logger import get_logger
-from kirara_ai.media import MediaManager
+from kirara_ai.media import ImageVariantSpec, MediaManager
 from kirara_ai.tracing import trace_llm_chat
 
 logger = get_logger("OpenAIAdapter")
 
+# OpenAI 在 high detail 模式下会将图片缩放到 2048x2048 以内
+IMAGE_VARIANT = ImageVariantSpec(max_edge=2048, format="jpeg", quality=85)
+
 async def convert_parts_factory(messages: LLMChatMessage, media_manager: MediaManager) -> list[dict]:
     if messages.role == "tool":
         # typing.cast 指定类型，避免mypy报错
@@ -35,7 +38,7 @@ async def convert_parts_factory(messages: LLMChatMessage, media_manager: MediaMa
                 parts.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": await media.get_base64_url()
+                        "url": await media.get_variant_base64_url(IMAGE_VARIANT)
                     }
                 })
             elif isinstance(element, LLMToolCallContent):
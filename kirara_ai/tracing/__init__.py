@@ -2,12 +2,16 @@ from kirara_ai.tracing.core import TracerBase
 from kirara_ai.tracing.decorator import trace_llm_chat
 from kirara_ai.tracing.llm_tracer import LLMTracer
 from kirara_ai.tracing.manager import TracingManager
-from kirara_ai.tracing.models import LLMRequestTrace
+from kirara_ai.tracing.models import LLMRequestTrace, WorkflowBlockSpanRecord, WorkflowExecutionTrace
+from kirara_ai.tracing.workflow_tracer import WorkflowTracer
 
 __all__ = [
     "TracingManager", 
     "LLMRequestTrace",
     "TracerBase",
     "LLMTracer",
+    "WorkflowTracer",
+    "WorkflowExecutionTrace",
+    "WorkflowBlockSpanRecord",
     "trace_llm_chat"
 ] 
\ No newline at end of file
@@ -4,6 +4,7 @@ from typing import Any, Dict, Optional
 
 from sqlalchemy import Column, DateTime, Float, Index, Integer, String, Text
 
+from kirara_ai.database import Base
 from kirara_ai.events.tracing import LLMRequestCompleteEvent, LLMRequestFailEvent, LLMRequestStartEvent
 from kirara_ai.tracing.core import TraceEvent, TraceRecord
 
@@ -125,4 +126,87 @@ class LLMRequestTrace(TraceRecord):
     def response(self, value: Any):
         """设置响应内容"""
         if value:
-            self.response_json = json.dumps(value, ensure_ascii=False, default=str)
\ No newline at end of file
+            self.response_json = json.dumps(value, ensure_ascii=False, default=str)
+
+class WorkflowExecutionTrace(TraceRecord):
+    """工作流执行跟踪记录"""
+
+    __tablename__ = "workflow_execution_traces"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    trace_id = Column(String(64), nullable=False, index=True, unique=True)
+    workflow_id = Column(String(128), nullable=True, index=True)
+    workflow_name = Column(String(128), nullable=False)
+
+    # 时间相关
+    request_time = Column(DateTime, nullable=False, index=True)
+    response_time = Column(DateTime, nullable=True)
+    duration = Column(Float, nullable=True)
+
+    block_count = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    status = Column(String(20), nullable=False, default="pending")
+
+    __table_args__ = (
+        Index('idx_workflow_time', 'workflow_id', 'request_time'),
+    )
+
+    def __repr__(self):
+        return f"<WorkflowExecutionTrace id={self.id} trace_id={self.trace_id}>"
+
+    def update_from_event(self, event: TraceEvent) -> None:
+        """工作流执行记录在执行结束时一次性写入，不需要从事件更新"""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "trace_id": self.trace_id,
+            "workflow_id": self.workflow_id,
+            "workflow_name": self.workflow_name,
+            "request_time": self.request_time.isoformat() if self.request_time else None, # type: ignore
+            "response_time": self.response_time.isoformat() if self.response_time else None, # type: ignore
+            "duration": self.duration,
+            "block_count": self.block_count,
+            "status": self.status,
+            "error": self.error,
+        }
+
+    def to_detail_dict(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+
+class WorkflowBlockSpanRecord(Base):
+    """工作流中单个 block 的执行记录，耗时单位为秒"""
+
+    __tablename__ = "workflow_block_spans"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    trace_id = Column(String(64), nullable=False, index=True)
+    workflow_id = Column(String(128), nullable=True)
+    block_name = Column(String(128), nullable=False)
+    block_type = Column(String(128), nullable=False)
+
+    start_time = Column(DateTime, nullable=False, index=True)
+    duration = Column(Float, nullable=False)
+    queue_wait = Column(Float, nullable=False, default=0)
+    gather_time = Column(Float, nullable=False, default=0)
+    output_size = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('idx_block_type_time', 'block_type', 'start_time'),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "workflow_id": self.workflow_id,
+            "block_name": self.block_name,
+            "block_type": self.block_type,
+            "start_time": self.start_time.isoformat() if self.start_time else None, # type: ignore
+            "duration": self.duration,
+            "queue_wait": self.queue_wait,
+            "gather_time": self.gather_time,
+            "output_size": self.output_size,
+            "error": self.error,
+        }
@@ -0,0 +1,269 @@
+import asyncio
+import math
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from kirara_ai.config.global_config import GlobalConfig
+from kirara_ai.events.workflow import WorkflowExecutionEnd, WorkflowExecutionFail
+from kirara_ai.ioc.container import DependencyContainer
+from kirara_ai.ioc.inject import Inject
+from kirara_ai.tracing.core import TracerBase
+from kirara_ai.tracing.models import WorkflowBlockSpanRecord, WorkflowExecutionTrace
+
+PERCENTILES = (50, 95, 99)
+# 后台写入线程单次提交的最大执行记录数
+WRITE_BATCH_SIZE = 64
+
+# 待写入的执行记录、block 记录以及产生它们的事件循环
+PendingTrace = Tuple[WorkflowExecutionTrace, List[WorkflowBlockSpanRecord], Optional[asyncio.AbstractEventLoop]]
+
+
+def percentile_rank(count: int, p: float) -> int:
+    """最近秩法中第 p 百分位数的秩（从 1 开始）"""
+    return max(1, math.ceil(p / 100 * count))
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """使用最近秩法计算百分位数，输入需已升序排列"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[percentile_rank(len(sorted_values), p) - 1]
+
+
+def summarize_column(session: Session, column: Any, filters: Sequence[Any], count: int) -> Dict[str, float]:
+    """
+    在数据库中计算一列耗时的 p50/p95/p99 等统计值，空值视为 0。
+    每个百分位数按秩排序后只取一行，不需要把整列读入内存。
+    """
+    value = func.coalesce(column, 0.0)
+    summary: Dict[str, float] = {}
+    for p in PERCENTILES:
+        if not count:
+            summary[f"p{p}"] = 0.0
+            continue
+        query = session.query(value).filter(*filters).order_by(value)
+        summary[f"p{p}"] = query.offset(percentile_rank(count, p) - 1).limit(1).scalar() or 0.0
+    avg, max_value = session.query(func.avg(value), func.max(value)).filter(*filters).one()
+    summary["avg"] = avg or 0.0
+    summary["max"] = max_value or 0.0
+    return summary
+
+
+class WorkflowTracer(TracerBase[WorkflowExecutionTrace]):
+    """工作流追踪器，记录每次工作流执行及其中每个 block 的耗时"""
+
+    name = "workflow"
+    record_class = WorkflowExecutionTrace
+
+    @Inject()
+    def __init__(self, container: DependencyContainer):
+        super().__init__(container, record_class=WorkflowExecutionTrace) # type: ignore
+        self.config = container.resolve(GlobalConfig)
+        # 执行记录由后台线程批量写入，避免在事件循环上同步提交数据库
+        self._write_queue: "queue.Queue[Optional[PendingTrace]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def initialize(self):
+        """启动追踪器和后台写入线程，并清理超过 30 天的执行记录"""
+        super().initialize()
+        self._writer = threading.Thread(target=self._writer_loop, name="workflow-tracer-writer", daemon=True)
+        self._writer.start()
+
+        try:
+            deleted_count = self._clean_old_traces()
+            if deleted_count:
+                self.logger.info(f"已清理 {deleted_count} 个超过 30 天的工作流执行记录")
+        except Exception as e:
+            self.logger.opt(exception=e).error("处理历史工作流追踪记录时发生错误")
+
+    def shutdown(self):
+        """写完队列中剩余的执行记录后停止后台写入线程"""
+        super().shutdown()
+        if self._writer is not None:
+            self._write_queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def flush(self):
+        """阻塞直到已提交的执行记录全部写入数据库"""
+        self._write_queue.join()
+
+    def _clean_old_traces(self, days: int = 30) -> int:
+        """清理超过指定天数的执行记录"""
+        with self.db_manager.get_session() as session:
+            days_ago = datetime.now() - timedelta(days=days)
+            deleted_count = session.query(WorkflowExecutionTrace).filter(
+                WorkflowExecutionTrace.request_time < days_ago # type: ignore
+            ).delete()
+            session.query(WorkflowBlockSpanRecord).filter(
+                WorkflowBlockSpanRecord.start_time < days_ago # type: ignore
+            ).delete()
+            session.commit()
+            return deleted_count
+
+    def _register_event_handlers(self):
+        """注册事件处理程序"""
+        self.event_bus.register(WorkflowExecutionEnd, self._on_execution_end)
+        self.event_bus.register(WorkflowExecutionFail, self._on_execution_fail)
+
+    def _unregister_event_handlers(self):
+        """取消事件处理程序注册"""
+        self.event_bus.unregister(WorkflowExecutionEnd, self._on_execution_end)
+        self.event_bus.unregister(WorkflowExecutionFail, self._on_execution_fail)
+
+    def _on_execution_end(self, event: WorkflowExecutionEnd):
+        """处理工作流执行完成事件"""
+        self._save_execution(event, "success")
+
+    def _on_execution_fail(self, event: WorkflowExecutionFail):
+        """处理工作流执行失败事件"""
+        self._save_execution(event, "failed", str(event.error))
+
+    def _save_execution(
+        self,
+        event: Union[WorkflowExecutionEnd, WorkflowExecutionFail],
+        status: str,
+        error: Optional[str] = None
+    ):
+        """构造一次工作流执行及其所有 block 的记录，交给后台线程写入数据库"""
+        if not self.config.tracing.workflow_tracing:
+            return
+        executor = event.executor
+        trace_id = getattr(executor, "trace_id", None)
+        if not trace_id:
+            return
+        workflow = event.workflow
+        spans = list(getattr(executor, "spans", []))
+
+        trace = WorkflowExecutionTrace(
+            trace_id=trace_id,
+            workflow_id=workflow.id,
+            workflow_name=workflow.name,
+            request_time=datetime.fromtimestamp(event.start_time),
+            response_time=datetime.fromtimestamp(event.end_time),
+            duration=event.duration,
+            block_count=len(spans),
+            status=status,
+            error=error,
+        )
+        span_records = [
+            WorkflowBlockSpanRecord(
+                trace_id=trace_id,
+                workflow_id=workflow.id,
+                block_name=span.block_name,
+                block_type=span.block_type,
+                start_time=datetime.fromtimestamp(span.start_time or event.start_time),
+                duration=span.duration,
+                queue_wait=span.queue_wait,
+                gather_time=span.gather_time,
+                output_size=span.output_size,
+                error=span.error,
+            )
+            for span in spans
+        ]
+
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        self._write_queue.put((trace, span_records, loop))
+
+    def _writer_loop(self):
+        """后台写入线程：每次取出队列中已有的记录，在同一个会话中提交"""
+        stopping = False
+        while not stopping:
+            batch = [self._write_queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not None]
+            stopping = len(items) < len(batch)
+            try:
+                if items:
+                    self._write_batch(items)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    def _write_batch(self, items: List[PendingTrace]):
+        """批量写入执行记录，并在记录所属的事件循环上广播"""
+        try:
+            with self.db_manager.get_session() as session:
+                for trace, span_records, _ in items:
+                    session.add(trace)
+                    session.add_all(span_records)
+                session.commit()
+                messages = [({"type": "new", "data": trace.to_dict()}, loop) for trace, _, loop in items]
+        except Exception as e:
+            trace_ids = ", ".join(str(trace.trace_id) for trace, _, _ in items)
+            self.logger.opt(exception=e).error(f"保存工作流追踪记录失败: {trace_ids}")
+            return
+
+        for message, loop in messages:
+            # asyncio.Queue 不是线程安全的，需要回到事件循环线程上投递
+            if loop is None or loop.is_closed():
+                continue
+            try:
+                loop.call_soon_threadsafe(self.broadcast_ws_message, message)
+            except RuntimeError:
+                pass
+
+    def get_statistics(self, hours: int = 24) -> Dict:
+        """
+        获取最近若干小时内按 block 类型和工作流 ID 分组的耗时百分位统计。
+        计数和平均值在数据库中分组聚合，百分位数按秩逐个查询。
+        该方法会同步查询数据库，在事件循环中应通过 asyncio.to_thread 调用。
+        """
+        since = datetime.now() - timedelta(hours=hours)
+        span_filter = WorkflowBlockSpanRecord.start_time >= since # type: ignore
+        trace_filter = WorkflowExecutionTrace.request_time >= since # type: ignore
+        # 没有工作流 ID 时按名称分组
+        workflow_key = func.coalesce(
+            func.nullif(WorkflowExecutionTrace.workflow_id, ""), WorkflowExecutionTrace.workflow_name
+        )
+
+        with self.db_manager.get_session() as session:
+            block_groups = session.query(
+                WorkflowBlockSpanRecord.block_type, func.count()
+            ).filter(span_filter).group_by(WorkflowBlockSpanRecord.block_type).order_by(
+                WorkflowBlockSpanRecord.block_type
+            ).all()
+            block_types = []
+            for block_type, count in block_groups:
+                filters = (span_filter, WorkflowBlockSpanRecord.block_type == block_type)
+                block_types.append({
+                    "block_type": block_type,
+                    "count": count,
+                    "duration": summarize_column(session, WorkflowBlockSpanRecord.duration, filters, count),
+                    "queue_wait": summarize_column(session, WorkflowBlockSpanRecord.queue_wait, filters, count),
+                })
+
+            workflow_groups = session.query(
+                workflow_key,
+                func.count(),
+                func.sum(case((WorkflowExecutionTrace.status == "failed", 1), else_=0)),
+            ).filter(trace_filter).group_by(workflow_key).order_by(workflow_key).all()
+            workflows = []
+            for workflow_id, count, failed in workflow_groups:
+                filters = (trace_filter, workflow_key == workflow_id)
+                workflows.append({
+                    "workflow_id": workflow_id,
+                    "count": count,
+                    "failed": failed or 0,
+                    "duration": summarize_column(session, WorkflowExecutionTrace.duration, filters, count),
+                    # 吞吐量：每小时执行次数
+                    "throughput": count / hours if hours else 0.0,
+                })
+
+        return {
+            "hours": hours,
+            "block_types": block_types,
+            "workflows": workflows,
+        }
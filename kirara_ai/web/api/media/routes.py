@@ -1,15 +1,14 @@
-import asyncio
-import io
 import os
+from pathlib import Path
 from typing import Optional
 
-import pytz
-from quart import Blueprint, g, jsonify, request, send_file
+from quart import Blueprint, Response, g, jsonify, request, send_file
+from quart.wrappers.response import FileBody
 
-from kirara_ai.config.global_config import GlobalConfig
 from kirara_ai.media.manager import MediaManager
 from kirara_ai.media.media_object import Media
 from kirara_ai.media.types.media_type import MediaType
+from kirara_ai.media.variants import THUMBNAIL_VARIANT
 
 from ...auth.middleware import require_auth
 from .models import MediaBatchDeleteRequest, MediaItem, MediaListResponse, MediaMetadata, MediaSearchParams
@@ -17,30 +16,30 @@ from .models import MediaBatchDeleteRequest, MediaItem, MediaListResponse, Media
 media_bp = Blueprint("media", __name__)
 
 
-# 生成缩略图
-async def generate_thumbnail(image_data: bytes) -> io.BytesIO:
-    """生成图片缩略图，并返回BytesIO对象"""
-    from PIL import Image
+# 媒体以内容的 SHA1 作为 ID，内容不会改变，可以长期缓存
+MEDIA_CACHE_TIMEOUT = 365 * 24 * 3600
+# 发送文件时每次读取的块大小
+FILE_CHUNK_SIZE = 256 * 1024
 
-    def _generate_thumbnail(image_data: bytes) -> io.BytesIO:
-        """在线程中运行的同步缩略图生成函数"""
-        with Image.open(io.BytesIO(image_data)) as img:
-            width, height = img.size
-            if width > height:
-                new_width = 300
-                new_height = int(height * (300 / width))
-            else:
-                new_height = 300
-                new_width = int(width * (300 / height))
+class MediaFileBody(FileBody):
+    """按较大的块读取文件，并支持 bytes=-N 形式的后缀范围请求"""
 
-            img.thumbnail((new_width, new_height))
-            output = io.BytesIO()
-            img = img.convert("RGB")
-            img.save(output, format="WEBP", optimize=True, quality=65)
-            output.seek(0)
-            return output
+    buffer_size = FILE_CHUNK_SIZE
 
-    return await asyncio.to_thread(_generate_thumbnail, image_data)
+    async def make_conditional(self, begin: int, end: Optional[int]) -> int:
+        if begin < 0:
+            begin = max(self.size + begin, 0)
+        return await super().make_conditional(begin, end)
+
+async def _send_media_file(path: Path, mimetype: Optional[str]) -> Response:
+    """
+    直接从磁盘按块发送文件，不将文件读入内存。
+    支持 Range 请求（视频和音频可以拖动进度）以及 ETag/Last-Modified 条件请求。
+    """
+    response = await send_file(path, mimetype=mimetype or "application/octet-stream", cache_timeout=MEDIA_CACHE_TIMEOUT)
+    response.response = MediaFileBody(path)
+    await response.make_conditional(request, accept_ranges=True, complete_length=response.response.size)
+    return response
 
 def _get_media_manager() -> MediaManager:
     """获取媒体管理器实例"""
@@ -78,10 +77,8 @@ async def list_media():
     
     manager = _get_media_manager()
     
-    # 构建搜索条件
-    all_media_ids = []
-    
     # 如果有指定内容类型，筛选对应类型
+    media_type = None
     if search_params.content_type:
         if search_params.content_type.startswith("image/"):
             media_type = MediaType.IMAGE
@@ -91,51 +88,23 @@ async def list_media():
             media_type = MediaType.AUDIO
         else:
             media_type = MediaType.FILE
-        
-        all_media_ids = manager.search_by_type(media_type)
-    else:
-        all_media_ids = manager.get_all_media_ids()
-    
-    # 如果有指定标签，继续筛选
-    if search_params.tags and len(search_params.tags) > 0:
-        filtered_ids = []
-        for media_id in all_media_ids:
-            metadata = manager.get_metadata(media_id)
-            if metadata and any(tag in metadata.tags for tag in search_params.tags):
-                filtered_ids.append(media_id)
-        all_media_ids = filtered_ids
-    
-    # 如果有搜索关键词，继续筛选
-    if search_params.query:
-        description_ids = manager.search_by_description(search_params.query)
-        source_ids = manager.search_by_source(search_params.query)
-        all_media_ids = [
-            media_id for media_id in all_media_ids
-            if media_id in description_ids or media_id in source_ids
-        ]
-    
-    # 如果有日期范围，继续筛选
-    if search_params.start_date or search_params.end_date:
-        filtered_ids = []
-        for media_id in all_media_ids:
-            metadata = manager.get_metadata(media_id)
-            if metadata:
-                tz = pytz.timezone(g.container.resolve(GlobalConfig).system.timezone)
-                created_at = metadata.created_at.replace(tzinfo=tz)
-                start_date = search_params.start_date.replace(tzinfo=tz) if search_params.start_date else None
-                if start_date and created_at < start_date:
-                    continue
-                end_date = search_params.end_date.replace(tzinfo=tz) if search_params.end_date else None
-                if end_date and created_at > end_date:
-                    continue
-                filtered_ids.append(media_id)
-        all_media_ids = filtered_ids
-    
-    # 计算分页
-    total = len(all_media_ids)
+
+    # 日期范围与媒体创建时间按同一时区比较
+    start_date = search_params.start_date.replace(tzinfo=None) if search_params.start_date else None
+    end_date = search_params.end_date.replace(tzinfo=None) if search_params.end_date else None
+
+    # 在索引上筛选并分页，只取当前页的媒体ID
     start_idx = (search_params.page - 1) * search_params.page_size
     end_idx = start_idx + search_params.page_size
-    page_ids = all_media_ids[start_idx:end_idx]
+    total, page_ids = manager.query_media(
+        media_type=media_type,
+        tags=search_params.tags or None,
+        keyword=search_params.query or None,
+        start_date=start_date,
+        end_date=end_date,
+        offset=start_idx,
+        limit=search_params.page_size,
+    )
     
     # 构建返回结果
     items = []
@@ -160,31 +129,39 @@ async def get_media_file(media_id):
     if not media:
         return jsonify({"error": "Media not found"}), 404
     
-    return await send_file(io.BytesIO(await media.get_data()), mimetype=media.metadata.mime_type)
+    path = await manager.get_file_path(media_id)
+    if not path:
+        return jsonify({"error": "Media not found"}), 404
+    return await _send_media_file(path, media.metadata.mime_type)
 
 @media_bp.route("/preview/<media_id>", methods=["GET"])
 @require_auth
 async def get_thumbnail(media_id):
     """获取缩略图"""
-    config = g.container.resolve(GlobalConfig)
     media_manager = _get_media_manager()
     media = media_manager.get_media(media_id)
     if not media:
         return jsonify({"error": "Media not found"}), 404
     
-    data = await media.get_data()
-    
-    if not data:
-        return jsonify({"error": "Media not found"}), 404
-    
     if media.metadata.media_type == MediaType.IMAGE:
+        # 缩略图只生成一次并保存在磁盘上，gif 和尺寸较小的图片直接返回原图
         if media.metadata.format == "gif":
-            return await send_file(io.BytesIO(data), mimetype="image/gif")
-        thumbnail = await generate_thumbnail(data)
-        return await send_file(thumbnail, mimetype="image/webp")
+            path = await media_manager.get_file_path(media_id)
+            mimetype = "image/gif"
+        else:
+            variant = await media_manager.get_variant_file(media_id, THUMBNAIL_VARIANT)
+            path = None
+            if variant:
+                mimetype, path = variant
+        if not path:
+            return jsonify({"error": "Media not found"}), 404
+        return await _send_media_file(path, mimetype)
     elif media.metadata.media_type == MediaType.VIDEO:
-        # 视频类型直接返回原始数据，不做缩略图处理
-        return await send_file(io.BytesIO(data), mimetype="video/mp4")
+        # 视频类型直接返回原始文件，不做缩略图处理
+        path = await media_manager.get_file_path(media_id)
+        if not path:
+            return jsonify({"error": "Media not found"}), 404
+        return await _send_media_file(path, media.metadata.mime_type or "video/mp4")
     else:
         return jsonify({"error": "Unsupported media type"}), 400
     
@@ -3,6 +3,46 @@ from typing import Dict, Optional
 from pydantic import BaseModel
 
 
+class MediaGCStats(BaseModel):
+    """媒体垃圾回收状态"""
+
+    running: bool
+    pending: int
+    deleted_count: int
+    bytes_reclaimed: int
+    last_run: Optional[float] = None
+    grace_period: float
+
+
+class MemoryResidencyStats(BaseModel):
+    """记忆驻留状态"""
+
+    resident_scopes: int
+    resident_bytes: int
+    max_scopes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    write_backs: int
+
+
+class MemoryWriteQueueStats(BaseModel):
+    """记忆写入队列状态"""
+
+    pending_scopes: int
+    max_pending: int
+    flush_interval: float
+    batch_size: int
+    submitted: int
+    coalesced: int
+    written: int
+    batches: int
+    failed_batches: int
+    backpressure_waits: int
+    backpressure_wait_time: float
+
+
 class SystemStatus(BaseModel):
     """系统状态信息"""
 
@@ -18,6 +58,9 @@ class SystemStatus(BaseModel):
     python_version: str
     platform: str
     has_proxy: bool
+    media_gc: Optional[MediaGCStats] = None
+    memory_residency: Optional[MemoryResidencyStats] = None
+    memory_write_queue: Optional[MemoryWriteQueueStats] = None
 
 
 
@@ -17,6 +17,9 @@ from kirara_ai.im.manager import IMManager
 from kirara_ai.internal import set_restart_flag, shutdown_event
 from kirara_ai.llm.llm_manager import LLMManager
 from kirara_ai.logger import WebSocketLogHandler, get_logger
+from kirara_ai.media.manager import MediaManager
+from kirara_ai.memory.memory_manager import MemoryManager
+from kirara_ai.memory.persistences.base import AsyncMemoryPersistence
 from kirara_ai.plugin_manager.plugin_loader import PluginLoader
 from kirara_ai.web.api.system.utils import (download_file, get_cpu_info, get_cpu_usage, get_installed_version,
                                             get_latest_npm_version, get_latest_pypi_version, get_memory_usage)
@@ -24,7 +27,8 @@ from kirara_ai.web.auth.services import AuthService
 from kirara_ai.workflow.core.workflow import WorkflowRegistry
 
 from ...auth.middleware import require_auth
-from .models import SystemStatus, SystemStatusResponse, UpdateCheckResponse
+from .models import (MediaGCStats, MemoryResidencyStats, MemoryWriteQueueStats, SystemStatus, SystemStatusResponse,
+                     UpdateCheckResponse)
 
 system_bp = Blueprint("system", __name__)
 
@@ -228,6 +232,21 @@ async def get_system_status():
     # 获取平台信息
     platform_info = f"{sys.platform}"
 
+    # 获取媒体垃圾回收状态
+    media_gc = None
+    if g.container.has(MediaManager):
+        media_gc = MediaGCStats(**g.container.resolve(MediaManager).gc.get_stats())
+
+    # 获取记忆驻留状态
+    memory_residency = None
+    memory_write_queue = None
+    if g.container.has(MemoryManager):
+        memory_manager = g.container.resolve(MemoryManager)
+        memory_residency = MemoryResidencyStats(**memory_manager.residency.get_stats())
+        # 获取记忆写入队列状态
+        if isinstance(memory_manager.persistence, AsyncMemoryPersistence):
+            memory_write_queue = MemoryWriteQueueStats(**memory_manager.persistence.get_stats())
+
     status = SystemStatus(
         uptime=uptime,
         active_adapters=active_adapters,
@@ -241,6 +260,9 @@ async def get_system_status():
         cpu_info=cpu_info,
         python_version=python_version,
         has_proxy=has_proxy,
+        media_gc=media_gc,
+        memory_residency=memory_residency,
+        memory_write_queue=memory_write_queue,
     )
 
     return SystemStatusResponse(status=status).model_dump()
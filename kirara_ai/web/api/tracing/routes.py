@@ -8,6 +8,7 @@ from kirara_ai.ioc.container import DependencyContainer
 from kirara_ai.logger import get_logger
 from kirara_ai.tracing.llm_tracer import LLMTracer
 from kirara_ai.tracing.manager import TracingManager
+from kirara_ai.tracing.workflow_tracer import WorkflowTracer
 from kirara_ai.web.auth.middleware import require_auth
 from kirara_ai.web.auth.services import AuthService
 
@@ -105,6 +106,26 @@ async def get_llm_statistics():
     return jsonify(stats)
 
 
+@tracing_bp.route("/workflow", methods=["GET"])
+@require_auth
+async def get_workflow_statistics():
+    """获取工作流执行耗时统计，按 block 类型和工作流 ID 给出 p50/p95/p99"""
+    hours = request.args.get("hours", 24, type=int)
+    if hours <= 0:
+        return jsonify({"error": "hours must be positive"}), 400
+
+    container: DependencyContainer = g.container
+    tracing_manager = container.resolve(TracingManager)
+    workflow_tracer = tracing_manager.get_tracer("workflow")
+
+    if not workflow_tracer:
+        return jsonify({"error": "Workflow tracer not found"}), 404
+    assert isinstance(workflow_tracer, WorkflowTracer)
+    # 统计需要同步查询数据库，放到线程中执行，避免阻塞事件循环
+    stats = await asyncio.to_thread(workflow_tracer.get_statistics, hours=hours)
+    return jsonify(stats)
+
+
 @tracing_bp.websocket("/ws")
 async def tracing_ws():
     """WebSocket接口，用于实时推送追踪日志"""
@@ -221,7 +221,7 @@ async def delete_workflow(group_id: str, workflow_id: str):
 
     try:
         # 从注册表中移除
-        registry._workflows.pop(full_id, None)
+        registry.unregister(group_id, workflow_id)
 
         # 删除文件
         file_path = registry.get_workflow_path(group_id, workflow_id)
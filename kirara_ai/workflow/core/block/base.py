@@ -1,3 +1,5 @@
+import asyncio
+import copy
 from typing import Any, Callable, Dict, List, Optional
 
 from kirara_ai.ioc.container import DependencyContainer
@@ -15,7 +17,9 @@ class Block:
     inputs: Dict[str, Input] = {}
     # block 的输出
     outputs: Dict[str, Output] = {}
-    
+    # 是否直接在事件循环中执行，仅适用于不会阻塞的轻量计算 block
+    inline: bool = False
+
     container: DependencyContainer
 
     def __init__(
@@ -33,9 +37,26 @@ class Block:
             self.outputs = outputs
 
     def execute(self, **kwargs) -> Dict[str, Any]:
+        """
+        执行 block 逻辑。
+        子类可以将其实现为 `async def execute`，此时执行器会直接在事件循环中等待它。
+        """
         # Placeholder for block logic
         return {output: f"Processed {kwargs}" for output in self.outputs}
 
+    def clone(self) -> "Block":
+        """
+        基于当前实例创建一个新的 block，用于每次执行工作流时获得独立的状态。
+        默认为浅拷贝，持有可变运行时状态的 block 需要重写此方法。
+        原型使用应用的根容器构建，克隆后 container 会换成该次执行的容器。
+        """
+        return copy.copy(self)
+
+    @property
+    def is_async(self) -> bool:
+        """execute 是否为协程函数"""
+        return asyncio.iscoroutinefunction(self.execute)
+
 
 class ConditionBlock(Block):
     """条件判断块"""
@@ -102,6 +123,11 @@ class LoopEndBlock(Block):
         self.inputs = inputs
         self.results: List[Dict[str, Any]] = []
 
+    def clone(self) -> "LoopEndBlock":
+        block = copy.copy(self)
+        block.results = []
+        return block
+
     def execute(self, **kwargs) -> Dict[str, Any]:
         self.results.append(kwargs)
         return {"loop_results": self.results}
@@ -33,9 +33,13 @@ class WorkflowDispatcher:
         """
         # 获取所有已启用的规则，按优先级排序
         active_rules = self.dispatch_registry.get_active_rules()
+        # 一次扫描消息内容，得到所有命中的关键词和前缀规则
+        indexed_matches = self.dispatch_registry.get_dispatch_index().search(message.content)
 
         for rule in active_rules:
-            if rule.match(message, self.workflow_registry):
+            if not indexed_matches.is_candidate(rule):
+                continue
+            if rule.match(message, self.workflow_registry, indexed_matches):
                 try:
                     self.logger.debug(f"Matched rule {rule}, executing workflow")
                     with self.container.scoped() as scoped_container:
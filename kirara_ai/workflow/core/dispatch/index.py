@@ -0,0 +1,150 @@
+from collections import deque
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from .models.dispatch_rules import CombinedDispatchRule
+from .rules.base import DispatchRule
+from .rules.message_rules import KeywordMatchRule, PrefixMatchRule
+
+T = TypeVar("T")
+
+
+class AhoCorasickAutomaton(Generic[T]):
+    """Aho–Corasick 多模式匹配自动机，一次扫描文本即可找出所有出现的模式"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        # 节点以下标表示，0 为根节点
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[T]] = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern: str, value: T):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append(value)
+
+    def _build(self):
+        """按广度优先顺序构建失配指针，并把失配节点的输出合并到当前节点"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def search(self, text: str) -> Set[T]:
+        """返回文本中出现过的所有模式对应的值"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: Set[T] = set(outputs[0])
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                found.update(outputs[node])
+        return found
+
+
+class PrefixTrie(Generic[T]):
+    """前缀树，一次扫描文本开头即可找出所有匹配的前缀"""
+
+    def __init__(self, prefixes: Iterable[Tuple[str, T]]):
+        self._root: Dict[str, dict] = {}
+        self._values: Dict[int, List[T]] = {}
+        for prefix, value in prefixes:
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            self._values.setdefault(id(node), []).append(value)
+
+    def search(self, text: str) -> Set[T]:
+        """返回所有是文本前缀的模式对应的值"""
+        found: Set[T] = set(self._values.get(id(self._root), ()))
+        node = self._root
+        for char in text:
+            next_node = node.get(char)
+            if next_node is None:
+                break
+            node = next_node
+            if id(node) in self._values:
+                found.update(self._values[id(node)])
+        return found
+
+
+class IndexedMatches:
+    """一条消息在调度索引上的匹配结果"""
+
+    def __init__(self, index: "DispatchIndex", matched: Set[int], candidates: Set[str]):
+        self._index = index
+        self._matched = matched
+        self._candidates = candidates
+
+    def get(self, rule: DispatchRule) -> Optional[bool]:
+        """获取规则实例的匹配结果，未被索引的规则返回 None，需要自行调用 match"""
+        key = id(rule)
+        if key not in self._index.indexed:
+            return None
+        return key in self._matched
+
+    def is_candidate(self, rule: CombinedDispatchRule) -> bool:
+        """判断组合规则是否可能匹配，依赖关键词或前缀但都未命中的规则可以直接跳过"""
+        return rule.rule_id not in self._index.gated_rule_ids or rule.rule_id in self._candidates
+
+
+class DispatchIndex:
+    """
+    调度规则索引，将所有已启用规则中的关键词规则和前缀规则合并为一个自动机，
+    每条消息只需扫描一次内容即可得到命中的规则，再按优先级和规则组语义进行判断。
+    """
+
+    def __init__(self, rules: List[CombinedDispatchRule]):
+        keywords: List[Tuple[str, int]] = []
+        prefixes: List[Tuple[str, int]] = []
+        # 被索引的规则实例，以 id 标识；同时保留实例引用，保证索引存活期间 id 不会被复用
+        self.indexed: Set[int] = set()
+        self._instances: List[DispatchRule] = []
+        # 规则实例所属的组合规则
+        self._owners: Dict[int, str] = {}
+        # 至少需要一个关键词或前缀命中才可能匹配的组合规则
+        self.gated_rule_ids: Set[str] = set()
+
+        for rule in rules:
+            for operator, rule_count, instances in rule.get_compiled_groups():
+                # 空规则组会直接视为匹配，之后的规则组不再参与判断
+                if rule_count == 0:
+                    break
+                indexed = [instance for instance in instances if isinstance(instance, (KeywordMatchRule, PrefixMatchRule))]
+                for instance in indexed:
+                    self._instances.append(instance)
+                    self.indexed.add(id(instance))
+                    self._owners[id(instance)] = rule.rule_id
+                    if isinstance(instance, KeywordMatchRule):
+                        keywords.extend((keyword, id(instance)) for keyword in instance.keywords)
+                    else:
+                        prefixes.append((instance.prefix, id(instance)))
+                if indexed and (operator == "and" or len(indexed) == len(instances)):
+                    self.gated_rule_ids.add(rule.rule_id)
+
+        self._keywords = AhoCorasickAutomaton(keywords)
+        self._prefixes = PrefixTrie(prefixes)
+
+    def search(self, content: str) -> IndexedMatches:
+        """扫描消息内容，返回命中的规则实例和候选组合规则"""
+        matched = self._keywords.search(content) | self._prefixes.search(content)
+        candidates = {self._owners[key] for key in matched}
+        return IndexedMatches(self, matched, candidates)
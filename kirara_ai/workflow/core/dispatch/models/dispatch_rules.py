@@ -1,6 +1,6 @@
-from typing import Any, Dict, List, Literal, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from kirara_ai.im.message import IMMessage
 from kirara_ai.ioc.container import DependencyContainer
@@ -8,6 +8,10 @@ from kirara_ai.logger import get_logger
 from kirara_ai.workflow.core.workflow import Workflow
 from kirara_ai.workflow.core.workflow.registry import WorkflowRegistry
 
+if TYPE_CHECKING:
+    from ..index import IndexedMatches
+    from ..rules.base import DispatchRule
+
 logger = get_logger("DispatchRule")
 
 class SimpleDispatchRule(BaseModel):
@@ -31,46 +35,87 @@ class CombinedDispatchRule(BaseModel):
     rule_groups: List[RuleGroup]  # 规则组之间是 AND 关系
     metadata: Dict[str, Any] = {}
 
-    def match(self, message: IMMessage, workflow_registry: WorkflowRegistry) -> bool:
+    # 预编译的规则组：(操作符, 配置的规则数量, 规则实例列表)
+    _compiled_groups: Optional[List[Tuple[str, int, List["DispatchRule"]]]] = PrivateAttr(default=None)
+    _compiled_registry: Optional[WorkflowRegistry] = PrivateAttr(default=None)
+
+    def compile(self, workflow_registry: WorkflowRegistry) -> None:
+        """
+        将规则组中的简单规则编译为规则实例，避免每条消息都重新校验配置和创建实例。
+        修改 rule_groups 后需要重新调用。
+        """
+        from ..rules.base import DispatchRule
+
+        compiled_groups: List[Tuple[str, int, List[DispatchRule]]] = []
+        for group in self.rule_groups:
+            instances: List[DispatchRule] = []
+            for rule in group.rules:
+                try:
+                    # 创建具体的规则实例
+                    rule_class = DispatchRule.get_rule_type(rule.type)
+                    instances.append(rule_class.from_config(
+                        rule_class.config_class(**rule.config),
+                        workflow_registry,
+                        self.workflow_id,
+                    ))
+                except Exception as e:
+                    # 如果规则创建失败，视为不匹配
+                    logger.error(f"Rule {rule.type} from config {rule.config} creation failed: {e}")
+            compiled_groups.append((group.operator, len(group.rules), instances))
+
+        self._compiled_groups = compiled_groups
+        self._compiled_registry = workflow_registry
+
+    def get_compiled_groups(self) -> List[Tuple[str, int, List["DispatchRule"]]]:
+        """获取预编译的规则组，尚未编译时返回空列表"""
+        return self._compiled_groups or []
+
+    def match(
+        self,
+        message: IMMessage,
+        workflow_registry: WorkflowRegistry,
+        indexed_matches: Optional["IndexedMatches"] = None,
+    ) -> bool:
         """
         判断消息是否匹配该规则。
         规则组之间是 AND 关系，规则组内部根据 operator 决定是 AND 还是 OR 关系。
+        如果提供了调度索引的匹配结果，已被索引的关键词和前缀规则直接使用索引结果。
         """
         # 如果规则被禁用，直接返回 False
         if not self.enabled:
             return False
 
+        if self._compiled_groups is None or self._compiled_registry is not workflow_registry:
+            self.compile(workflow_registry)
+        assert self._compiled_groups is not None
+
         # 所有规则组都必须匹配（AND 关系）
-        for group in self.rule_groups:
-            
+        for operator, rule_count, instances in self._compiled_groups:
+
             # 如果组内没有规则，视为匹配
-            if len(group.rules) == 0:
+            if rule_count == 0:
                 return True
 
             # 获取组内所有规则的匹配结果
             rule_results = []
-            for rule in group.rules:
+            for rule_instance in instances:
+                if indexed_matches is not None:
+                    indexed_result = indexed_matches.get(rule_instance)
+                    if indexed_result is not None:
+                        rule_results.append(indexed_result)
+                        continue
                 try:
-                    from ..rules.base import DispatchRule
-
-                    # 创建具体的规则实例
-                    rule_class = DispatchRule.get_rule_type(rule.type)
-                    rule_instance = rule_class.from_config(
-                        rule_class.config_class(**rule.config),
-                        workflow_registry,
-                        self.workflow_id,
-                    )
                     rule_results.append(rule_instance.match(message))
                 except Exception as e:
-                    # 如果规则创建或匹配过程出错，视为不匹配
-                    logger.error(f"Rule {rule.type} from config {rule.config} creation or matching failed: {e}")
+                    # 如果规则匹配过程出错，视为不匹配
+                    logger.error(f"Rule {rule_instance.type_name} matching failed: {e}")
                     continue
 
             # 根据操作符确定组的匹配结果
             if not rule_results:  # 如果组内没有有效规则，视为不匹配
                 return False
 
-            if group.operator == "and":
+            if operator == "and":
                 if not all(rule_results):  # AND 关系：所有规则都必须匹配
                     return False
             else:  # operator == "or"
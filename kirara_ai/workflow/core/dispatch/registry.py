@@ -7,6 +7,7 @@ from kirara_ai.ioc.container import DependencyContainer
 from kirara_ai.logger import get_logger
 from kirara_ai.workflow.core.workflow.registry import WorkflowRegistry
 
+from .index import DispatchIndex
 from .models.dispatch_rules import CombinedDispatchRule, RuleGroup, SimpleDispatchRule
 from .rules.base import DispatchRule
 from .rules.message_rules import BotMentionMatchRule, KeywordMatchRule, PrefixMatchRule, RegexMatchRule
@@ -21,6 +22,9 @@ class DispatchRuleRegistry:
         self.container = container
         self.workflow_registry = container.resolve(WorkflowRegistry)
         self.rules: Dict[str, CombinedDispatchRule] = {}
+        # 已启用规则按优先级排序后的缓存，规则变更时失效
+        self._active_rules: Optional[List[CombinedDispatchRule]] = None
+        self._dispatch_index: Optional[DispatchIndex] = None
         self.logger = get_logger("DispatchRuleRegistry")
         self.rules_dir = "data/dispatch_rules"
 
@@ -28,7 +32,9 @@ class DispatchRuleRegistry:
         """注册一个调度规则"""
         if not rule.rule_id:
             raise ValueError("Rule must have an ID")
+        rule.compile(self.workflow_registry)
         self.rules[rule.rule_id] = rule
+        self._invalidate_active_rules()
         self.logger.info(f"Registered dispatch rule: {rule}")
 
     def get_rule(self, rule_id: str) -> Optional[CombinedDispatchRule]:
@@ -41,8 +47,21 @@ class DispatchRuleRegistry:
 
     def get_active_rules(self) -> List[CombinedDispatchRule]:
         """获取所有已启用的规则，按优先级降序排序"""
-        active_rules = [rule for rule in self.rules.values() if rule.enabled]
-        return sorted(active_rules, key=lambda x: x.priority, reverse=True)
+        if self._active_rules is None:
+            active_rules = [rule for rule in self.rules.values() if rule.enabled]
+            self._active_rules = sorted(active_rules, key=lambda x: x.priority, reverse=True)
+        return list(self._active_rules)
+
+    def get_dispatch_index(self) -> DispatchIndex:
+        """获取由所有已启用规则构建的关键词和前缀索引"""
+        if self._dispatch_index is None:
+            self._dispatch_index = DispatchIndex(self.get_active_rules())
+        return self._dispatch_index
+
+    def _invalidate_active_rules(self):
+        """规则增删或启用状态变化后，清除已启用规则和调度索引的缓存"""
+        self._active_rules = None
+        self._dispatch_index = None
 
     def create_rule(self, rule: CombinedDispatchRule) -> CombinedDispatchRule:
         """创建并注册一个新规则"""
@@ -71,6 +90,7 @@ class DispatchRuleRegistry:
         if rule_id not in self.rules:
             raise ValueError(f"Rule {rule_id} not found")
         del self.rules[rule_id]
+        self._invalidate_active_rules()
 
     def enable_rule(self, rule_id: str):
         """启用规则"""
@@ -78,6 +98,8 @@ class DispatchRuleRegistry:
         if not rule:
             raise ValueError(f"Rule {rule_id} not found")
         rule.enabled = True
+        rule.compile(self.workflow_registry)
+        self._invalidate_active_rules()
 
     def disable_rule(self, rule_id: str):
         """禁用规则"""
@@ -85,6 +107,7 @@ class DispatchRuleRegistry:
         if not rule:
             raise ValueError(f"Rule {rule_id} not found")
         rule.enabled = False
+        self._invalidate_active_rules()
 
     def _convert_old_rule(self, rule_data: Dict[str, Any]) -> CombinedDispatchRule:
         """将旧版本规则数据转换为新版本格式"""
@@ -1,8 +1,10 @@
 import asyncio
-import functools
-from collections import defaultdict
+import os
+import threading
+import time
+import uuid
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set
 
 from kirara_ai.events.event_bus import EventBus
 from kirara_ai.ioc.container import DependencyContainer
@@ -11,7 +13,37 @@ from kirara_ai.logger import get_logger
 from kirara_ai.workflow.core.block import Block, ConditionBlock, LoopBlock
 from kirara_ai.workflow.core.block.registry import BlockRegistry
 from kirara_ai.workflow.core.execution.exceptions import BlockExecutionFailedException
+from kirara_ai.workflow.core.execution.span import BlockSpan, get_block_type
 from kirara_ai.workflow.core.workflow import Workflow
+from kirara_ai.workflow.core.workflow.compiled import validate_wire_types
+
+# 进程内共享的 Block 执行线程池，所有工作流共用，避免每次执行都创建新的线程池
+DEFAULT_BLOCK_EXECUTOR_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_block_executor: Optional[ThreadPoolExecutor] = None
+_block_executor_lock = threading.Lock()
+
+
+def get_block_executor() -> ThreadPoolExecutor:
+    """获取共享的 Block 执行线程池，首次调用时创建"""
+    global _block_executor
+    if _block_executor is None:
+        with _block_executor_lock:
+            if _block_executor is None:
+                _block_executor = ThreadPoolExecutor(
+                    max_workers=DEFAULT_BLOCK_EXECUTOR_WORKERS,
+                    thread_name_prefix="workflow-block",
+                )
+    return _block_executor
+
+
+def shutdown_block_executor(wait: bool = True) -> None:
+    """关闭共享的 Block 执行线程池，下次获取时会重新创建"""
+    global _block_executor
+    with _block_executor_lock:
+        if _block_executor is not None:
+            _block_executor.shutdown(wait=wait)
+            _block_executor = None
 
 
 class WorkflowExecutor:
@@ -31,6 +63,8 @@ class WorkflowExecutor:
         self.event_bus = event_bus
         self.results: Dict[str, Any] = {}
         self.variables: Dict[str, Any] = {}  # 存储工作流变量
+        # 同一工作流内同时执行的 block 数上限，None 表示不限制
+        self.max_concurrency: Optional[int] = workflow.max_concurrency
         self.logger.info(
             f"Initializing WorkflowExecutor for workflow '{workflow.name}'"
         )
@@ -39,33 +73,19 @@ class WorkflowExecutor:
 
     def _build_execution_graph(self):
         """构建执行图，包含并行和条件逻辑"""
-        self.execution_graph = defaultdict(list)
         # self.logger.debug("Building execution graph...")
+        if not self.workflow.validated:
+            try:
+                validate_wire_types(self.workflow.wires, self.registry)
+            except TypeError as e:
+                self.logger.error(str(e))
+                raise
+        self.wire_index = self.workflow.wire_index
+        self.blocks_by_name = self.workflow.blocks_by_name
 
-        for wire in self.workflow.wires:
-            # self.logger.debug(f"Processing wire: {wire.source_block.name}.{wire.source_output} -> "
-            #                  f"{wire.target_block.name}.{wire.target_input}")
-
-            # 验证连线的数据类型是否匹配
-            source_output = wire.source_block.outputs[wire.source_output]
-            target_input = wire.target_block.inputs[wire.target_input]
-            
-            # 使用 BlockRegistry 的类型系统进行类型兼容性检查
-            source_type = self.registry._type_system.get_type_name(source_output.data_type)
-            target_type = self.registry._type_system.get_type_name(target_input.data_type)
-            
-            if not self.registry.is_type_compatible(source_type, target_type):
-                error_msg = (
-                    f"Type mismatch in wire: {wire.source_block.name}.{wire.source_output} "
-                    f"({source_type}) -> {wire.target_block.name}.{wire.target_input} "
-                    f"({target_type})"
-                )
-                self.logger.error(error_msg)
-                raise TypeError(error_msg)
-                
-            # 将目标块添加到源块的执行图中
-            self.execution_graph[wire.source_block].append(wire.target_block)
-            # self.logger.debug(f"Added edge: {wire.source_block.name} -> {wire.target_block.name}")
+    def _successors(self, block: Block) -> List[Block]:
+        """获取后继节点，可能包含重复项"""
+        return [self.blocks_by_name[name] for name in self.wire_index.get_successors(block.name)]
 
     async def run(self) -> Dict[str, Any]:
         """
@@ -73,57 +93,154 @@ class WorkflowExecutor:
 
         :return: 包含每个块执行结果的字典，键为块名，值为块的输出
         """
-        from kirara_ai.events import WorkflowExecutionBegin, WorkflowExecutionEnd
+        from kirara_ai.events import WorkflowExecutionBegin, WorkflowExecutionEnd, WorkflowExecutionFail
+        self.trace_id = str(uuid.uuid4())
+        self.start_time = time.time()
+        self.spans: List[BlockSpan] = []
         self.event_bus.post(WorkflowExecutionBegin(self.workflow, self))
         self.logger.info("Starting workflow execution")
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as executor:
-            # 从入口节点开始执行
-            entry_blocks = [block for block in self.workflow.blocks if not block.inputs]
-            # self.logger.debug(f"Identified entry blocks: {[b.name for b in entry_blocks]}")
+        loop = asyncio.get_running_loop()
+        executor = get_block_executor()
+        self._started: Set[str] = set()
+        self._remaining_predecessors: Dict[str, int] = dict(self.wire_index.in_degree)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        # 从入口节点开始执行
+        entry_blocks = [block for block in self.workflow.blocks if not block.inputs]
+        # self.logger.debug(f"Identified entry blocks: {[b.name for b in entry_blocks]}")
+        try:
             await self._execute_nodes(entry_blocks, executor, loop)
+        except Exception as e:
+            self.event_bus.post(WorkflowExecutionFail(self.workflow, self, e))
+            raise
 
         self.logger.info("Workflow execution completed")
         self.event_bus.post(WorkflowExecutionEnd(self.workflow, self, self.results))
         return self.results
 
-    async def _execute_nodes(self, blocks: List[Block], executor, loop):
-        """执行一组节点"""
-        # self.logger.debug(f"Executing node group: {[b.name for b in blocks]}")
+    async def _run_block(self, block: Block, inputs: Dict[str, Any], executor, loop, span: BlockSpan) -> Dict[str, Any]:
+        """
+        按 block 的类型选择执行方式：
+        协程 block 直接在事件循环中等待，轻量 block 在事件循环中同步执行，
+        其余可能阻塞的 block 放入共享线程池执行。
+        """
+        if block.is_async:
+            span.mark_started()
+            return await block.execute(**inputs)
+        if block.inline:
+            span.mark_started()
+            return block.execute(**inputs)
 
-        for block in blocks:
-            # self.logger.debug(f"Processing block: {block.name} ({type(block).__name__})")
-            if isinstance(block, ConditionBlock):
-                await self._execute_conditional_branch(block, executor, loop)
-            elif isinstance(block, LoopBlock):
-                await self._execute_loop(block, executor, loop)
+        def call():
+            span.mark_started()
+            return block.execute(**inputs)
+
+        return await loop.run_in_executor(executor, call)
+
+    async def _execute_nodes(self, blocks: List[Block], executor, loop):
+        """
+        从给定节点开始按拓扑顺序调度执行。
+        前置节点全部完成的节点会立即作为任务启动，互不依赖的分支并发执行，
+        直到没有新的可执行节点为止。
+        """
+        tasks: Set[asyncio.Task] = set()
+
+        def launch(block: Block):
+            if block.name in self._started or not self._can_execute(block):
+                # self.logger.debug(f"Block {block.name} dependencies not met, skipping execution")
+                return
+            self._started.add(block.name)
+            if block.inline and not isinstance(block, (ConditionBlock, LoopBlock)):
+                # 轻量 block 无需创建任务，直接执行并继续调度后继节点
+                for next_block in self._release_successors(self._execute_inline_block(block)):
+                    launch(next_block)
             else:
-                await self._execute_normal_block(block, executor, loop)
+                tasks.add(asyncio.create_task(self._execute_block(block, executor, loop)))
+
+        try:
+            for block in blocks:
+                launch(block)
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    for next_block in self._release_successors(task.result()):
+                        launch(next_block)
+        finally:
+            # 任一节点失败时取消其余仍在执行的节点
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _release_successors(self, blocks: List[Block]) -> List[Block]:
+        """标记一个前置节点已完成，返回所有前置节点均已完成的后继节点"""
+        ready = []
+        for block in blocks:
+            self._remaining_predecessors[block.name] = self._remaining_predecessors.get(block.name, 0) - 1
+            if self._remaining_predecessors[block.name] <= 0:
+                ready.append(block)
+        return ready
+
+    async def _execute_block(self, block: Block, executor, loop) -> List[Block]:
+        """执行单个节点，返回需要通知的后继节点"""
+        if isinstance(block, ConditionBlock):
+            return await self._execute_conditional_branch(block, executor, loop)
+        elif isinstance(block, LoopBlock):
+            return await self._execute_loop(block, executor, loop)
+        else:
+            return await self._execute_normal_block(block, executor, loop)
 
-    async def _execute_conditional_branch(self, block: ConditionBlock, executor, loop):
-        """执行条件分支"""
-        self.logger.info(f"Executing ConditionBlock: {block.name}")
+    async def _run_limited(self, block: Block, executor, loop) -> Dict[str, Any]:
+        """收集输入并在工作流并发上限内执行 block，同时记录执行耗时"""
+        span = BlockSpan(block.name, get_block_type(block))
+        gather_start = time.perf_counter()
         inputs = self._gather_inputs(block)
-        # self.logger.debug(f"ConditionBlock inputs: {list(inputs.keys())}")
+        span.gather_time = time.perf_counter() - gather_start
+        # self.logger.debug(f"Input parameters: {list(inputs.keys())}")
 
-        result = await loop.run_in_executor(executor, block.execute, **inputs)
+        span.mark_ready()
+        try:
+            if self._semaphore is None:
+                result = await self._run_block(block, inputs, executor, loop, span)
+            else:
+                async with self._semaphore:
+                    result = await self._run_block(block, inputs, executor, loop, span)
+        except BaseException as e:
+            span.mark_finished(error=e)
+            self._record_span(span)
+            raise
+        span.mark_finished(result)
+        self._record_span(span)
+        return result
+
+    def _record_span(self, span: BlockSpan):
+        """保存 block 执行记录并发布事件"""
+        from kirara_ai.events.tracing import WorkflowBlockSpanEvent
+
+        self.spans.append(span)
+        self.event_bus.post(WorkflowBlockSpanEvent(self.trace_id, self.workflow, span))
+
+    async def _execute_conditional_branch(self, block: ConditionBlock, executor, loop) -> List[Block]:
+        """执行条件分支"""
+        self.logger.info(f"Executing ConditionBlock: {block.name}")
+        result = await self._run_limited(block, executor, loop)
         self.results[block.name] = result
         self.logger.info(
             f"ConditionBlock {block.name} evaluation result: {result['condition_result']}"
         )
 
-        next_blocks = self.execution_graph[block]
+        next_blocks = self._successors(block)
         if result["condition_result"]:
             # self.logger.debug(f"Taking THEN branch: {next_blocks[0].name}")
-            await self._execute_nodes([next_blocks[0]], executor, loop)
+            return [next_blocks[0]]
         elif len(next_blocks) > 1:
             # self.logger.debug(f"Taking ELSE branch: {next_blocks[1].name}")
-            await self._execute_nodes([next_blocks[1]], executor, loop)
+            return [next_blocks[1]]
         else:
             # self.logger.debug("No ELSE branch available")
-            pass
+            return []
 
-    async def _execute_loop(self, block: LoopBlock, executor, loop):
+    async def _execute_loop(self, block: LoopBlock, executor, loop) -> List[Block]:
         """执行循环"""
         self.logger.info(f"Starting LoopBlock: {block.name}")
         iteration = 0
@@ -131,10 +248,7 @@ class WorkflowExecutor:
         while True:
             iteration += 1
             # self.logger.debug(f"LoopBlock {block.name} iteration #{iteration}")
-            inputs = self._gather_inputs(block)
-            # self.logger.debug(f"LoopBlock inputs: {list(inputs.keys())}")
-
-            result = await loop.run_in_executor(executor, block.execute, **inputs)
+            result = await self._run_limited(block, executor, loop)
             self.results[block.name] = result
             self.logger.info(
                 f"LoopBlock {block.name} continuation check: {result['should_continue']}"
@@ -146,48 +260,55 @@ class WorkflowExecutor:
                 )
                 break
 
-            # self.logger.debug(f"Executing loop body: {self.execution_graph[block][0].name}")
-            loop_body = self.execution_graph[block][0]
-            await self._execute_nodes([loop_body], executor, loop)
+            loop_body = self._successors(block)[0]
+            # self.logger.debug(f"Executing loop body: {loop_body.name}")
+            await self._execute_nodes(self._release_successors([loop_body]), executor, loop)
+        return []
 
-    async def _execute_normal_block(self, block: Block, executor, loop):
+    async def _execute_normal_block(self, block: Block, executor, loop) -> List[Block]:
         """执行普通块"""
-        # self.logger.debug(f"Evaluating Block: {block.name}")
-        futures = []
+        self.logger.info(f"Executing Block: {block.name}")
 
-        if self._can_execute(block):
-            inputs = self._gather_inputs(block)
-            self.logger.info(f"Executing Block: {block.name}")
-            # self.logger.debug(f"Input parameters: {list(inputs.keys())}")
+        try:
+            result = await self._run_limited(block, executor, loop)
+        except BlockExecutionFailedException as e:
+            raise e
+        except Exception as e:
+            raise BlockExecutionFailedException(f"Block {block.name} execution failed: {e}") from e
 
-            future = loop.run_in_executor(
-                executor, functools.partial(block.execute, **inputs)
-            )
-            futures.append((future, block))
-        else:
-            # self.logger.debug(f"Block {block.name} dependencies not met, skipping execution")
-            return
+        return self._complete_block(block, result)
 
-        # 等待所有并行任务完成
-        for future, block in futures:
-            try:
-                result = await future
-                self.results[block.name] = result
-                self.logger.info(f"Block [{block.name}] executed successfully")
-                if result:
-                    # self.logger.debug(f"Execution result keys: {list(result.keys())}")
-                    pass
-                next_blocks = self.execution_graph[block]
-                if next_blocks:
-                    # self.logger.debug(f"Propagating to next blocks: {[b.name for b in next_blocks]}")
-                    await self._execute_nodes(next_blocks, executor, loop)
-                else:
-                    # self.logger.debug(f"Block {block.name} is terminal node")
-                    pass
-            except BlockExecutionFailedException as e:
-                raise e
-            except Exception as e:
-                raise BlockExecutionFailedException(f"Block {block.name} execution failed: {e}") from e
+    def _execute_inline_block(self, block: Block) -> List[Block]:
+        """在事件循环中同步执行轻量块"""
+        self.logger.info(f"Executing Block: {block.name}")
+        span = BlockSpan(block.name, get_block_type(block))
+
+        try:
+            gather_start = time.perf_counter()
+            inputs = self._gather_inputs(block)
+            span.gather_time = time.perf_counter() - gather_start
+            span.mark_ready()
+            span.mark_started()
+            result = block.execute(**inputs)
+        except BlockExecutionFailedException as e:
+            span.mark_finished(error=e)
+            self._record_span(span)
+            raise e
+        except Exception as e:
+            span.mark_finished(error=e)
+            self._record_span(span)
+            raise BlockExecutionFailedException(f"Block {block.name} execution failed: {e}") from e
+        span.mark_finished(result)
+        self._record_span(span)
+
+        return self._complete_block(block, result)
+
+    def _complete_block(self, block: Block, result: Dict[str, Any]) -> List[Block]:
+        """记录块的执行结果，返回需要通知的后继节点"""
+        self.results[block.name] = result
+        self.logger.info(f"Block [{block.name}] executed successfully")
+        # 同一对节点之间可能存在多条连线，只通知一次
+        return list(dict.fromkeys(self._successors(block)))
 
     def _can_execute(self, block: Block) -> bool:
         """检查节点是否可以执行"""
@@ -198,29 +319,18 @@ class WorkflowExecutor:
             # self.logger.debug(f"Block {block.name} has already been executed")
             return False
 
-        # 获取所有直接前置blocks
-        predecessor_blocks = set()
-        for wire in self.workflow.wires:
-            if wire.target_block == block:
-                predecessor_blocks.add(wire.source_block)
-
         # 确保所有前置blocks都已执行完成
-        for pred_block in predecessor_blocks:
-            if pred_block.name not in self.results:
-                # self.logger.debug(f"Predecessor block {pred_block.name} not yet executed")
+        for pred_name in self.wire_index.get_predecessors(block.name):
+            if pred_name not in self.results:
+                # self.logger.debug(f"Predecessor block {pred_name} not yet executed")
                 return False
 
         # 验证所有输入是否都能从正确的前置block获取
         for input_name in block.inputs:
-            input_satisfied = False
-            for wire in self.workflow.wires:
-                if (
-                    wire.target_block == block
-                    and wire.target_input == input_name
-                    and wire.source_block.name in self.results
-                ):
-                    input_satisfied = True
-                    break
+            input_satisfied = any(
+                source_name in self.results
+                for source_name, _ in self.wire_index.get_input_sources(block.name, input_name)
+            )
 
             # 如果输入没有被满足，并且输入不是可空的，则返回False
             if not input_satisfied and not block.inputs[input_name].nullable:
@@ -235,24 +345,18 @@ class WorkflowExecutor:
         # self.logger.debug(f"Gathering inputs for Block: {block.name}")
         inputs = {}
 
-        # 创建输入名称到wire的映射
-        input_wire_map = {}
-        for wire in self.workflow.wires:
-            if wire.target_block == block:
-                input_wire_map[wire.target_input] = wire
-
         # 根据wire的连接关系收集输入
         for input_name in block.inputs:
-            if input_name in input_wire_map:
-                wire = input_wire_map[input_name]
-                if wire.source_block.name in self.results:
-                    inputs[input_name] = self.results[wire.source_block.name][
-                        wire.source_output
-                    ]
-                    # self.logger.debug(f"Resolved input {input_name} from {wire.source_block.name}.{wire.source_output}")
+            input_sources = self.wire_index.get_input_sources(block.name, input_name)
+            if input_sources:
+                # 同一输入存在多条连线时以最后一条为准
+                source_name, source_output = input_sources[-1]
+                if source_name in self.results:
+                    inputs[input_name] = self.results[source_name][source_output]
+                    # self.logger.debug(f"Resolved input {input_name} from {source_name}.{source_output}")
                 else:
                     raise BlockExecutionFailedException(
-                        f"Source block {wire.source_block.name} not executed for input {input_name}"
+                        f"Source block {source_name} not executed for input {input_name}"
                     )
             elif not block.inputs[input_name].nullable:
                 raise BlockExecutionFailedException(
@@ -0,0 +1,75 @@
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from kirara_ai.workflow.core.block import Block
+
+
+def get_block_type(block: Block) -> str:
+    """获取 block 的类型标识，已注册的 block 使用注册 id，否则使用类名"""
+    return getattr(type(block), "id", None) or type(block).__name__
+
+
+def estimate_output_size(result: Any) -> int:
+    """估算 block 输出的大小（字节），仅统计每个输出值本身，不递归计算"""
+    if not isinstance(result, dict):
+        return sys.getsizeof(result)
+    return sum(sys.getsizeof(value) for value in result.values())
+
+
+@dataclass
+class BlockSpan:
+    """单个 block 的一次执行记录，耗时单位均为秒"""
+
+    block_name: str
+    block_type: str
+    # 开始执行的时间戳
+    start_time: float = 0.0
+    # 执行耗时
+    duration: float = 0.0
+    # 输入就绪后等待并发配额和执行线程的时间
+    queue_wait: float = 0.0
+    # 收集输入的耗时
+    gather_time: float = 0.0
+    # 输出的估算大小（字节）
+    output_size: int = 0
+    error: Optional[str] = None
+
+    _ready_at: float = field(default=0.0, repr=False)
+    _started_at: float = field(default=0.0, repr=False)
+
+    @property
+    def end_time(self) -> float:
+        return self.start_time + self.duration
+
+    def mark_ready(self):
+        """输入收集完成，开始等待执行"""
+        self._ready_at = time.perf_counter()
+
+    def mark_started(self):
+        """block 开始执行，可能在工作线程中调用"""
+        self._started_at = time.perf_counter()
+        self.start_time = time.time()
+        self.queue_wait = self._started_at - self._ready_at
+
+    def mark_finished(self, result: Any = None, error: Optional[BaseException] = None):
+        if self._started_at:
+            self.duration = time.perf_counter() - self._started_at
+        if error is not None:
+            self.error = str(error)
+        elif result is not None:
+            self.output_size = estimate_output_size(result)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "block_name": self.block_name,
+            "block_type": self.block_type,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "queue_wait": self.queue_wait,
+            "gather_time": self.gather_time,
+            "output_size": self.output_size,
+            "error": self.error,
+        }
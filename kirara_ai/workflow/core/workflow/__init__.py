@@ -1,5 +1,6 @@
 from .base import Wire, Workflow
 from .builder import WorkflowBuilder
+from .compiled import CompiledWorkflow
 from .registry import WorkflowRegistry
 
-__all__ = ["Workflow", "WorkflowBuilder", "WorkflowRegistry", "Wire"]
+__all__ = ["CompiledWorkflow", "Workflow", "WorkflowBuilder", "WorkflowRegistry", "Wire"]
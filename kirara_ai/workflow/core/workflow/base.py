@@ -1,14 +1,85 @@
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
 
 from kirara_ai.workflow.core.block import Block
 
 
+class WireIndex:
+    """
+    工作流连线索引，按 block 名称预先整理前置节点、后继节点和输入来源，
+    避免执行时对所有连线做线性扫描。
+    索引只依赖 block 名称，因此可以在同一工作流的多个实例之间共享。
+    """
+
+    def __init__(self, wires: List["Wire"]):
+        # 源块 -> 目标块列表，按连线顺序保存，可能包含重复项
+        self.successors: Dict[str, List[str]] = defaultdict(list)
+        # 目标块 -> 前置块集合
+        self.predecessors: Dict[str, Set[str]] = defaultdict(set)
+        # 目标块 -> 输入名 -> 连接到该输入的 (源块, 源输出) 列表
+        self.input_sources: Dict[str, Dict[str, List[Tuple[str, str]]]] = defaultdict(lambda: defaultdict(list))
+
+        for wire in wires:
+            source_name = wire.source_block.name
+            target_name = wire.target_block.name
+            self.successors[source_name].append(target_name)
+            self.predecessors[target_name].add(source_name)
+            self.input_sources[target_name][wire.target_input].append((source_name, wire.source_output))
+
+        # 每个节点的前置节点数（入度），同一对节点之间的多条连线只计一次
+        self.in_degree: Dict[str, int] = {
+            name: len(predecessors) for name, predecessors in self.predecessors.items()
+        }
+
+    def get_successors(self, block_name: str) -> List[str]:
+        return self.successors.get(block_name, [])
+
+    def get_predecessors(self, block_name: str) -> Set[str]:
+        return self.predecessors.get(block_name, set())
+
+    def get_input_sources(self, block_name: str, input_name: str) -> List[Tuple[str, str]]:
+        block_sources = self.input_sources.get(block_name)
+        if block_sources is None:
+            return []
+        return block_sources.get(input_name, [])
+
+
 class Workflow:
-    def __init__(self, name: str, blocks: List["Block"], wires: List["Wire"], id: Optional[str] = None):
+    def __init__(
+        self,
+        name: str,
+        blocks: List["Block"],
+        wires: List["Wire"],
+        id: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+    ):
         self.name = name
         self.blocks = blocks
         self.wires = wires
         self.id = id
+        # 同时执行的 block 数上限，None 表示不限制
+        self.max_concurrency = max_concurrency
+        # 连线类型是否已经检查过，由 CompiledWorkflow 创建的实例无需重复检查
+        self.validated = False
+        self._wire_index: Optional[WireIndex] = None
+        self._blocks_by_name: Optional[Dict[str, Block]] = None
+
+    @property
+    def wire_index(self) -> WireIndex:
+        """连线索引，首次访问时构建并缓存，修改 wires 后需调用 invalidate_wire_index"""
+        if self._wire_index is None:
+            self._wire_index = WireIndex(self.wires)
+        return self._wire_index
+
+    @property
+    def blocks_by_name(self) -> Dict[str, Block]:
+        if self._blocks_by_name is None:
+            self._blocks_by_name = {block.name: block for block in self.blocks}
+        return self._blocks_by_name
+
+    def invalidate_wire_index(self):
+        self._wire_index = None
+        self._blocks_by_name = None
 
 
 class Wire:
@@ -177,6 +177,8 @@ class WorkflowBuilder:
         self.id: Optional[str] = None
         self.name: str = name
         self.description: str = ""
+        # 同时执行的 block 数上限，None 表示不限制
+        self.max_concurrency: Optional[int] = None
         self.head: Optional[Node] = None
         self.current: Optional[Node] = None
         self.nodes: List[Node] = []  # 存储所有节点
@@ -466,7 +468,13 @@ class WorkflowBuilder:
             if source_block and target_block:
                 wires.append(Wire(source_block, source_output, target_block, target_input))
 
-        return Workflow(name=self.name, blocks=blocks, wires=wires, id=self.id)
+        return Workflow(
+            name=self.name,
+            blocks=blocks,
+            wires=wires,
+            id=self.id,
+            max_concurrency=self.max_concurrency,
+        )
 
     def force_connect(
         self,
@@ -507,6 +515,8 @@ class WorkflowBuilder:
             "description": self.description,
             "blocks": [],
         }
+        if self.max_concurrency:
+            workflow_data["max_concurrency"] = self.max_concurrency
 
         def serialize_node(node: Node) -> dict:
             block_data: Dict[str, Any] = {
@@ -575,6 +585,7 @@ class WorkflowBuilder:
 
         builder: WorkflowBuilder = cls(workflow_data["name"])
         builder.description = workflow_data.get("description", "")
+        builder.max_concurrency = workflow_data.get("max_concurrency")
         registry: BlockRegistry = container.resolve(BlockRegistry)
 
         # 第一遍：创建所有块
@@ -0,0 +1,72 @@
+from typing import Dict, List, Tuple
+
+from kirara_ai.ioc.container import DependencyContainer
+from kirara_ai.workflow.core.block import Block
+from kirara_ai.workflow.core.block.registry import BlockRegistry
+
+from .base import Wire, Workflow
+
+
+def validate_wire_types(wires: List[Wire], registry: BlockRegistry):
+    """检查所有连线两端的数据类型是否兼容，不兼容时抛出 TypeError"""
+    for wire in wires:
+        source_output = wire.source_block.outputs[wire.source_output]
+        target_input = wire.target_block.inputs[wire.target_input]
+
+        # 使用 BlockRegistry 的类型系统进行类型兼容性检查
+        source_type = registry._type_system.get_type_name(source_output.data_type)
+        target_type = registry._type_system.get_type_name(target_input.data_type)
+
+        if not registry.is_type_compatible(source_type, target_type):
+            raise TypeError(
+                f"Type mismatch in wire: {wire.source_block.name}.{wire.source_output} "
+                f"({source_type}) -> {wire.target_block.name}.{wire.target_input} "
+                f"({target_type})"
+            )
+
+
+class CompiledWorkflow:
+    """
+    编译后的工作流。
+    Block 的实例化、连线类型检查和连线索引只在编译时进行一次，
+    每次执行时通过 instantiate 克隆 block 原型得到独立的工作流实例。
+    """
+
+    def __init__(self, workflow: Workflow, registry: BlockRegistry):
+        validate_wire_types(workflow.wires, registry)
+        self.name = workflow.name
+        self.id = workflow.id
+        self.max_concurrency = workflow.max_concurrency
+        self._prototypes: Tuple[Block, ...] = tuple(workflow.blocks)
+        self._wire_specs: Tuple[Tuple[str, str, str, str], ...] = tuple(
+            (wire.source_block.name, wire.source_output, wire.target_block.name, wire.target_input)
+            for wire in workflow.wires
+        )
+        self.wire_index = workflow.wire_index
+
+    def instantiate(self, container: DependencyContainer) -> Workflow:
+        """创建一个用于单次执行的工作流实例"""
+        blocks: List[Block] = []
+        blocks_by_name: Dict[str, Block] = {}
+        for prototype in self._prototypes:
+            block = prototype.clone()
+            block.container = container
+            blocks.append(block)
+            blocks_by_name[block.name] = block
+
+        wires = [
+            Wire(blocks_by_name[source_name], source_output, blocks_by_name[target_name], target_input)
+            for source_name, source_output, target_name, target_input in self._wire_specs
+        ]
+
+        workflow = Workflow(
+            name=self.name,
+            blocks=blocks,
+            wires=wires,
+            id=self.id,
+            max_concurrency=self.max_concurrency,
+        )
+        workflow.validated = True
+        workflow._wire_index = self.wire_index
+        workflow._blocks_by_name = blocks_by_name
+        return workflow
@@ -4,8 +4,10 @@ from typing import Dict, Optional
 
 from kirara_ai.ioc.container import DependencyContainer
 from kirara_ai.logger import get_logger
+from kirara_ai.workflow.core.block.registry import BlockRegistry
 from kirara_ai.workflow.core.workflow.base import Workflow
 from kirara_ai.workflow.core.workflow.builder import WorkflowBuilder
+from kirara_ai.workflow.core.workflow.compiled import CompiledWorkflow
 
 
 class WorkflowRegistry:
@@ -15,6 +17,8 @@ class WorkflowRegistry:
 
     def __init__(self, container: DependencyContainer):
         self._workflows: Dict[str, WorkflowBuilder] = {}
+        # 已编译工作流缓存，工作流注册、注销或重新加载时失效
+        self._compiled: Dict[str, CompiledWorkflow] = {}
         self.logger = get_logger("WorkflowRegistry")
         self.container = container
 
@@ -47,6 +51,7 @@ class WorkflowRegistry:
     def unregister(self, group_id: str, workflow_id: str):
         """注销一个工作流"""
         full_name = f"{group_id}:{workflow_id}"
+        self.invalidate(full_name)
         if full_name in self._workflows:
             del self._workflows[full_name]
             self.logger.info(f"Unregistered workflow: {full_name}")
@@ -60,6 +65,7 @@ class WorkflowRegistry:
             self.logger.warning(f"Workflow {full_name} already registered, overwriting")
         workflow_builder.id = full_name
         self._workflows[full_name] = workflow_builder
+        self.invalidate(full_name)
         self.logger.info(f"Registered workflow: {full_name}")
 
     def register_preset_workflow(
@@ -73,12 +79,37 @@ class WorkflowRegistry:
             )
             return
         self._workflows[full_name] = workflow_builder
+        self.invalidate(full_name)
         self.logger.info(f"Registered preset workflow: {full_name}")
-    
-    def get_workflow(self, name: str, container: DependencyContainer) -> Optional[Workflow]:
+
+    def invalidate(self, name: Optional[str] = None):
+        """使已编译的工作流缓存失效，name 为空时清空全部缓存"""
+        if name is None:
+            self._compiled.clear()
+        else:
+            self._compiled.pop(name, None)
+
+    def get_compiled_workflow(self, name: str) -> Optional[CompiledWorkflow]:
+        """
+        获取已编译的工作流，首次获取时编译并缓存。
+        Block 原型使用应用的根容器构建，每次执行时由 instantiate 换成该次执行的容器，
+        因此 block 在构造时不能从容器中获取或保存单次消息相关的状态。
+        """
+        compiled = self._compiled.get(name)
+        if compiled is not None:
+            return compiled
         builder = self._workflows.get(name)
-        if builder:
-            return builder.build(container)
+        if builder is None:
+            return None
+        compiled = CompiledWorkflow(builder.build(self.container), self.container.resolve(BlockRegistry))
+        self._compiled[name] = compiled
+        return compiled
+
+    def get_workflow(self, name: str, container: DependencyContainer) -> Optional[Workflow]:
+        """获取一个用于单次执行的工作流实例，container 为该次执行的容器"""
+        compiled = self.get_compiled_workflow(name)
+        if compiled:
+            return compiled.instantiate(container)
         return None
     
     def get(
@@ -93,6 +124,7 @@ class WorkflowRegistry:
     def load_workflows(self, workflows_dir: Optional[str] = None):
         """从指定目录加载所有工作流定义"""
         workflows_dir = workflows_dir or self.WORKFLOWS_DIR
+        self.invalidate()
         if not os.path.exists(workflows_dir):
             os.makedirs(workflows_dir)
 
@@ -21,6 +21,7 @@ class GetIMMessage(Block):
     """获取 IM 消息"""
 
     name = "msg_input"
+    inline = True
     container: DependencyContainer
     outputs = {
         "msg": Output("msg", "IM 消息", IMMessage, "获取 IM 发送的最新一条的消息"),
@@ -76,6 +77,7 @@ class IMMessageToText(Block):
     """IMMessage 转纯文本"""
 
     name = "im_message_to_text"
+    inline = True
     container: DependencyContainer
     inputs = {"msg": Input("msg", "IM 消息", IMMessage, "IM 消息")}
     outputs = {"text": Output("text", "纯文本", str, "纯文本")}
@@ -89,6 +91,7 @@ class TextToIMMessage(Block):
     """纯文本转 IMMessage"""
 
     name = "text_to_im_message"
+    inline = True
     container: DependencyContainer
     inputs = {"text": Input("text", "纯文本", str, "纯文本")}
     outputs = {"msg": Output("msg", "IM 消息", IMMessage, "IM 消息")}
@@ -107,6 +110,7 @@ class AppendIMMessage(Block):
     """补充 IMMessage 消息"""
 
     name = "concat_im_message"
+    inline = True
     container: DependencyContainer
     inputs = {
         "base_msg": Input("base_msg", "IM 消息", IMMessage, "IM 消息"),
@@ -9,6 +9,8 @@ T = TypeVar("T")
 
 
 class SetVariableBlock(Block):
+    inline = True
+
     def __init__(self, container: DependencyContainer):
         inputs: Dict[str, Input] = {
             "name": Input("name", "变量名", str, "变量名"),
@@ -25,6 +27,8 @@ class SetVariableBlock(Block):
 
 
 class GetVariableBlock(Block):
+    inline = True
+
     def __init__(self, container: DependencyContainer, var_type: Type[T]):
         inputs = {
             "name": Input("name", "变量名", str, "变量名"),
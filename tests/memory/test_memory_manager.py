@@ -23,8 +23,8 @@ class DummyMemoryPersistence(MemoryPersistence):
         self.storage: Dict[str, List[MemoryEntry]] = {}
 
     def load(self, scope_key: str) -> List[MemoryEntry]:
-        """从存储加载记忆"""
-        return self.storage.get(scope_key, [])
+        """从存储加载记忆，与实际的持久化层一样返回新的列表"""
+        return list(self.storage.get(scope_key, []))
 
     def save(self, scope_key: str, entries: List[MemoryEntry]) -> None:
         """将记忆保存到存储"""
@@ -135,20 +135,20 @@ class TestMemoryManager:
         assert len(memory_manager.memories["test_scope"]) == 2
         assert memory_manager.memories["test_scope"][-1].content == "message 2"
 
-    def test_shutdown(self, memory_manager, test_entry):
+    def test_shutdown(self, memory_manager, test_entry, mock_scope):
         """测试关闭"""
         # 添加一些测试数据
-        memory_manager.memories = {"scope1": [test_entry], "scope2": [test_entry]}
+        memory_manager.store(mock_scope, test_entry)
+        persistence = memory_manager.persistence
+        assert isinstance(persistence, DummyMemoryPersistence)
+        persistence.save = MagicMock(wraps=persistence.save)
 
         # 关闭
         memory_manager.shutdown()
 
-        # 验证所有数据都被保存 (由于使用的是 DummyPersistence，这里实际上没有持久化操作)
-        # 可以添加一些断言来验证 DummyPersistence 的行为是否符合预期
-        persistence = memory_manager.persistence
-        assert isinstance(persistence, DummyMemoryPersistence)
-        assert persistence.storage["scope1"] == [test_entry]
-        assert persistence.storage["scope2"] == [test_entry]
+        # 记忆在存储时已经写入，关闭时不会重新保存
+        persistence.save.assert_not_called()
+        assert persistence.storage["test_scope"] == [test_entry]
 
     def test_clear_memory(self, memory_manager, mock_scope):
         """测试清空记忆"""
@@ -166,3 +166,173 @@ class TestMemoryManager:
         persistence = memory_manager.persistence
         assert isinstance(persistence, DummyMemoryPersistence)
         assert persistence.storage["test_scope"] == []
+
+    def test_query_by_scope_key(self, memory_manager):
+        """测试普通作用域只查询自身作用域键的记忆，全局作用域使用跨作用域索引"""
+        from kirara_ai.im.sender import ChatSender
+        from kirara_ai.memory.scopes import GlobalScope, GroupScope, MemberScope
+
+        alice = ChatSender.from_group_chat("alice", "group1", "Alice")
+        bob = ChatSender.from_group_chat("bob", "group1", "Bob")
+        carol = ChatSender.from_c2c_chat("carol", "Carol")
+        group_scope, member_scope, global_scope = GroupScope(), MemberScope(), GlobalScope()
+
+        entries = [
+            MemoryEntry(sender=sender, content=f"message {i}", timestamp=datetime(2024, 1, 1, 12, i), metadata={})
+            for i, sender in enumerate([alice, bob, carol, alice])
+        ]
+        for entry in entries:
+            memory_manager.store(group_scope, entry)
+        memory_manager.store(member_scope, entries[1])
+
+        assert memory_manager.query(group_scope, bob) == [entries[0], entries[1], entries[3]]
+        assert memory_manager.query(member_scope, bob) == [entries[1]]
+        assert memory_manager.query(group_scope, carol) == [entries[2]]
+
+        # 全局作用域按时间顺序返回所有已加载的记忆
+        older = MemoryEntry(sender=carol, content="older", timestamp=datetime(2024, 1, 1, 11, 0), metadata={})
+        memory_manager.store(global_scope, older)
+        assert [entry.content for entry in memory_manager.query(global_scope, alice)] == [
+            "older", "message 0", "message 1", "message 1", "message 2", "message 3"
+        ]
+
+        # 清空的记忆不再出现在跨作用域查询中
+        memory_manager.clear_memory(group_scope, alice)
+        assert [entry.content for entry in memory_manager.query(global_scope, alice)] == [
+            "older", "message 1", "message 2"
+        ]
+
+    def test_cross_scope_index_threads(self):
+        """测试多个线程同时修改跨作用域列表后，列表与各作用域的记忆一致"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from kirara_ai.im.sender import ChatSender
+        from kirara_ai.memory.index import CrossScopeIndex
+        from kirara_ai.memory.scopes import GlobalScope
+
+        index = CrossScopeIndex()
+        sender = ChatSender.from_c2c_chat("alice", "Alice")
+
+        def worker(i: int):
+            scope_key = f"scope{i % 21}"
+            kept = []
+            for j in range(50):
+                timestamp = datetime(2024, 1, 1, 12, j % 60)
+                entry = MemoryEntry(sender=sender, content=f"{i}-{j}", timestamp=timestamp, metadata={})
+                index.add(scope_key, [entry])
+                kept.append(entry)
+                # 只保留最后 5 条
+                if len(kept) > 5:
+                    index.remove(scope_key, kept[:-5])
+                    kept = kept[-5:]
+            return kept
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            kept = [entry for entries in executor.map(worker, range(42)) for entry in entries]
+
+        assert len(index) == len(kept)
+        assert {id(entry) for entry in index.query(GlobalScope(), sender)} == {id(entry) for entry in kept}
+
+    def test_residency_eviction(self, memory_manager):
+        """测试作用域超过数量限制时按 LRU 淘汰，淘汰后重新加载"""
+        from kirara_ai.im.sender import ChatSender
+        from kirara_ai.memory.scopes import MemberScope
+
+        scope = MemberScope()
+        memory_manager.residency.configure(max_scopes=2, max_bytes=0)
+        senders = [ChatSender.from_c2c_chat(f"user{i}", f"User {i}") for i in range(3)]
+        for sender in senders:
+            memory_manager.store(scope, MemoryEntry(sender=sender, content=sender.user_id, metadata={}))
+            # 访问第一个作用域，使其成为最近使用的作用域
+            memory_manager.query(scope, senders[0])
+
+        assert set(memory_manager.memories) == {"c2c:user0", "c2c:user2"}
+        stats = memory_manager.residency.get_stats()
+        assert stats["resident_scopes"] == 2
+        assert stats["evictions"] == 1
+
+        # 被淘汰的作用域从持久化层重新加载
+        assert [entry.content for entry in memory_manager.query(scope, senders[1])] == ["user1"]
+        assert set(memory_manager.memories) == {"c2c:user0", "c2c:user1"}
+        assert memory_manager.residency.get_stats()["evictions"] == 2
+
+    def test_global_query_after_eviction(self, memory_manager):
+        """测试作用域被淘汰后，全局作用域的查询结果不变"""
+        from datetime import timedelta
+
+        from kirara_ai.im.sender import ChatSender
+        from kirara_ai.memory.scopes import GlobalScope, MemberScope
+
+        scope, global_scope = MemberScope(), GlobalScope()
+        senders = [ChatSender.from_c2c_chat(f"user{i}", f"User {i}") for i in range(3)]
+        start = datetime(2024, 1, 1)
+        for i, sender in enumerate(senders):
+            memory_manager.store(scope, MemoryEntry(
+                sender=sender, content=sender.user_id, timestamp=start + timedelta(minutes=i), metadata={}
+            ))
+        expected = [entry.content for entry in memory_manager.query(global_scope, senders[0])]
+        assert expected == ["user0", "user1", "user2"]
+
+        # 存储新记忆时触发淘汰，只保留当前作用域
+        memory_manager.residency.configure(max_scopes=1, max_bytes=0)
+        memory_manager.store(scope, MemoryEntry(
+            sender=senders[1], content="again", timestamp=start + timedelta(minutes=3), metadata={}
+        ))
+        assert list(memory_manager.memories) == ["c2c:user1"]
+
+        assert [entry.content for entry in memory_manager.query(global_scope, senders[0])] == expected + ["again"]
+        # 被淘汰的作用域只用于查询，不会重新驻留
+        assert set(memory_manager.memories) <= {"c2c:user1", "global"}
+
+    def test_concurrent_store_with_eviction(self, memory_manager):
+        """测试多个线程同时存储记忆并触发淘汰时，内存缓存、跨作用域列表和驻留状态保持一致"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from kirara_ai.im.sender import ChatSender
+        from kirara_ai.memory.scopes import MemberScope
+
+        scope = MemberScope()
+        memory_manager.residency.configure(max_scopes=5, max_bytes=0)
+        senders = [ChatSender.from_group_chat(f"u{i}", "g", f"User {i}") for i in range(21)]
+
+        def worker(i: int):
+            for j in range(200):
+                sender = senders[(i * 7 + j) % len(senders)]
+                memory_manager.store(scope, MemoryEntry(sender=sender, content=f"{i}-{j}", metadata={}))
+                memory_manager.query(scope, sender)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # 任一线程抛出异常时 result() 会重新抛出
+            for future in [executor.submit(worker, i) for i in range(8)]:
+                future.result()
+
+        assert len(memory_manager.memories) <= 5
+        assert set(memory_manager.residency.candidates()) == set(memory_manager.memories)
+        resident_entries = sum(len(entries) for entries in memory_manager.memories.values())
+        assert len(memory_manager.cross_scope_index) == resident_entries
+
+    def test_residency_write_back(self, container):
+        """测试淘汰尚未写入的作用域前先写入持久化层"""
+        from kirara_ai.im.sender import ChatSender
+        from kirara_ai.memory.persistences.base import AsyncMemoryPersistence
+        from kirara_ai.memory.scopes import MemberScope
+
+        dummy = DummyMemoryPersistence()
+        persistence = AsyncMemoryPersistence(dummy)
+        manager = MemoryManager(container, persistence=persistence)
+        manager.residency.configure(max_scopes=1, max_bytes=0)
+        scope = MemberScope()
+        # 暂停后台写入，模拟写入积压
+        with persistence._save_lock:
+            alice = ChatSender.from_c2c_chat("alice", "Alice")
+            manager.store(scope, MemoryEntry(sender=alice, content="hello", metadata={}))
+            assert persistence.is_dirty("c2c:alice")
+            # 尚未写入时重新加载能读到最新的记忆
+            assert [entry.content for entry in persistence.load("c2c:alice")] == ["hello"]
+        bob = ChatSender.from_c2c_chat("bob", "Bob")
+        manager.store(scope, MemoryEntry(sender=bob, content="hi", metadata={}))
+
+        assert list(manager.memories) == ["c2c:bob"]
+        assert [entry.content for entry in dummy.storage["c2c:alice"]] == ["hello"]
+        assert [entry.content for entry in manager.query(scope, alice)] == ["hello"]
+        persistence.stop()
@@ -1,6 +1,7 @@
 import os
 import shutil
 import tempfile
+import time
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
@@ -8,7 +9,8 @@ import pytest
 
 from kirara_ai.im.sender import ChatSender, ChatType
 from kirara_ai.memory.entry import MemoryEntry
-from kirara_ai.memory.persistences import FileMemoryPersistence, RedisMemoryPersistence
+from kirara_ai.memory.persistences import AsyncMemoryPersistence, FileMemoryPersistence, RedisMemoryPersistence, WriteOp
+from kirara_ai.memory.persistences.codecs import get_codec
 
 # ==================== 常量区 ====================
 TEST_USER_1 = "user1"
@@ -81,7 +83,7 @@ class TestFileMemoryPersistence:
         file_persistence.save(TEST_SCOPE, test_entries)
 
         # 验证文件是否创建
-        file_path = os.path.join(test_dir, f"{TEST_SCOPE}.json")
+        file_path = os.path.join(test_dir, f"{TEST_SCOPE}.jsonl")
         assert os.path.exists(file_path)
 
         # 测试加载
@@ -101,12 +103,116 @@ class TestFileMemoryPersistence:
         entries = file_persistence.load("nonexistent")
         assert entries == []
 
+    def test_append_and_trim(self, file_persistence, test_entries, test_dir):
+        file_persistence.append(TEST_SCOPE, [test_entries[0]])
+        file_persistence.append(TEST_SCOPE, [test_entries[1]], max_entries=1)
+
+        # 追加写入不会重写已有的记录
+        file_path = os.path.join(test_dir, f"{TEST_SCOPE}.jsonl")
+        with open(file_path, "r", encoding="utf-8") as f:
+            assert len(f.readlines()) == 3
+
+        loaded_entries = file_persistence.load(TEST_SCOPE)
+        assert [entry.content for entry in loaded_entries] == [TEST_CONTENT_2]
+
+        # 重新打开后结果相同
+        reopened = FileMemoryPersistence(test_dir)
+        assert [entry.content for entry in reopened.load(TEST_SCOPE)] == [TEST_CONTENT_2]
+
+    def test_compaction(self, file_persistence, test_entries, test_dir):
+        for _ in range(100):
+            file_persistence.append(TEST_SCOPE, [test_entries[0]], max_entries=10)
+
+        # 记录数超过有效记忆数的两倍时会压缩日志
+        file_path = os.path.join(test_dir, f"{TEST_SCOPE}.jsonl")
+        with open(file_path, "r", encoding="utf-8") as f:
+            assert len(f.readlines()) <= 64
+        assert len(file_persistence.load(TEST_SCOPE)) == 10
+
+    def test_load_corrupted_line(self, file_persistence, test_entries, test_dir):
+        file_persistence.save(TEST_SCOPE, test_entries)
+        file_path = os.path.join(test_dir, f"{TEST_SCOPE}.jsonl")
+        with open(file_path, "a", encoding="utf-8") as f:
+            f.write('{"content": "trunc')
+
+        assert len(file_persistence.load(TEST_SCOPE)) == 2
+
+    def test_load_legacy_file(self, file_persistence, test_entries, test_dir):
+        import json
+
+        from kirara_ai.memory.persistences.codecs import MemoryJSONEncoder, serialize_entry
+
+        legacy_path = os.path.join(test_dir, f"{TEST_SCOPE}.json")
+        with open(legacy_path, "w", encoding="utf-8") as f:
+            json.dump([serialize_entry(entry) for entry in test_entries], f, cls=MemoryJSONEncoder)
+
+        loaded_entries = file_persistence.load(TEST_SCOPE)
+        assert [entry.content for entry in loaded_entries] == [TEST_CONTENT_1, TEST_CONTENT_2]
+        assert loaded_entries[0].timestamp == TEST_TIMESTAMP_1
+
+        # 旧版文件被转换为日志文件
+        assert not os.path.exists(legacy_path)
+        assert os.path.exists(os.path.join(test_dir, f"{TEST_SCOPE}.jsonl"))
+
+
+class TestMemoryCodecs:
+    @pytest.mark.parametrize("codec_name", ["json", "orjson"])
+    def test_round_trip(self, codec_name, test_entries, chat_senders):
+        codec = get_codec(codec_name)
+        entry = MemoryEntry(
+            sender=chat_senders[0],
+            content=TEST_CONTENT_1,
+            timestamp=datetime(2024, 1, 1, 12, 0, 0, 123456),
+            metadata={"reply_to": chat_senders[1], "count": 1},
+        )
+        for original in test_entries + [entry]:
+            data = codec.encode(original)
+            assert b"\n" not in data
+            decoded = codec.decode(data)
+            assert decoded.sender == original.sender
+            assert decoded.content == original.content
+            assert decoded.timestamp == original.timestamp
+            assert decoded.metadata == original.metadata
+
+    def test_read_other_versions(self, test_dir, test_entries):
+        # 使用 json 写入的日志可以用 orjson 读取，反之亦然
+        FileMemoryPersistence(test_dir, codec=get_codec("json")).save(TEST_SCOPE, test_entries[:1])
+        orjson_persistence = FileMemoryPersistence(test_dir, codec=get_codec("orjson"))
+        orjson_persistence.append(TEST_SCOPE, test_entries[1:])
+
+        for codec_name in ["json", "orjson"]:
+            loaded_entries = FileMemoryPersistence(test_dir, codec=get_codec(codec_name)).load(TEST_SCOPE)
+            assert [entry.content for entry in loaded_entries] == [TEST_CONTENT_1, TEST_CONTENT_2]
+            assert [entry.sender for entry in loaded_entries] == [entry.sender for entry in test_entries]
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            get_codec("unknown")
+
 
 class TestRedisMemoryPersistence:
     def test_save(self, redis_persistence, redis_mock, test_entries):
         # 测试保存
         redis_persistence.save(TEST_SCOPE, test_entries)
-        redis_mock.set.assert_called_once()
+        pipe = redis_mock.pipeline.return_value
+        pipe.delete.assert_called_once_with(TEST_SCOPE)
+        pipe.rpush.assert_called_once()
+        assert len(pipe.rpush.call_args[0]) == 1 + len(test_entries)
+        pipe.execute.assert_called_once()
+
+    def test_append(self, redis_persistence, redis_mock, test_entries):
+        redis_persistence.append(TEST_SCOPE, test_entries[:1], max_entries=10)
+        pipe = redis_mock.pipeline.return_value
+        pipe.rpush.assert_called_once()
+        pipe.ltrim.assert_called_once_with(TEST_SCOPE, -10, -1)
+        pipe.execute.assert_called_once()
+
+    def test_load_list(self, redis_persistence, redis_mock, test_entries):
+        redis_mock.type.return_value = b"list"
+        redis_mock.lrange.return_value = [redis_persistence.codec.encode(entry) for entry in test_entries]
+        loaded_entries = redis_persistence.load(TEST_SCOPE)
+        assert [entry.content for entry in loaded_entries] == [TEST_CONTENT_1, TEST_CONTENT_2]
+        redis_mock.get.assert_not_called()
 
     def test_load_with_data(self, redis_persistence, redis_mock, chat_senders):
         # Mock Redis 返回数据
@@ -148,3 +254,97 @@ class TestRedisMemoryPersistence:
     def test_load_no_data(self, redis_persistence, redis_mock):
         redis_mock.get.return_value = None
         assert redis_persistence.load(TEST_SCOPE) == []
+
+    def test_write_batch(self, redis_persistence, redis_mock, test_entries):
+        redis_persistence.write_batch(
+            [
+                (TEST_SCOPE, WriteOp("save", tuple(test_entries))),
+                ("other_scope", WriteOp("append", tuple(test_entries[:1]), 10)),
+            ]
+        )
+        # 一批操作只使用一个管道
+        redis_mock.pipeline.assert_called_once()
+        pipe = redis_mock.pipeline.return_value
+        assert pipe.rpush.call_count == 2
+        pipe.ltrim.assert_called_once_with("other_scope", -10, -1)
+        pipe.execute.assert_called_once()
+
+
+class TestAsyncMemoryPersistence:
+    def test_coalesce_and_drain(self, file_persistence, test_entries):
+        file_persistence.write_batch = MagicMock(wraps=file_persistence.write_batch)
+        persistence = AsyncMemoryPersistence(file_persistence, flush_interval=60)
+        entries = []
+        for i in range(10):
+            entries.append(test_entries[i % 2])
+            persistence.save(TEST_SCOPE, entries)
+        # 之后修改列表不影响已提交的快照
+        entries.clear()
+
+        assert persistence.get_stats()["coalesced"] == 9
+        assert len(persistence.load(TEST_SCOPE)) == 10
+
+        # 停止时写入所有尚未写入的操作，同一作用域只写入最新的快照
+        persistence.stop()
+        file_persistence.write_batch.assert_called_once()
+        assert len(file_persistence.load(TEST_SCOPE)) == 10
+
+    def test_coalesce_appends(self, file_persistence, test_entries):
+        persistence = AsyncMemoryPersistence(file_persistence, flush_interval=60)
+        for _ in range(5):
+            persistence.append(TEST_SCOPE, test_entries, max_entries=3)
+        assert len(persistence._pending[TEST_SCOPE]) == 1
+        assert len(persistence.load(TEST_SCOPE)) == 3
+        persistence.stop()
+        assert len(file_persistence.load(TEST_SCOPE)) == 3
+
+    def test_batch_size(self, file_persistence, test_entries):
+        persistence = AsyncMemoryPersistence(file_persistence, flush_interval=60, batch_size=2)
+        for i in range(4):
+            persistence.save(f"scope_{i}", test_entries)
+        persistence.stop()
+        stats = persistence.get_stats()
+        assert stats["batches"] == 2
+        assert stats["written"] == 4
+        assert stats["pending_scopes"] == 0
+
+    def test_backpressure(self, file_persistence, test_entries):
+        persistence = AsyncMemoryPersistence(file_persistence, flush_interval=60, max_pending=2)
+        for i in range(5):
+            persistence.save(f"scope_{i}", test_entries)
+        # 队列满时等待后台线程写入
+        assert persistence.get_stats()["backpressure_waits"] > 0
+        assert persistence.get_stats()["pending_scopes"] <= 2
+        persistence.stop()
+        for i in range(5):
+            assert len(file_persistence.load(f"scope_{i}")) == 2
+
+    def test_failed_batch_is_retried(self, file_persistence, test_entries):
+        write_batch = file_persistence.write_batch
+        file_persistence.write_batch = MagicMock(side_effect=[OSError("disk full"), None])
+        persistence = AsyncMemoryPersistence(file_persistence, flush_interval=60)
+        persistence.save(TEST_SCOPE, test_entries)
+
+        # 写入失败的操作放回队列，之后重试
+        assert not persistence._flush_batch()
+        assert persistence.is_dirty(TEST_SCOPE)
+        assert persistence._flush_batch()
+        assert not persistence.is_dirty(TEST_SCOPE)
+
+        file_persistence.write_batch = write_batch
+        persistence.stop()
+        assert persistence.get_stats()["failed_batches"] == 1
+
+    def test_failed_batch_backoff(self, file_persistence, test_entries):
+        file_persistence.write_batch = MagicMock(side_effect=OSError("disk full"))
+        persistence = AsyncMemoryPersistence(
+            file_persistence, flush_interval=0.05, batch_size=1, max_retry_delay=0.2
+        )
+        persistence.save(TEST_SCOPE, test_entries)
+        time.sleep(0.6)
+
+        # 持久化层持续失败时按退避间隔重试，而不是连续重试
+        attempts = file_persistence.write_batch.call_count
+        assert 2 <= attempts <= 8
+        assert persistence.is_dirty(TEST_SCOPE)
+        persistence.stop()
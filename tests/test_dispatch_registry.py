@@ -0,0 +1,110 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from kirara_ai.im.message import IMMessage, TextMessage
+from kirara_ai.im.sender import ChatSender
+from kirara_ai.ioc.container import DependencyContainer
+from kirara_ai.workflow.core.dispatch import CombinedDispatchRule, DispatchRuleRegistry, RuleGroup, SimpleDispatchRule
+from kirara_ai.workflow.core.dispatch.rules.message_rules import RegexMatchRule
+from kirara_ai.workflow.core.workflow.registry import WorkflowRegistry
+
+
+@pytest.fixture
+def registry():
+    container = DependencyContainer()
+    container.register(WorkflowRegistry, MagicMock(spec=WorkflowRegistry))
+    return DispatchRuleRegistry(container)
+
+
+def create_rule(rule_id: str, priority: int = 5, rules=None, operator="or") -> CombinedDispatchRule:
+    return CombinedDispatchRule(
+        rule_id=rule_id,
+        name=rule_id,
+        workflow_id="test:workflow",
+        priority=priority,
+        rule_groups=[RuleGroup(operator=operator, rules=rules if rules is not None else [
+            SimpleDispatchRule(type="prefix", config={"prefix": f"/{rule_id}"})
+        ])],
+    )
+
+
+def create_message(text: str) -> IMMessage:
+    return IMMessage(sender=ChatSender.from_c2c_chat("user", "user"), message_elements=[TextMessage(text)])
+
+
+def test_active_rules_sorted_and_cached(registry):
+    """测试已启用规则按优先级排序，并在变更后刷新"""
+    registry.register(create_rule("low", priority=1))
+    registry.register(create_rule("high", priority=10))
+
+    assert [rule.rule_id for rule in registry.get_active_rules()] == ["high", "low"]
+
+    registry.disable_rule("high")
+    assert [rule.rule_id for rule in registry.get_active_rules()] == ["low"]
+
+    registry.enable_rule("high")
+    registry.register(create_rule("mid", priority=5))
+    assert [rule.rule_id for rule in registry.get_active_rules()] == ["high", "mid", "low"]
+
+    registry.delete_rule("mid")
+    assert [rule.rule_id for rule in registry.get_active_rules()] == ["high", "low"]
+
+
+def test_rules_compiled_once(registry):
+    """测试规则实例只在注册时创建，匹配时不再重新创建"""
+    rule = create_rule("regex", rules=[SimpleDispatchRule(type="regex", config={"pattern": r"^/r\d+"})])
+
+    with patch.object(RegexMatchRule, "from_config", wraps=RegexMatchRule.from_config) as from_config:
+        registry.register(rule)
+        for _ in range(5):
+            assert rule.match(create_message("/r42"), registry.workflow_registry)
+        assert not rule.match(create_message("hello"), registry.workflow_registry)
+        assert from_config.call_count == 1
+
+
+def test_compiled_match_semantics(registry):
+    """测试编译后的规则保持原有的组合语义"""
+    and_rule = create_rule("and", operator="and", rules=[
+        SimpleDispatchRule(type="prefix", config={"prefix": "/chat"}),
+        SimpleDispatchRule(type="keyword", config={"keywords": ["hello"]}),
+    ])
+    registry.register(and_rule)
+    assert and_rule.match(create_message("/chat hello"), registry.workflow_registry)
+    assert not and_rule.match(create_message("/chat bye"), registry.workflow_registry)
+
+    # 无效的规则配置被视为不匹配
+    invalid_rule = create_rule("invalid", rules=[SimpleDispatchRule(type="unknown", config={})])
+    registry.register(invalid_rule)
+    assert not invalid_rule.match(create_message("anything"), registry.workflow_registry)
+
+    # 空规则组视为匹配
+    empty_rule = create_rule("empty", rules=[])
+    registry.register(empty_rule)
+    assert empty_rule.match(create_message("anything"), registry.workflow_registry)
+
+
+def test_dispatch_index_matches_linear_scan(registry):
+    """测试调度索引的结果与逐条规则匹配一致"""
+    registry.register(create_rule("kw", rules=[SimpleDispatchRule(type="keyword", config={"keywords": ["he", "she", "hers"]})]))
+    registry.register(create_rule("prefix", rules=[SimpleDispatchRule(type="prefix", config={"prefix": "/ab"})]))
+    registry.register(create_rule("mixed", rules=[
+        SimpleDispatchRule(type="keyword", config={"keywords": ["xyz"]}),
+        SimpleDispatchRule(type="regex", config={"pattern": r"\d{3}"}),
+    ]))
+    registry.register(create_rule("fallback", priority=0, rules=[SimpleDispatchRule(type="fallback", config={})]))
+
+    index = registry.get_dispatch_index()
+    for text in ["ushers", "/abc", "/a", "123", "xyz", "nothing", ""]:
+        message = create_message(text)
+        indexed_matches = index.search(message.content)
+        for rule in registry.get_active_rules():
+            expected = rule.match(message, registry.workflow_registry)
+            actual = indexed_matches.is_candidate(rule) and rule.match(
+                message, registry.workflow_registry, indexed_matches
+            )
+            assert actual == expected, (text, rule.rule_id)
+
+    # 规则变更后重建索引
+    registry.disable_rule("kw")
+    assert registry.get_dispatch_index() is not index
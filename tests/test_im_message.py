@@ -0,0 +1,67 @@
+import copy
+import pickle
+
+import pytest
+
+from kirara_ai.im.message import ImageMessage, IMMessage, MentionElement, TextMessage, VoiceMessage
+from kirara_ai.im.sender import ChatSender
+
+
+@pytest.fixture
+def sender():
+    return ChatSender.from_c2c_chat("user", "user")
+
+
+def test_content_cached_and_invalidated(sender):
+    """测试 content 缓存会在消息元素变化时失效"""
+    message = IMMessage(sender=sender, message_elements=[TextMessage("hello")])
+    assert message.content == "hello"
+    assert message.content is message.content
+
+    message.message_elements.append(TextMessage("world"))
+    assert message.content == "hello\nworld"
+
+    message.message_elements[0] = TextMessage("hi")
+    assert message.content == "hi\nworld"
+
+    del message.message_elements[1]
+    assert message.content == "hi"
+
+    message.message_elements = [MentionElement(sender)]
+    assert message.content == "@user"
+
+
+def test_images_and_voices_cached(sender):
+    """测试 images 和 voices 的缓存和失效"""
+    image = ImageMessage(media_id="image")
+    voice = VoiceMessage(media_id="voice")
+    message = IMMessage(sender=sender, message_elements=[TextMessage("hello"), image])
+
+    assert message.images == [image]
+    assert message.voices == []
+
+    message.message_elements.extend([voice])
+    assert message.voices == [voice]
+
+    message.message_elements.remove(image)
+    assert message.images == []
+
+
+def test_copy_does_not_share_cache(sender):
+    """测试复制后的消息拥有独立的缓存"""
+    message = IMMessage(sender=sender, message_elements=[TextMessage("hello")])
+    assert message.content == "hello"
+
+    copied = copy.deepcopy(message)
+    copied.message_elements.append(TextMessage("world"))
+    assert copied.content == "hello\nworld"
+    assert message.content == "hello"
+
+    restored = pickle.loads(pickle.dumps(message))
+    assert restored.content == "hello"
+
+
+def test_elements_use_slots():
+    """测试消息元素不再携带实例字典"""
+    assert not hasattr(TextMessage("hello"), "__dict__")
+    assert not hasattr(ImageMessage(media_id="image"), "__dict__")
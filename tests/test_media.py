@@ -2,11 +2,14 @@ import asyncio
 import os
 import shutil
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 
 from kirara_ai.im.message import ImageMessage, VoiceMessage
-from kirara_ai.media import MediaManager, MediaType
+from kirara_ai.media import MediaManager, MediaMetadata, MediaType
+from kirara_ai.media.metadata_stores import JsonMetadataStore, SQLiteMetadataStore
+from kirara_ai.media.storages import media_key
 
 
 class TestMediaManager(unittest.TestCase):
@@ -70,10 +73,11 @@ class TestMediaManager(unittest.TestCase):
         self.test_audio_path = self.format_files["mp3"]
         
         # 创建媒体管理器
-        self.media_manager = MediaManager(media_dir=self.media_dir)
+        self.media_manager = MediaManager(media_dir=self.media_dir, metadata_backend="sqlite")
 
     def tearDown(self):
         """测试后清理"""
+        self.media_manager.shutdown()
         # 删除临时目录
         shutil.rmtree(self.temp_dir)
 
@@ -237,6 +241,142 @@ class TestMediaManager(unittest.TestCase):
         # 验证媒体是否被删除
         self.assertIsNone(self.media_manager.get_metadata(media_id))
 
+    def test_reference_index(self):
+        """测试引用的反向索引"""
+        from kirara_ai.ioc.container import DependencyContainer
+        from kirara_ai.media.carrier import MediaCarrierRegistry, MediaCarrierService
+        from kirara_ai.media.index import MediaIndex
+
+        container = DependencyContainer()
+        registry = MediaCarrierRegistry(container)
+        registry.register("chat", object())
+        container.register(MediaCarrierRegistry, registry)
+        service = MediaCarrierService(container, self.media_manager)
+
+        image_id = asyncio.run(self.media_manager.register_from_path(self.test_image_path, reference_id="other"))
+        audio_id = asyncio.run(self.media_manager.register_from_path(self.test_audio_path, reference_id="other"))
+
+        # 一个引用可以对应多个媒体，一个媒体也可以有多个引用
+        service.register_reference(image_id, "chat", "1")
+        service.register_reference(audio_id, "chat", "1")
+        service.register_reference(image_id, "chat", "2")
+        self.assertEqual(
+            {media.media_id for media in service.get_media_by_reference("chat", "1")}, {image_id, audio_id}
+        )
+        self.assertEqual(set(service.get_references_by_media(image_id)), {("chat", "1"), ("chat", "2")})
+
+        service.remove_reference(audio_id, "chat", "1")
+        self.assertEqual([media.media_id for media in service.get_media_by_reference("chat", "1")], [image_id])
+        self.assertEqual(service.get_media_by_reference("chat", "3"), [])
+
+        # 持久化的元数据重建出的索引与内存中的一致
+        self.media_manager.flush()
+        store = SQLiteMetadataStore(Path(self.media_dir) / "metadata.db")
+        index = MediaIndex()
+        index.rebuild(store.load_all())
+        store.close()
+        self.assertEqual(index.by_reference("chat:1"), {image_id})
+        self.assertEqual(index.references_of(image_id), frozenset({"other", "chat:1", "chat:2"}))
+
+        # 清理提供者已不存在的引用
+        registry.unregister("chat")
+        self.assertEqual(service.cleanup_orphaned_references(), 2)
+        self.assertEqual(self.media_manager.get_media_ids_by_reference("chat:1"), [])
+        self.assertEqual(self.media_manager.get_references(image_id), ["other"])
+
+    def test_garbage_collection(self):
+        """测试没有引用的媒体在宽限期后由后台垃圾回收删除"""
+        gc = self.media_manager.gc
+        gc.configure(grace_period=0.2, interval=0.05, max_deletes_per_second=0)
+
+        async def run():
+            # 从未被引用的媒体（如 IM 适配器注册的媒体）不会被回收
+            unreferenced_id = await self.media_manager.register_from_path(self.format_files["pdf"])
+            gc.start()
+            try:
+                image_id = await self.media_manager.register_from_path(self.test_image_path, reference_id="ref1")
+                audio_id = await self.media_manager.register_from_path(self.test_audio_path, reference_id="ref2")
+                file_path = Path(self.media_manager.get_metadata(image_id).path)
+
+                # 移除引用后不会立即删除
+                self.media_manager.remove_reference(image_id, "ref1")
+                self.media_manager.remove_reference(audio_id, "ref2")
+                self.assertIsNotNone(self.media_manager.get_metadata(image_id))
+                self.assertEqual(gc.pending, 2)
+
+                # 宽限期内重新被引用的媒体不会被回收
+                await self.media_manager.register_from_path(self.test_audio_path, reference_id="ref3")
+                self.assertEqual(gc.pending, 1)
+
+                await asyncio.sleep(0.5)
+                self.assertIsNone(self.media_manager.get_metadata(image_id))
+                self.assertFalse(file_path.exists())
+                self.assertEqual(self.media_manager.get_metadata(audio_id).references, {"ref3"})
+                stats = gc.get_stats()
+                self.assertEqual((stats["pending"], stats["deleted_count"]), (0, 1))
+                self.assertGreater(stats["bytes_reclaimed"], 0)
+                self.assertIsNotNone(self.media_manager.get_metadata(unreferenced_id))
+            finally:
+                gc.stop()
+
+        asyncio.run(run())
+
+    def test_garbage_collection_reregistered(self):
+        """测试移除元数据后、删除文件前重新注册的媒体，以及正在注册的媒体不会被删除"""
+        manager = self.media_manager
+        manager.gc.configure(interval=60)
+
+        async def run():
+            manager.gc.start()
+            try:
+                image_id = await manager.register_from_path(self.test_image_path, reference_id="ref1")
+                manager.remove_reference(image_id, "ref1")
+
+                # 垃圾回收先在事件循环中移除元数据，文件稍后在线程中删除
+                metadata = manager._forget_media_deferred(image_id)
+                self.assertEqual(await manager.register_from_path(self.test_image_path, reference_id="ref2"), image_id)
+                self.assertEqual(manager._delete_forgotten_files(image_id, metadata), 0)
+                self.assertTrue(Path(manager.get_metadata(image_id).path).exists())
+
+                manager.remove_reference(image_id, "ref2")
+                manager._begin_registration(image_id)
+                self.assertEqual(await manager.gc.collect(force=True), 0)
+                self.assertEqual(manager.gc.pending, 1)
+                manager._end_registration(image_id)
+                self.assertEqual(await manager.gc.collect(force=True), 1)
+                self.assertIsNone(manager.get_metadata(image_id))
+            finally:
+                manager.gc.stop()
+
+        asyncio.run(run())
+
+    def test_garbage_collection_state(self):
+        """测试待回收集合在重启后恢复，宽限期从引用计数降为 0 时开始计算"""
+        from kirara_ai.media.gc import MediaGarbageCollector
+
+        async def run():
+            gc = self.media_manager.gc
+            gc.start()
+            image_id = await self.media_manager.register_from_path(self.test_image_path, reference_id="ref1")
+            audio_id = await self.media_manager.register_from_path(self.test_audio_path)
+            self.media_manager.remove_reference(image_id, "ref1")
+            gc.stop()
+
+            # 模拟重启：新的回收器从文件恢复待回收集合
+            restarted = MediaGarbageCollector(self.media_manager, gc.state_path, grace_period=0.2, interval=60)
+            restarted.start()
+            try:
+                self.assertEqual(restarted.pending, 1)
+                self.assertEqual(await restarted.collect(), 0)
+                await asyncio.sleep(0.2)
+                self.assertEqual(await restarted.collect(), 1)
+                self.assertIsNone(self.media_manager.get_metadata(image_id))
+                self.assertIsNotNone(self.media_manager.get_metadata(audio_id))
+            finally:
+                restarted.stop()
+
+        asyncio.run(run())
+
     def test_search(self):
         """测试搜索功能"""
         # 注册多个媒体
@@ -278,6 +418,373 @@ class TestMediaManager(unittest.TestCase):
         results = self.media_manager.search_by_type(MediaType.AUDIO)
         self.assertEqual(results, [media_id2])
 
+    def test_streaming_registration(self):
+        """测试大文件按块写入临时文件后原子移动，且不残留临时文件"""
+        import hashlib
+
+        from kirara_ai.media.manager import CHUNK_SIZE
+
+        big_path = os.path.join(self.temp_dir, "big.png")
+        with open(self.format_files["png"], "rb") as f:
+            content = f.read() + os.urandom(CHUNK_SIZE * 3 + 17)
+        with open(big_path, "wb") as f:
+            f.write(content)
+
+        media_id = asyncio.run(self.media_manager.register_from_path(big_path, reference_id="ref"))
+        self.assertEqual(media_id, hashlib.sha1(content).hexdigest())
+        metadata = self.media_manager.get_metadata(media_id)
+        self.assertEqual((metadata.format, metadata.size), ("png", len(content)))
+        with open(metadata.path, "rb") as f:
+            self.assertEqual(f.read(), content)
+
+        # 通过 file:// URL 和内存数据注册相同内容得到相同的媒体
+        self.assertEqual(asyncio.run(self.media_manager.register_from_url(f"file://{big_path}")), media_id)
+        self.assertEqual(asyncio.run(self.media_manager.register_from_data(content)), media_id)
+        files_dir = Path(self.media_dir, "files")
+        self.assertEqual(
+            [p.relative_to(files_dir).as_posix() for p in files_dir.rglob("*") if p.is_file()],
+            [media_key(media_id, "png")],
+        )
+
+    def test_http_client_per_loop_sessions(self):
+        """测试不同事件循环使用各自的会话，不会替换其他事件循环的会话"""
+        import threading
+
+        client = self.media_manager.http_client
+        sessions = {}
+        main_ready = threading.Event()
+        worker_done = threading.Event()
+
+        async def main():
+            sessions["main"] = client._get_session()
+            main_ready.set()
+            # 等待工作线程在另一个事件循环中创建会话
+            await asyncio.to_thread(worker_done.wait)
+            self.assertIs(client._get_session(), sessions["main"])
+
+        def worker():
+            main_ready.wait()
+
+            async def run():
+                sessions["worker"] = client._get_session()
+
+            asyncio.run(run())
+            worker_done.set()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        asyncio.run(main())
+        thread.join()
+        self.assertIsNot(sessions["main"], sessions["worker"])
+
+    def test_http_client_coalesces_downloads(self):
+        """测试同一 URL 的并发下载只发起一次请求，且连接池在多次请求间复用"""
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        with open(self.format_files["png"], "rb") as f:
+            content = f.read()
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests.append(self.path)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/image.png"
+
+        async def run():
+            media_ids = await asyncio.gather(
+                *[self.media_manager.register_from_url(url, reference_id=f"ref{i}") for i in range(3)]
+            )
+            session = self.media_manager.http_client._get_session()
+            data = await asyncio.gather(*[self.media_manager._download_file_async(url) for _ in range(3)])
+            self.assertIs(self.media_manager.http_client._get_session(), session)
+            return media_ids, data
+
+        try:
+            media_ids, data = asyncio.run(run())
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(len(set(media_ids)), 1)
+        # 每个调用者的引用都被记录，元数据指向已存入的文件
+        metadata = self.media_manager.get_metadata(media_ids[0])
+        self.assertEqual(metadata.references, {"ref0", "ref1", "ref2"})
+        self.assertTrue(Path(metadata.path).exists())
+        self.assertEqual(data, [content] * 3)
+        self.assertEqual(len(requests), 2)
+        files_dir = Path(self.media_dir, "files")
+        self.assertEqual(
+            [p.relative_to(files_dir).as_posix() for p in files_dir.rglob("*") if p.is_file()],
+            [media_key(media_ids[0], "png")],
+        )
+
+    def test_sharded_storage_layout(self):
+        """测试文件按分片目录存放，以及旧版平铺文件的迁移"""
+        from kirara_ai.media.storages import LocalMediaStorage
+
+        image_id = asyncio.run(self.media_manager.register_from_path(self.test_image_path, reference_id="ref1"))
+        audio_id = asyncio.run(self.media_manager.register_from_path(self.test_audio_path, reference_id="ref1"))
+        files_dir = Path(self.media_dir) / "files"
+        image_path = files_dir / media_key(image_id, "jpeg")
+        self.assertEqual(image_path, files_dir / image_id[:2] / image_id[2:4] / f"{image_id}.jpeg")
+        self.assertEqual(self.media_manager.get_metadata(image_id).path, str(image_path))
+
+        # 模拟旧版本平铺存放的文件
+        for media_id in (image_id, audio_id):
+            metadata = self.media_manager.get_metadata(media_id)
+            legacy_path = files_dir / f"{media_id}.{metadata.format}"
+            os.replace(metadata.path, legacy_path)
+            self.media_manager.update_metadata(media_id, path=str(legacy_path))
+        self.media_manager.flush()
+        self.media_manager = MediaManager(
+            media_dir=self.media_dir, metadata_backend="sqlite", storage=LocalMediaStorage(files_dir)
+        )
+
+        # 迁移前访问的文件会被直接移动到分片目录
+        with open(self.test_image_path, "rb") as f:
+            self.assertEqual(asyncio.run(self.media_manager.get_data(image_id)), f.read())
+        self.assertTrue(image_path.exists())
+
+        self.assertEqual(asyncio.run(self.media_manager.migrate_storage_layout()), 1)
+        audio_metadata = self.media_manager.get_metadata(audio_id)
+        self.assertEqual(audio_metadata.path, str(files_dir / media_key(audio_id, audio_metadata.format)))
+        self.assertTrue(Path(audio_metadata.path).exists())
+        self.assertFalse(self.media_manager.storage.has_legacy_files)
+        self.assertEqual(asyncio.run(self.media_manager.migrate_storage_layout()), 0)
+
+    def test_compressed_storage(self):
+        """测试文本类文件压缩存储"""
+        self.media_manager.compress_files = True
+        text = ("Kirara AI compressed media storage test.\n" * 200).encode()
+        media_id = asyncio.run(self.media_manager.register_from_data(text, reference_id="ref1"))
+        metadata = self.media_manager.get_metadata(media_id)
+        self.assertEqual(metadata.format, "plain")
+        self.assertEqual(metadata.size, len(text))
+        self.assertIsNone(metadata.path)
+
+        stored = Path(self.media_dir) / "files" / media_id[:2] / media_id[2:4] / f"{media_id}.plain.gz"
+        self.assertTrue(stored.exists())
+        self.assertLess(stored.stat().st_size, len(text))
+
+        self.assertEqual(asyncio.run(self.media_manager.get_data(media_id)), text)
+        # 需要本地文件时解压到缓存目录
+        path = asyncio.run(self.media_manager.get_file_path(media_id))
+        self.assertEqual(path.read_bytes(), text)
+
+        stored_size = stored.stat().st_size
+        self.assertEqual(self.media_manager.delete_media(media_id), stored_size)
+        self.assertFalse(stored.exists())
+        self.assertFalse(path.exists())
+
+    def test_file_cache_eviction(self):
+        """测试本地缓存超过总大小时删除最久未使用的文件"""
+        self.media_manager.compress_files = True
+        texts = [(f"Kirara AI file cache test {i}.\n" * 200).encode() for i in range(3)]
+        media_ids = [asyncio.run(self.media_manager.register_from_data(text, reference_id="ref1")) for text in texts]
+        # 只能容纳两个文件
+        self.media_manager.file_cache.resize(len(texts[0]) * 2)
+
+        paths = [asyncio.run(self.media_manager.get_file_path(media_id)) for media_id in media_ids[:2]]
+        # 访问第一个文件，使第二个文件成为最久未使用的文件
+        self.assertEqual(asyncio.run(self.media_manager.get_file_path(media_ids[0])), paths[0])
+        last_path = asyncio.run(self.media_manager.get_file_path(media_ids[2]))
+
+        self.assertTrue(paths[0].exists())
+        self.assertFalse(paths[1].exists())
+        self.assertEqual(last_path.read_bytes(), texts[2])
+        self.assertEqual(self.media_manager.file_cache.stats()["evictions"], 1)
+        self.assertLessEqual(self.media_manager.file_cache.size, len(texts[0]) * 2)
+
+        # 被淘汰的文件在需要时重新解压
+        self.assertEqual(asyncio.run(self.media_manager.get_file_path(media_ids[1])).read_bytes(), texts[1])
+
+    def test_object_storage(self):
+        """测试使用 S3 兼容的对象存储"""
+        from kirara_ai.media.storages import LocalObjectClient, ObjectMediaStorage
+
+        client = LocalObjectClient(Path(self.temp_dir) / "s3")
+        storage = ObjectMediaStorage(client, "bucket", "media")
+        self.media_manager = MediaManager(media_dir=self.media_dir, metadata_backend="sqlite", storage=storage)
+
+        media_id = asyncio.run(self.media_manager.register_from_path(self.test_image_path, reference_id="ref1"))
+        key = media_key(media_id, "jpeg")
+        self.assertTrue(storage.exists(key))
+        self.assertEqual(list(storage.iter_keys()), [key])
+        self.assertIsNone(self.media_manager.get_metadata(media_id).path)
+        self.assertEqual(list((Path(self.media_dir) / "files").iterdir()), [])
+
+        with open(self.test_image_path, "rb") as f:
+            data = f.read()
+        self.assertEqual(asyncio.run(self.media_manager.get_data(media_id)), data)
+        path = asyncio.run(self.media_manager.get_file_path(media_id))
+        self.assertEqual(path, Path(self.media_dir) / "cache" / key)
+        self.assertEqual(path.read_bytes(), data)
+
+        self.assertEqual(self.media_manager.delete_media(media_id), len(data))
+        self.assertFalse(storage.exists(key))
+        self.assertFalse(path.exists())
+
+    def test_base64_cache(self):
+        """测试 base64 编码结果被缓存，超出大小时按 LRU 淘汰，删除媒体时失效"""
+        import base64
+        from unittest.mock import patch
+
+        image_id = asyncio.run(self.media_manager.register_from_path(self.test_image_path, reference_id="ref"))
+        audio_id = asyncio.run(self.media_manager.register_from_path(self.test_audio_path, reference_id="ref"))
+        cache = self.media_manager.base64_cache
+
+        with open(self.test_image_path, "rb") as f:
+            expected = base64.b64encode(f.read()).decode()
+        self.assertEqual(asyncio.run(self.media_manager.get_base64(image_id)), expected)
+        with patch.object(self.media_manager, "get_data", side_effect=AssertionError("should be cached")):
+            url = asyncio.run(self.media_manager.get_base64_url(image_id))
+            self.assertEqual(asyncio.run(self.media_manager.get_media(image_id).get_base64()), expected)
+        self.assertEqual(url, f"data:image/jpeg;base64,{expected}")
+        self.assertEqual(cache.stats()["hits"], 2)
+
+        # 只能容纳一个条目时，最近最少使用的条目被淘汰
+        cache.resize(len(expected))
+        asyncio.run(self.media_manager.get_base64(audio_id))
+        self.assertIsNone(cache.get(image_id))
+        self.assertIsNotNone(cache.get(audio_id))
+
+        self.media_manager.delete_media(audio_id)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_image_variant(self):
+        """测试大图生成缩小的衍生版本，小图直接使用原图，删除媒体时清理衍生版本"""
+        import base64
+        import io
+
+        from PIL import Image
+
+        from kirara_ai.media import ImageVariantSpec
+
+        big_path = os.path.join(self.temp_dir, "big.png")
+        Image.new("RGBA", (3000, 1500), (255, 0, 0, 128)).save(big_path)
+        media_id = asyncio.run(self.media_manager.register_from_path(big_path, reference_id="ref"))
+        spec = ImageVariantSpec(max_edge=1000, format="jpeg", quality=80)
+
+        mime_type, encoded = asyncio.run(self.media_manager.get_variant_base64(media_id, spec))
+        self.assertEqual(mime_type, "image/jpeg")
+        with Image.open(io.BytesIO(base64.b64decode(encoded))) as img:
+            self.assertEqual((img.format, img.size), ("JPEG", (1000, 500)))
+        variant_path = self.media_manager.variants.get(media_id, spec)
+        self.assertIsNotNone(variant_path)
+
+        # 第二次直接使用缓存
+        self.assertEqual(asyncio.run(self.media_manager.get_variant_base64(media_id, spec))[1], encoded)
+        self.assertIn("data:image/jpeg;base64,", asyncio.run(
+            self.media_manager.get_media(media_id).get_variant_base64_url(spec)
+        ))
+
+        # 尺寸足够小的图片和非图片媒体使用原始数据
+        small_id = asyncio.run(self.media_manager.register_from_path(self.test_image_path, reference_id="ref"))
+        self.assertEqual(
+            asyncio.run(self.media_manager.get_variant_base64(small_id, spec)),
+            ("image/jpeg", asyncio.run(self.media_manager.get_base64(small_id))),
+        )
+        audio_id = asyncio.run(self.media_manager.register_from_path(self.test_audio_path, reference_id="ref"))
+        self.assertEqual(asyncio.run(self.media_manager.get_variant_base64(audio_id, spec))[0], "audio/mp3")
+
+        self.media_manager.delete_media(media_id)
+        self.assertFalse(variant_path.exists())
+        self.assertIsNone(self.media_manager.base64_cache.get(media_id, spec.key))
+
+    def test_thumbnail_scheduled_on_main_loop(self):
+        """测试在临时事件循环中注册图片时，缩略图在主事件循环上生成"""
+        import time
+
+        from PIL import Image
+
+        from kirara_ai.media.variants import THUMBNAIL_VARIANT
+
+        image_path = os.path.join(self.temp_dir, "thumb.png")
+        Image.new("RGB", (1200, 800), (0, 128, 255)).save(image_path)
+
+        main_loop = asyncio.new_event_loop()
+        loop_thread = threading.Thread(target=main_loop.run_forever, daemon=True)
+        loop_thread.start()
+        try:
+            self.media_manager._loop = main_loop
+            media_id = asyncio.run(self.media_manager.register_from_path(image_path, reference_id="ref"))
+            deadline = time.monotonic() + 5
+            while self.media_manager.variants.get(media_id, THUMBNAIL_VARIANT) is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertIsNotNone(self.media_manager.variants.get(media_id, THUMBNAIL_VARIANT))
+
+            # 主事件循环未运行时直接在当前事件循环中生成
+            main_loop.call_soon_threadsafe(main_loop.stop)
+            loop_thread.join(5)
+            other_path = os.path.join(self.temp_dir, "thumb2.png")
+            Image.new("RGB", (1200, 800), (255, 128, 0)).save(other_path)
+            other_id = asyncio.run(self.media_manager.register_from_path(other_path, reference_id="ref"))
+            self.assertIsNotNone(self.media_manager.variants.get(other_id, THUMBNAIL_VARIANT))
+        finally:
+            if main_loop.is_running():
+                main_loop.call_soon_threadsafe(main_loop.stop)
+                loop_thread.join(5)
+            main_loop.close()
+            self.media_manager._loop = None
+
+    def test_query_media(self):
+        """测试基于索引的组合查询和分页"""
+        from datetime import datetime, timedelta
+
+        base = datetime(2024, 1, 1)
+        for i in range(10):
+            self.media_manager._save_metadata(MediaMetadata(
+                media_id=f"media{i}",
+                media_type=MediaType.IMAGE if i % 2 == 0 else MediaType.AUDIO,
+                format="png" if i % 2 == 0 else "mp3",
+                created_at=base + timedelta(days=i),
+                source=f"来源{i}",
+                description="猫咪图片" if i < 5 else "dog photo",
+                tags=["even"] if i % 2 == 0 else ["odd"],
+            ))
+
+        total, page = self.media_manager.query_media(offset=0, limit=3)
+        self.assertEqual(total, 10)
+        self.assertEqual(page, ["media9", "media8", "media7"])
+
+        total, page = self.media_manager.query_media(media_type=MediaType.IMAGE, offset=1, limit=2)
+        self.assertEqual(total, 5)
+        self.assertEqual(page, ["media6", "media4"])
+
+        total, page = self.media_manager.query_media(keyword="猫", start_date=base + timedelta(days=2))
+        self.assertEqual((total, page), (3, ["media4", "media3", "media2"]))
+
+        total, page = self.media_manager.query_media(
+            keyword="DOG PH", tags=["odd"], end_date=base + timedelta(days=7), offset=0, limit=10
+        )
+        self.assertEqual((total, page), (2, ["media7", "media5"]))
+
+        # 修改和删除后索引同步更新
+        self.media_manager.update_metadata("media7", description="猫咪", tags=["even"])
+        self.assertEqual(self.media_manager.search_by_tags(["odd"]), ["media9", "media5", "media3", "media1"])
+        self.assertIn("media7", self.media_manager.search_by_description("猫咪"))
+        self.assertNotIn("media7", self.media_manager.search_by_description("dog"))
+        self.media_manager.delete_media("media9")
+        total, page = self.media_manager.query_media(limit=1)
+        self.assertEqual((total, page), (9, ["media8"]))
+        self.assertEqual(self.media_manager.search_by_source("来源9"), [])
+
+        # 短于 3 个字符的查询回退为扫描，空标签列表在 match_all 时匹配全部媒体
+        self.assertEqual(self.media_manager.search_by_source("源8"), ["media8"])
+        self.assertEqual(self.media_manager.search_by_description("g"), ["media8", "media6", "media5"])
+        self.assertEqual(len(self.media_manager.search_by_tags([], match_all=True)), 9)
+        self.assertEqual(self.media_manager.search_by_tags([]), [])
+
     def test_media_message(self):
         """测试MediaMessage类"""
         # 创建只有URL的媒体消息
@@ -349,4 +856,132 @@ class TestMediaManager(unittest.TestCase):
             # 获取元数据
             metadata = self.media_manager.get_metadata(message.media_id)
             self.assertEqual(metadata.media_type, MediaType.AUDIO)
-            
\ No newline at end of file
+            
+    def test_media_message_registration_retry(self):
+        """测试注册失败后可以重新注册"""
+        path = os.path.join(self.temp_dir, "later.jpg")
+        message = ImageMessage(path=path, reference_id="retry_ref", media_manager=self.media_manager)
+
+        async def register():
+            return await message.ensure_registered()
+
+        with self.assertRaises(Exception):
+            asyncio.run(register())
+        self.assertFalse(message.is_registered)
+
+        shutil.copy(self.test_image_path, path)
+        media_id = asyncio.run(register())
+        self.assertEqual(message.media_id, media_id)
+
+    def test_media_message_async_create(self):
+        """测试异步创建媒体消息，以及未注册时的延迟注册"""
+        async def create_messages():
+            created = await ImageMessage.create(path=self.test_image_path, reference_id="create_ref", media_manager=self.media_manager)
+            self.assertTrue(created.is_registered)
+
+            # 构造时不注册，异步方法会自动完成注册，并发调用只注册一次
+            lazy = ImageMessage(path=self.test_image_path, reference_id="lazy_ref", media_manager=self.media_manager)
+            self.assertFalse(lazy.is_registered)
+            media_ids = await asyncio.gather(lazy.ensure_registered(), lazy.ensure_registered())
+            self.assertEqual(media_ids[0], media_ids[1])
+            data = await lazy.get_data()
+            return created, lazy, data
+
+        created, lazy, data = asyncio.run(create_messages())
+        self.assertEqual(created.media_id, lazy.media_id)
+        self.assertTrue(data)
+
+        # 在没有事件循环的线程中访问 media_id 会同步完成注册
+        sync_message = VoiceMessage(path=self.format_files["mp3"], reference_id="sync_ref", media_manager=self.media_manager)
+        self.assertFalse(sync_message.is_registered)
+        metadata = self.media_manager.get_metadata(sync_message.media_id)
+        self.assertEqual(metadata.media_type, MediaType.AUDIO)
+
+        with self.assertRaises(ValueError):
+            ImageMessage(media_manager=self.media_manager)
+
+    def test_sqlite_metadata_persistence(self):
+        """测试元数据写入 SQLite 后可以完整读回"""
+        media_id = asyncio.run(self.media_manager.register_from_path(
+            self.test_image_path, source="test", tags=["b", "a"], reference_id="ref1"
+        ))
+        self.media_manager.add_reference(media_id, "ref2")
+        self.media_manager.add_tags(media_id, ["c"])
+        self.media_manager.flush()
+
+        store = SQLiteMetadataStore(Path(self.media_dir) / "metadata.db")
+        loaded = {metadata.media_id: metadata for metadata in store.load_all()}
+        store.close()
+        self.assertEqual(loaded[media_id].tags, ["b", "a", "c"])
+        self.assertEqual(loaded[media_id].references, {"ref1", "ref2"})
+        self.assertEqual(loaded[media_id].media_type, MediaType.IMAGE)
+        self.assertEqual(loaded[media_id].source, "test")
+
+        # 删除后不再存在
+        self.media_manager.delete_media(media_id)
+        self.media_manager.flush()
+        store = SQLiteMetadataStore(Path(self.media_dir) / "metadata.db")
+        self.assertTrue(store.is_empty())
+        store.close()
+
+    def test_sqlite_flush_does_not_block_save(self):
+        """测试批量写入在后台进行，写入期间保存不会被阻塞"""
+        store = SQLiteMetadataStore(Path(self.temp_dir) / "batch.db", batch_size=2, flush_interval=60)
+        writing = threading.Event()
+        release = threading.Event()
+        original_write = store._write
+
+        def slow_write(pending):
+            writing.set()
+            release.wait(5)
+            original_write(pending)
+
+        store._write = slow_write
+        store.save(MediaMetadata(media_id="media0", media_type=MediaType.IMAGE, format="png", size=1))
+        store.save(MediaMetadata(media_id="media1", media_type=MediaType.IMAGE, format="png", size=1))
+        self.assertTrue(writing.wait(5))
+
+        saver = threading.Thread(target=store.save, args=(
+            MediaMetadata(media_id="media2", media_type=MediaType.IMAGE, format="png", size=1),
+        ))
+        saver.start()
+        saver.join(1)
+        self.assertFalse(saver.is_alive())
+        self.assertFalse(store.is_empty())
+
+        release.set()
+        loaded = sorted(metadata.media_id for metadata in store.load_all())
+        store.close()
+        self.assertEqual(loaded, ["media0", "media1", "media2"])
+
+    def test_migrate_json_metadata(self):
+        """测试旧版 JSON 元数据自动迁移到 SQLite"""
+        legacy_dir = Path(self.temp_dir) / "legacy_media"
+        json_store = JsonMetadataStore(legacy_dir / "metadata")
+        for i in range(3):
+            json_store.save(MediaMetadata(
+                media_id=f"media{i}",
+                media_type=MediaType.IMAGE,
+                format="png",
+                size=10,
+                tags=["legacy"],
+                references={f"ref{i}"},
+            ))
+
+        self.media_manager = MediaManager(media_dir=str(legacy_dir))
+        self.assertEqual(sorted(self.media_manager.get_all_media_ids()), ["media0", "media1", "media2"])
+        self.assertEqual(self.media_manager.get_metadata("media1").references, {"ref1"})
+        self.assertFalse((legacy_dir / "metadata").exists())
+        self.assertTrue((legacy_dir / "metadata.migrated" / "media0.json").exists())
+
+        # 再次加载时直接从 SQLite 读取
+        self.media_manager = MediaManager(media_dir=self.media_dir)
+        self.media_manager = MediaManager(media_dir=str(legacy_dir))
+        self.assertEqual(len(self.media_manager.get_all_media_ids()), 3)
+
+    def test_json_metadata_backend(self):
+        """测试仍可使用 JSON 元数据存储"""
+        json_dir = os.path.join(self.temp_dir, "json_media")
+        self.media_manager = MediaManager(media_dir=json_dir, metadata_backend="json")
+        media_id = asyncio.run(self.media_manager.register_from_path(self.test_image_path, reference_id="ref"))
+        self.assertTrue((Path(json_dir) / "metadata" / f"{media_id}.json").exists())
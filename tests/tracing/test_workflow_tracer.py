@@ -0,0 +1,154 @@
+import asyncio
+import os
+import tempfile
+
+from kirara_ai.database import DatabaseManager
+from kirara_ai.database.manager import Base
+from kirara_ai.tracing import WorkflowTracer
+from kirara_ai.tracing.models import WorkflowBlockSpanRecord
+from kirara_ai.tracing.workflow_tracer import percentile
+from kirara_ai.workflow.core.block import Block, Input, Output
+from kirara_ai.workflow.core.block.registry import BlockRegistry
+from kirara_ai.workflow.core.execution.exceptions import BlockExecutionFailedException
+from kirara_ai.workflow.core.execution.executor import WorkflowExecutor
+from kirara_ai.workflow.core.workflow import Wire, Workflow
+from tests.tracing.test_base import TracingTestBase
+
+
+class SourceBlock(Block):
+    name = "SourceBlock"
+    outputs = {"out": Output(name="out", label="输出", data_type=str, description="Test output")}
+
+    def execute(self, **kwargs):
+        return {"out": "hello"}
+
+
+class UpperBlock(Block):
+    name = "UpperBlock"
+    inputs = {"text": Input(name="text", label="输入", data_type=str, description="Test input")}
+    outputs = {"out": Output(name="out", label="输出", data_type=str, description="Test output")}
+
+    def execute(self, text: str, **kwargs):
+        return {"out": text.upper()}
+
+
+class BrokenBlock(Block):
+    name = "BrokenBlock"
+    inputs = {"text": Input(name="text", label="输入", data_type=str, description="Test input")}
+
+    def execute(self, text: str, **kwargs):
+        raise RuntimeError("boom")
+
+
+class TestWorkflowTracer(TracingTestBase):
+    """工作流追踪器测试"""
+
+    def setUp(self):
+        super().setUp()
+        # 追踪记录由后台线程写入，内存数据库每个连接相互独立，因此改用临时文件数据库
+        self.db_manager.shutdown()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_manager = DatabaseManager(
+            self.container, database_url=f"sqlite:///{os.path.join(self.temp_dir.name, 'test.db')}"
+        )
+        self.db_manager.initialize()
+        Base.metadata.create_all(self.db_manager.engine)
+        self.container.register(DatabaseManager, self.db_manager)
+        self.registry = BlockRegistry()
+        self.registry.register("source", "test", SourceBlock)
+        self.registry.register("upper", "test", UpperBlock)
+        self.registry.register("broken", "test", BrokenBlock)
+        self.container.register(BlockRegistry, self.registry)
+        self.tracer = WorkflowTracer(self.container)
+        self.tracer.initialize()
+
+    def tearDown(self):
+        self.tracer.shutdown()
+        super().tearDown()
+        self.temp_dir.cleanup()
+
+    def _run_workflow(self, second_block_class):
+        source = SourceBlock(name="source")
+        second = second_block_class(name="second")
+        workflow = Workflow(
+            name="test_workflow",
+            blocks=[source, second],
+            wires=[Wire(source, "out", second, "text")],
+            id="test:workflow",
+        )
+        container = self.container.scoped()
+        container.register(Workflow, workflow)
+        executor = WorkflowExecutor(container)
+        try:
+            asyncio.run(executor.run())
+        finally:
+            self.tracer.flush()
+        return executor
+
+    def test_execution_persisted_with_spans(self):
+        """测试工作流执行和 block 耗时被记录"""
+        executor = self._run_workflow(UpperBlock)
+
+        trace = self.tracer.get_trace_by_id(executor.trace_id)
+        self.assertIsNotNone(trace)
+        self.assertEqual(trace.status, "success")
+        self.assertEqual(trace.workflow_id, "test:workflow")
+        self.assertEqual(trace.block_count, 2)
+
+        with self.db_manager.get_session() as session:
+            spans = session.query(WorkflowBlockSpanRecord).filter_by(trace_id=executor.trace_id).all()
+            self.assertEqual({span.block_name for span in spans}, {"source", "second"})
+            self.assertEqual({span.block_type for span in spans}, {"source", "upper"})
+
+    def test_failed_execution_persisted(self):
+        """测试失败的工作流执行被记录"""
+        with self.assertRaises(BlockExecutionFailedException):
+            self._run_workflow(BrokenBlock)
+
+        traces, total = self.tracer.get_traces()
+        self.assertEqual(total, 1)
+        self.assertEqual(traces[0].status, "failed")
+        self.assertIn("boom", traces[0].error)
+
+    def test_get_statistics(self):
+        """测试按 block 类型和工作流统计百分位"""
+        for _ in range(3):
+            self._run_workflow(UpperBlock)
+
+        stats = self.tracer.get_statistics()
+        block_types = {item["block_type"]: item for item in stats["block_types"]}
+        self.assertEqual(block_types["upper"]["count"], 3)
+        self.assertIn("p99", block_types["upper"]["duration"])
+        workflows = {item["workflow_id"]: item for item in stats["workflows"]}
+        self.assertEqual(workflows["test:workflow"]["count"], 3)
+        self.assertEqual(workflows["test:workflow"]["failed"], 0)
+
+    def test_statistics_match_recorded_spans(self):
+        """测试数据库中计算的统计值与按记录逐条计算的结果一致"""
+        for _ in range(4):
+            self._run_workflow(UpperBlock)
+        with self.assertRaises(BlockExecutionFailedException):
+            self._run_workflow(BrokenBlock)
+
+        with self.db_manager.get_session() as session:
+            durations = sorted(
+                duration for duration, in session.query(WorkflowBlockSpanRecord.duration).filter_by(block_type="source")
+            )
+        stats = self.tracer.get_statistics()
+        source = {item["block_type"]: item for item in stats["block_types"]}["source"]
+        self.assertEqual(source["count"], 5)
+        for p in (50, 95, 99):
+            self.assertAlmostEqual(source["duration"][f"p{p}"], percentile(durations, p))
+        self.assertAlmostEqual(source["duration"]["avg"], sum(durations) / len(durations))
+        self.assertAlmostEqual(source["duration"]["max"], durations[-1])
+
+        workflow = {item["workflow_id"]: item for item in stats["workflows"]}["test:workflow"]
+        self.assertEqual((workflow["count"], workflow["failed"]), (5, 1))
+
+    def test_percentile(self):
+        """测试最近秩百分位计算"""
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 95), 95.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 50), 0.0)
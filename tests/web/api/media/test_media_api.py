@@ -0,0 +1,126 @@
+import asyncio
+import os
+import shutil
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from kirara_ai.config.global_config import GlobalConfig, WebConfig
+from kirara_ai.ioc.container import DependencyContainer
+from kirara_ai.media import MediaManager
+from kirara_ai.media.variants import THUMBNAIL_VARIANT
+from kirara_ai.web.app import WebServer
+from tests.utils.auth_test_utils import auth_headers, setup_auth_service  # noqa
+
+# ==================== 常量区 ====================
+TEST_SECRET_KEY = "test-secret-key"
+
+
+# ==================== Fixtures ====================
+@pytest.fixture
+def temp_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def media_manager(temp_dir):
+    manager = MediaManager(media_dir=os.path.join(temp_dir, "media"), metadata_backend="sqlite")
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def app(media_manager):
+    """创建测试应用实例"""
+    container = DependencyContainer()
+
+    config = GlobalConfig()
+    config.web = WebConfig(
+        secret_key=TEST_SECRET_KEY, password_file="test_password.hash"
+    )
+    container.register(GlobalConfig, config)
+    setup_auth_service(container)
+    container.register(MediaManager, media_manager)
+
+    web_server = WebServer(container)
+    container.register(WebServer, web_server)
+    return web_server.app
+
+
+@pytest.fixture
+def test_client(app):
+    """创建测试客户端"""
+    return TestClient(app)
+
+
+# ==================== 测试用例 ====================
+class TestMediaPreview:
+    @pytest.mark.asyncio
+    async def test_thumbnail_cached_on_disk(self, test_client, auth_headers, media_manager, temp_dir):
+        """测试缩略图只生成一次，并支持条件请求"""
+        image_path = os.path.join(temp_dir, "image.png")
+        Image.new("RGB", (1200, 800), (0, 128, 255)).save(image_path)
+        media_id = await media_manager.register_from_path(image_path, reference_id="ref")
+
+        # 注册后在后台预先生成缩略图
+        await asyncio.gather(*media_manager._pending_tasks)
+        assert media_manager.variants.get(media_id, THUMBNAIL_VARIANT) is not None
+
+        response = test_client.get(f"/backend-api/api/media/preview/{media_id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert "max-age" in response.headers["cache-control"]
+        etag = response.headers["etag"]
+        assert response.headers["last-modified"]
+
+        thumbnail_path = media_manager.variants.get(media_id, THUMBNAIL_VARIANT)
+        assert thumbnail_path is not None
+        with Image.open(thumbnail_path) as img:
+            assert img.size == (300, 200)
+
+        response = test_client.get(
+            f"/backend-api/api/media/preview/{media_id}",
+            headers={**auth_headers, "If-None-Match": etag},
+        )
+        assert response.status_code == 304
+
+        media_manager.delete_media(media_id)
+        assert not thumbnail_path.exists()
+        response = test_client.get(f"/backend-api/api/media/preview/{media_id}", headers=auth_headers)
+        assert response.status_code == 404
+
+
+class TestMediaFile:
+    @pytest.mark.asyncio
+    async def test_range_and_conditional_requests(self, test_client, auth_headers, media_manager, temp_dir):
+        """测试媒体文件支持 Range 请求和条件请求"""
+        video_path = os.path.join(temp_dir, "video.mp4")
+        content = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42mp41\x00\x00\x00\x00moov" + os.urandom(600 * 1024)
+        with open(video_path, "wb") as f:
+            f.write(content)
+        media_id = await media_manager.register_from_path(video_path, reference_id="ref")
+        url = f"/backend-api/api/media/file/{media_id}"
+
+        response = test_client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.content == content
+        etag = response.headers["etag"]
+
+        response = test_client.get(url, headers={**auth_headers, "Range": "bytes=100-299"})
+        assert response.status_code == 206
+        assert response.content == content[100:300]
+        assert response.headers["content-range"] == f"bytes 100-299/{len(content)}"
+
+        response = test_client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+        # 视频预览同样支持 Range 请求
+        response = test_client.get(
+            f"/backend-api/api/media/preview/{media_id}", headers={**auth_headers, "Range": "bytes=-10"}
+        )
+        assert response.status_code == 206
+        assert response.content == content[-10:]
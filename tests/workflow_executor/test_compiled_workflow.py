@@ -0,0 +1,133 @@
+from typing import Any, Dict
+
+import pytest
+
+from kirara_ai.events.event_bus import EventBus
+from kirara_ai.ioc.container import DependencyContainer
+from kirara_ai.workflow.core.block import Block, Input, Output
+from kirara_ai.workflow.core.block.registry import BlockRegistry
+from kirara_ai.workflow.core.execution.executor import WorkflowExecutor
+from kirara_ai.workflow.core.workflow import Workflow, WorkflowBuilder, WorkflowRegistry
+
+
+class CountingInputBlock(Block):
+    name = "counting_input"
+    outputs = {"out": Output("out", "输出", str, "输出")}
+    created = 0
+
+    def __init__(self, text: str = "hello"):
+        CountingInputBlock.created += 1
+        self.text = text
+
+    def execute(self) -> Dict[str, Any]:
+        return {"out": self.text}
+
+
+class UpperBlock(Block):
+    name = "upper"
+    inputs = {"text": Input("text", "输入", str, "输入")}
+    outputs = {"out": Output("out", "输出", str, "输出")}
+
+    def execute(self, text: str) -> Dict[str, Any]:
+        return {"out": text.upper()}
+
+
+class IntInputBlock(Block):
+    name = "int_input"
+    inputs = {"text": Input("text", "输入", int, "输入")}
+
+
+@pytest.fixture
+def container():
+    container = DependencyContainer()
+    container.register(DependencyContainer, container)
+    container.register(EventBus, EventBus())
+    container.register(BlockRegistry, BlockRegistry())
+    return container
+
+
+@pytest.fixture
+def registry(container):
+    registry = WorkflowRegistry(container)
+    registry.register(
+        "test",
+        "upper",
+        WorkflowBuilder("upper").use(CountingInputBlock, name="input").chain(UpperBlock, name="upper"),
+    )
+    return registry
+
+
+def test_compiled_workflow_is_cached(container, registry):
+    CountingInputBlock.created = 0
+    first = registry.get_workflow("test:upper", container)
+    second = registry.get_workflow("test:upper", container)
+
+    assert CountingInputBlock.created == 1
+    assert registry.get_compiled_workflow("test:upper") is registry.get_compiled_workflow("test:upper")
+    # 每次执行拿到的是独立的 block 实例，但共享同一份连线索引
+    assert first.blocks[0] is not second.blocks[0]
+    assert first.wire_index is second.wire_index
+    assert first.validated and second.validated
+
+
+def test_compiled_workflow_sets_run_container(container, registry):
+    scoped = DependencyContainer(container)
+    workflow = registry.get_workflow("test:upper", scoped)
+    assert all(block.container is scoped for block in workflow.blocks)
+
+
+class SenderBlock(Block):
+    name = "sender"
+    outputs = {"out": Output("out", "输出", str, "输出")}
+
+    def execute(self) -> Dict[str, Any]:
+        return {"out": self.container.resolve(str)}
+
+
+@pytest.mark.asyncio
+async def test_compiled_workflow_isolates_message_containers(container):
+    registry = WorkflowRegistry(container)
+    registry.register("test", "sender", WorkflowBuilder("sender").use(SenderBlock, name="sender"))
+
+    results = []
+    for sender in ("alice", "bob"):
+        scoped = container.scoped()
+        scoped.register(str, sender)
+        scoped.register(Workflow, registry.get_workflow("test:sender", scoped))
+        results.append((await WorkflowExecutor(scoped).run())["sender"]["out"])
+
+    assert results == ["alice", "bob"]
+    # 原型使用根容器构建，不会持有第一条消息的容器
+    prototype = registry.get_compiled_workflow("test:sender")._prototypes[0]
+    assert prototype.container is container
+
+
+def test_compiled_workflow_invalidated_on_register(container, registry):
+    compiled = registry.get_compiled_workflow("test:upper")
+    registry.register(
+        "test",
+        "upper",
+        WorkflowBuilder("upper").use(CountingInputBlock, name="input", text="bye").chain(UpperBlock, name="upper"),
+    )
+    assert registry.get_compiled_workflow("test:upper") is not compiled
+
+    registry.unregister("test", "upper")
+    assert registry.get_workflow("test:upper", container) is None
+
+
+def test_compiled_workflow_rejects_type_mismatch(container):
+    registry = WorkflowRegistry(container)
+    builder = WorkflowBuilder("bad").use(CountingInputBlock, name="input").chain(IntInputBlock, name="int_input")
+    builder.force_connect("input", "int_input", "out", "text")
+    registry.register("test", "bad", builder)
+
+    with pytest.raises(TypeError, match="Type mismatch"):
+        registry.get_workflow("test:bad", container)
+    assert "test:bad" not in registry._compiled
+
+
+@pytest.mark.asyncio
+async def test_execute_compiled_workflow(container, registry):
+    container.register(Workflow, registry.get_workflow("test:upper", container))
+    result = await WorkflowExecutor(container).run()
+    assert result["upper"]["out"] == "HELLO"
@@ -1,3 +1,6 @@
+import asyncio
+import threading
+
 import pytest
 
 from kirara_ai.events.event_bus import EventBus
@@ -5,7 +8,7 @@ from kirara_ai.ioc.container import DependencyContainer
 from kirara_ai.workflow.core.block import Block, Input, Output
 from kirara_ai.workflow.core.block.registry import BlockRegistry
 from kirara_ai.workflow.core.execution.exceptions import BlockExecutionFailedException
-from kirara_ai.workflow.core.execution.executor import WorkflowExecutor
+from kirara_ai.workflow.core.execution.executor import WorkflowExecutor, get_block_executor
 from kirara_ai.workflow.core.workflow import Wire, Workflow
 from tests.utils.test_block_registry import create_test_block_registry
 
@@ -201,3 +204,149 @@ async def test_executor_with_multiple_outputs():
     executor = WorkflowExecutor(container)
     result = await executor.run()
     assert "MultiOutputBlock" in result
+
+
+class AsyncProcessBlock(Block):
+    name = "AsyncProcessBlock"
+    inputs = {
+        "input1": Input(
+            name="input1", label="输入1", data_type=str, description="Test input"
+        )
+    }
+    outputs = {
+        "output1": Output(
+            name="output1", label="输出1", data_type=str, description="Test output"
+        )
+    }
+
+    async def execute(self, input1: str, **kwargs):
+        await asyncio.sleep(0)
+        return {"output1": input1.lower()}
+
+
+class InlineProcessBlock(ProcessBlock):
+    inline = True
+
+    def execute(self, input1: str, **kwargs):
+        return {"output1": threading.current_thread().name}
+
+
+@pytest.mark.asyncio
+async def test_executor_with_async_and_inline_blocks():
+    """Test that async blocks are awaited and inline blocks run on the event loop thread."""
+    async_block = AsyncProcessBlock(name="async1")
+    inline_block = InlineProcessBlock(name="inline1")
+    mixed_workflow = Workflow(
+        name="mixed_workflow",
+        blocks=[input_block, async_block, inline_block],
+        wires=[
+            Wire(input_block, "output1", async_block, "input1"),
+            Wire(async_block, "output1", inline_block, "input1"),
+        ],
+    )
+
+    container = DependencyContainer()
+    container.register(DependencyContainer, container)
+    container.register(EventBus, EventBus())
+    container.register(BlockRegistry, test_registry)
+    container.register(Workflow, mixed_workflow)
+    executor = WorkflowExecutor(container)
+    result = await executor.run()
+
+    assert async_block.is_async
+    assert not input_block.is_async
+    assert result["async1"]["output1"] == "test_input"
+    assert result["inline1"]["output1"] == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_executor_reuses_shared_thread_pool():
+    """Test that blocking blocks share one process-wide thread pool across runs."""
+    container = DependencyContainer()
+    container.register(DependencyContainer, container)
+    container.register(EventBus, EventBus())
+    container.register(BlockRegistry, test_registry)
+    container.register(Workflow, workflow)
+
+    await WorkflowExecutor(container).run()
+    pool = get_block_executor()
+    await WorkflowExecutor(container).run()
+    assert get_block_executor() is pool
+
+
+class SleepBlock(ProcessBlock):
+    def __init__(self, events: list, **kwargs):
+        super().__init__(**kwargs)
+        self.events = events
+
+    async def execute(self, input1: str, **kwargs):
+        self.events.append(("start", self.name))
+        await asyncio.sleep(0.01)
+        self.events.append(("end", self.name))
+        return {"output1": input1 + self.name}
+
+
+class MergeBlock(Block):
+    name = "MergeBlock"
+    inputs = {
+        "left": Input(name="left", label="左", data_type=str, description="Left input"),
+        "right": Input(name="right", label="右", data_type=str, description="Right input"),
+    }
+    outputs = {
+        "output1": Output(
+            name="output1", label="输出1", data_type=str, description="Test output"
+        )
+    }
+
+    def execute(self, left: str, right: str, **kwargs):
+        return {"output1": f"{left}|{right}"}
+
+
+def create_parallel_workflow(events: list, max_concurrency=None) -> Workflow:
+    left = SleepBlock(events, name="left")
+    right = SleepBlock(events, name="right")
+    merge = MergeBlock(name="merge")
+    return Workflow(
+        name="parallel_workflow",
+        blocks=[input_block, left, right, merge],
+        wires=[
+            Wire(input_block, "output1", left, "input1"),
+            Wire(input_block, "output1", right, "input1"),
+            Wire(left, "output1", merge, "left"),
+            Wire(right, "output1", merge, "right"),
+        ],
+        max_concurrency=max_concurrency,
+    )
+
+
+async def run_workflow(target_workflow: Workflow):
+    container = DependencyContainer()
+    container.register(DependencyContainer, container)
+    container.register(EventBus, EventBus())
+    container.register(BlockRegistry, test_registry)
+    container.register(Workflow, target_workflow)
+    executor = WorkflowExecutor(container)
+    return await executor.run()
+
+
+@pytest.mark.asyncio
+async def test_executor_runs_independent_branches_concurrently():
+    """Test that independent branches run concurrently and join at the merge block."""
+    events: list = []
+    result = await run_workflow(create_parallel_workflow(events))
+
+    assert result["merge"]["output1"] == "test_inputleft|test_inputright"
+    # 两个分支都在任一分支结束前开始执行
+    assert [kind for kind, _ in events] == ["start", "start", "end", "end"]
+
+
+@pytest.mark.asyncio
+async def test_executor_respects_max_concurrency():
+    """Test that the per-workflow concurrency cap serializes branches."""
+    events: list = []
+    result = await run_workflow(create_parallel_workflow(events, max_concurrency=1))
+
+    assert result["merge"]["output1"] == "test_inputleft|test_inputright"
+    # 每个分支结束后另一个分支才开始执行
+    assert [kind for kind, _ in events] == ["start", "end", "start", "end"]
+    assert events[0][1] == events[1][1] and events[2][1] == events[3][1]
@@ -53,3 +53,21 @@ def test_workflow_creation():
     assert len(workflow.wires) == 1
     assert workflow.wires[0].source_block == input_block
     assert workflow.wires[0].target_block == process_block
+
+
+def test_workflow_wire_index():
+    """Test that the wire index is built once and cached on the workflow."""
+    workflow = Workflow(
+        name="test_workflow", blocks=[input_block, process_block], wires=[wire]
+    )
+    index = workflow.wire_index
+    assert workflow.wire_index is index
+    assert index.get_successors("InputBlock") == ["ProcessBlock"]
+    assert index.get_predecessors("ProcessBlock") == {"InputBlock"}
+    assert index.get_predecessors("InputBlock") == set()
+    assert index.get_input_sources("ProcessBlock", "input1") == [("InputBlock", "output1")]
+    assert index.get_input_sources("InputBlock", "input1") == []
+    assert index.in_degree == {"ProcessBlock": 1}
+
+    workflow.invalidate_wire_index()
+    assert workflow.wire_index is not index